@@ -0,0 +1,103 @@
+import logging
+from head_agent import HeadAgent
+from realtime_prices import RealTimePriceService
+from blocking import get_executor, shutdown_executor
+from singleflight import flights
+from revalidate import revalidator
+from fundamentals_store import fundamentals_store
+from live_indicators import live_indicators
+from screener import Screener
+from warmup import WarmupScheduler, WARMUP_ENABLED
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+class AgentRegistry:
+    """Process-wide home for the agents shared by every request.
+
+    Agents (and their Groq clients and caches) are built once in the FastAPI
+    lifespan instead of per request, so the one-hour caches actually hit.
+    """
+
+    def __init__(self):
+        self.head_agent = None
+        self.snapshot_service = None
+        self.screener = None
+        self.warmup = None
+        self.init_error = None
+
+    def start(self):
+        logger.info("Starting agent registry")
+        try:
+            self.head_agent = HeadAgent()
+            self.screener = Screener(self.head_agent.stock_analyzer_agent)
+            self.init_error = None
+        except Exception as e:
+            # Keep serving health/document endpoints; stock endpoints report the error.
+            self.init_error = str(e)
+            logger.error(f"Agent registry could not build HeadAgent: {str(e)}")
+        self.snapshot_service = RealTimePriceService(ttl_seconds=10, bar_store=self.bar_store())
+        get_executor()
+
+    def start_warmup(self):
+        """Start the warm-up scheduler; call from the running event loop."""
+        if WARMUP_ENABLED and self.head_agent is not None and self.warmup is None:
+            self.warmup = WarmupScheduler(self.head_agent)
+            self.warmup.start()
+
+    async def stop_warmup(self):
+        if self.warmup is not None:
+            await self.warmup.stop()
+            self.warmup = None
+
+    def shutdown(self):
+        logger.info("Shutting down agent registry")
+        self.head_agent = None
+        self.snapshot_service = None
+        self.screener = None
+        shutdown_executor()
+
+    def get_head_agent(self) -> HeadAgent:
+        if self.head_agent is None:
+            raise RuntimeError(self.init_error or "Agent registry has not been started")
+        return self.head_agent
+
+    def get_screener(self) -> Screener:
+        self.get_head_agent()
+        return self.screener
+
+    def stock_agent(self):
+        """The shared StockAnalyzerAgent, or None before start()."""
+        return self.head_agent.stock_analyzer_agent if self.head_agent is not None else None
+
+    def bar_store(self):
+        """The stock agent's bar store (seeds live indicators), or None."""
+        agent = self.stock_agent()
+        return agent.bar_store if agent is not None else None
+
+    def get_snapshot_service(self) -> RealTimePriceService:
+        if self.snapshot_service is None:
+            self.snapshot_service = RealTimePriceService(ttl_seconds=10, bar_store=self.bar_store())
+        return self.snapshot_service
+
+    def cache_stats(self):
+        caches = []
+        if self.head_agent is not None:
+            caches.append(self.head_agent.stock_analyzer_agent.cache)
+            caches.append(self.head_agent.market_context_agent.cache)
+            caches.append(self.head_agent.fin_analyzer_agent.cache)
+        if self.snapshot_service is not None:
+            caches.append(self.snapshot_service.cache)
+        return {
+            "caches": {cache.name: cache.stats() for cache in caches},
+            "singleflight": flights.stats(),
+            "revalidation": revalidator.stats(),
+            "fundamentals": fundamentals_store.stats(),
+            "live_indicators": live_indicators.stats(),
+            "screener": self.screener.stats() if self.screener is not None else None,
+            "warmup": self.warmup.stats() if self.warmup is not None else None,
+        }
+
+
+registry = AgentRegistry()
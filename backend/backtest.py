@@ -0,0 +1,300 @@
+import os
+import json
+import logging
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import indicators
+from indicators import TRADING_DAYS, MAX_WINDOW
+from bar_store import BarStore, BAR_STORE_PATH
+from portfolio import drawdowns
+from screener import CloseMatrix
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# One-way cost per unit of position traded, in basis points of notional
+DEFAULT_COST_BPS = float(os.getenv("BACKTEST_COST_BPS", "10"))
+BACKTEST_PROCESSES = int(os.getenv("BACKTEST_PROCESSES", str(os.cpu_count() or 1)))
+# The recommendation proxy assumes analyst coverage, worth 0.3 * 0.5 in calculate_confidence
+ANALYST_SCORE = 0.15
+
+
+def _hold(signal):
+    """Carry the last non-NaN position forward along the last axis; 0 before the first."""
+    signal = np.asarray(signal, dtype=np.float64)
+    valid = ~np.isnan(signal)
+    positions = np.where(valid, np.arange(signal.shape[-1]), 0)
+    np.maximum.accumulate(positions, axis=-1, out=positions)
+    held = np.take_along_axis(signal, positions, axis=-1)
+    return np.where(np.isnan(held), 0.0, held)
+
+
+def sma_cross(closes, fast: int = 20, slow: int = 50):
+    """Long while the fast SMA is above the slow one."""
+    with np.errstate(invalid="ignore"):
+        return (indicators.sma(closes, fast) > indicators.sma(closes, slow)).astype(np.float64)
+
+
+def momentum(closes, lookback: int = 126):
+    """Long while the close is above the close `lookback` bars ago."""
+    out = np.zeros(closes.shape)
+    with np.errstate(invalid="ignore"):
+        out[..., lookback:] = closes[..., lookback:] > closes[..., :-lookback]
+    return out
+
+
+def rsi_reversion(closes, window: int = 14, lower: float = 30.0, upper: float = 70.0):
+    """Buy when RSI drops below `lower`, sell when it rises above `upper`."""
+    values = indicators.rsi(closes, window)
+    with np.errstate(invalid="ignore"):
+        return _hold(np.where(values < lower, 1.0, np.where(values > upper, 0.0, np.nan)))
+
+
+def recommendation(closes, fast: int = 20, slow: int = 50, window: int = 126, threshold: float = 0.7, short: int = 0):
+    """Price-only proxy for the buy/sell/hold rule in main.build_analysis_response.
+
+    The LLM sentiment is replaced by the SMA trend (bullish above, bearish
+    below) and the confidence by calculate_confidence over a trailing window.
+    Buy goes long, sell exits (or goes short when `short` is 1), hold keeps
+    the current position.
+    """
+    fast_line, slow_line = indicators.sma(closes, fast), indicators.sma(closes, slow)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variation = indicators.rolling_std(closes, window) / indicators.sma(closes, window)
+        confidence = 0.7 * np.maximum(0.0, 1.0 - variation) + ANALYST_SCORE
+        confident = confidence > threshold
+        signal = np.where(confident & (fast_line > slow_line), 1.0,
+                          np.where(confident & (fast_line < slow_line), -1.0 if short else 0.0, np.nan))
+    return _hold(signal)
+
+
+# name -> (signal function, default parameters)
+SIGNALS = {
+    "sma_cross": (sma_cross, {"fast": 20, "slow": 50}),
+    "momentum": (momentum, {"lookback": 126}),
+    "rsi_reversion": (rsi_reversion, {"window": 14, "lower": 30.0, "upper": 70.0}),
+    "recommendation": (recommendation, {"fast": 20, "slow": 50, "window": 126, "threshold": 0.7, "short": 0}),
+}
+WINDOW_PARAMS = ("fast", "slow", "lookback", "window")
+
+
+def resolve_params(signal: str, params: dict = None) -> dict:
+    """Defaults for `signal` overridden by `params`, cast to the defaults' types.
+
+    Raises ValueError for unknown signals or parameters and out-of-range windows.
+    """
+    if signal not in SIGNALS:
+        raise ValueError(f"Unknown signal '{signal}'. Use one of: {', '.join(SIGNALS)}")
+    defaults = SIGNALS[signal][1]
+    resolved = dict(defaults)
+    for name, value in (params or {}).items():
+        if name not in defaults:
+            raise ValueError(f"Signal '{signal}' has no parameter '{name}'. Use: {', '.join(defaults)}")
+        try:
+            resolved[name] = type(defaults[name])(value)
+        except ValueError:
+            raise ValueError(f"Invalid value for {signal} parameter '{name}': {value}")
+    for name in WINDOW_PARAMS:
+        if name in resolved and not 1 <= resolved[name] <= MAX_WINDOW:
+            raise ValueError(f"'{name}' must be between 1 and {MAX_WINDOW}")
+    return resolved
+
+
+def check_cost(cost_bps: float) -> float:
+    """Raises ValueError unless cost_bps is a finite, non-negative number."""
+    cost_bps = float(cost_bps)
+    if not np.isfinite(cost_bps) or cost_bps < 0:
+        raise ValueError(f"cost_bps must be a finite, non-negative number, got {cost_bps}")
+    return cost_bps
+
+
+def signal_positions(closes, traded, signal: str, params: dict):
+    """Positions from `signal` computed on each ticker's own bars (the dates in
+    `traded`), so another exchange's holiday adds no flat bar to its windows,
+    then placed back on the tickers × dates grid and held across its gaps."""
+    counts = traded.sum(axis=1)
+    rows, columns = np.nonzero(traded)
+    width = int(counts.max()) if len(counts) else 0
+    # Each ticker's bars packed to the right, as in CloseMatrix.bars
+    packed = (width - counts)[rows] + (np.cumsum(traded, axis=1) - 1)[rows, columns]
+    bars = np.full((len(closes), width), np.nan)
+    bars[rows, packed] = closes[rows, columns]
+    own = SIGNALS[signal][0](bars, **params)
+    positions = np.full(closes.shape, np.nan)
+    positions[rows, columns] = own[rows, packed]
+    return _hold(positions)
+
+
+def simulate(closes, positions, cost_bps: float = DEFAULT_COST_BPS):
+    """Daily net returns of holding `positions` (tickers × dates, decided at
+    each close) over the next bar, after costs on every change of position.
+
+    Returns (net returns, active, trades), each tickers × (dates - 1); `active`
+    is False before a ticker's first bar.
+    """
+    active = ~np.isnan(closes[:, :-1])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = np.where(active, closes[:, 1:] / closes[:, :-1] - 1.0, 0.0)
+    positions = np.where(np.isnan(closes), 0.0, np.nan_to_num(positions))
+    trades = np.abs(np.diff(positions, axis=1, prepend=0.0))[:, :-1]
+    net = positions[:, :-1] * returns - trades * cost_bps / 1e4
+    return net, active, trades
+
+
+def performance(returns, active):
+    """PnL, Sharpe and drawdown for each row of a returns matrix (1D for one
+    series), counting only active days."""
+    returns, active = np.atleast_2d(returns), np.atleast_2d(active)
+    days = active.sum(axis=-1)
+    total = np.prod(1.0 + returns, axis=-1) - 1.0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = returns.sum(axis=-1) / days
+        std = np.sqrt((((returns - mean[:, None]) ** 2) * active).sum(axis=-1) / (days - 1))
+        annual_return = np.maximum(1.0 + total, 0.0) ** (TRADING_DAYS / days) - 1.0
+        sharpe = np.where(std > 0, mean / std * np.sqrt(TRADING_DAYS), np.nan)
+    return {
+        "days": days,
+        "total_return": total,
+        "annual_return": annual_return,
+        "annual_volatility": std * np.sqrt(TRADING_DAYS),
+        "sharpe": sharpe,
+        "max_drawdown": drawdowns(returns).min(axis=-1) if returns.shape[-1] else np.full(len(returns), np.nan),
+    }
+
+
+def _value(x, digits=4):
+    if isinstance(x, (int, np.integer)):
+        return int(x)
+    return None if not np.isfinite(x) else round(float(x), digits)
+
+
+def run(tickers, dates, closes, signal: str, params: dict = None, cost_bps: float = DEFAULT_COST_BPS,
+        per_ticker: bool = True, traded=None):
+    """Backtest one signal over a forward-filled tickers × dates close matrix.
+
+    `traded` marks the dates each ticker has a real bar (CloseMatrix.traded);
+    signals are computed on those bars only. Without it every non-NaN close
+    counts as a bar. The portfolio holds the tickers in equal weight,
+    rebalanced daily across those with prices. Returns {signal, params,
+    cost_bps, start, end, portfolio, tickers}.
+
+    Raises ValueError for bad parameters or a negative or non-finite cost.
+    """
+    params = resolve_params(signal, params)
+    cost_bps = check_cost(cost_bps)
+    if closes.shape[1] < 2:
+        raise ValueError("Need at least two bars to backtest")
+    positions = signal_positions(closes, ~np.isnan(closes) if traded is None else traded, signal, params)
+    net, active, trades = simulate(closes, positions, cost_bps)
+    counts = active.sum(axis=0)
+    book = np.where(counts > 0, net.sum(axis=0) / np.maximum(counts, 1), 0.0)
+    summary = {name: values[0] for name, values in performance(book, counts > 0).items()}
+    summary["turnover"] = trades.sum() / max(len(tickers), 1) / max(int((counts > 0).sum()), 1) * TRADING_DAYS
+    result = {
+        "signal": signal,
+        "params": params,
+        "cost_bps": cost_bps,
+        "start": str(dates[0]),
+        "end": str(dates[-1]),
+        "portfolio": {name: _value(v) for name, v in summary.items()},
+    }
+    if per_ticker:
+        stats = performance(net, active)
+        buy_hold = performance(simulate(closes, np.ones(closes.shape), 0.0)[0], active)["total_return"]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            exposure = (np.abs(np.where(np.isnan(closes), 0.0, positions))[:, :-1] * active).sum(axis=1) / active.sum(axis=1)
+        result["tickers"] = [
+            {"ticker": ticker, **{name: _value(values[i]) for name, values in stats.items()},
+             "trades": int(np.count_nonzero(trades[i])), "exposure": _value(exposure[i]),
+             "buy_and_hold": _value(buy_hold[i])}
+            for i, ticker in enumerate(tickers)
+        ]
+    return result
+
+
+def load_matrix(tickers, start: str = None, end: str = None, path: str = BAR_STORE_PATH) -> CloseMatrix:
+    """Stored daily closes only; nothing is fetched upstream."""
+    store = BarStore(path)
+    try:
+        tickers = list(dict.fromkeys(tickers)) or store.tickers("1d")
+        dates, closes = store.load_closes(tickers, "1d", start)
+    finally:
+        store.close()
+    if not len(dates):
+        raise ValueError("No stored daily bars for the requested tickers; fetch them through the API first")
+    if end:
+        keep = dates <= np.datetime64(end, "D")
+        dates, closes = dates[keep], closes[:, keep]
+    return CloseMatrix(tickers, dates, closes)
+
+
+_sweep_matrix = None
+
+
+def _init_sweep(tickers, dates, closes, traded):
+    global _sweep_matrix
+    _sweep_matrix = (tickers, dates, closes, traded)
+
+
+def _run_sweep(task):
+    signal, params, cost_bps = task
+    tickers, dates, closes, traded = _sweep_matrix
+    result = run(tickers, dates, closes, signal, params, cost_bps, per_ticker=False, traded=traded)
+    return {"params": result["params"], **result["portfolio"]}
+
+
+def sweep(tickers, dates, closes, signal: str, grid: dict, cost_bps: float = DEFAULT_COST_BPS,
+          processes: int = BACKTEST_PROCESSES, traded=None):
+    """Backtest every combination in `grid` ({param: [values]}) in a process
+    pool; the matrix is sent once per worker. Results sort by Sharpe, best first."""
+    cost_bps = check_cost(cost_bps)
+    tasks = [(signal, resolve_params(signal, dict(zip(grid, values))), cost_bps)
+             for values in itertools.product(*grid.values())]
+    processes = max(1, min(processes, len(tasks)))
+    logger.info(f"Sweeping {len(tasks)} {signal} parameter sets over {len(tickers)} tickers with {processes} processes")
+    if processes == 1:
+        _init_sweep(tickers, dates, closes, traded)
+        results = [_run_sweep(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_sweep, initargs=(tickers, dates, closes, traded)) as pool:
+            results = list(pool.map(_run_sweep, tasks, chunksize=max(1, len(tasks) // (processes * 4))))
+    return sorted(results, key=lambda r: -np.inf if r["sharpe"] is None else -r["sharpe"])
+
+
+def _parse_assignments(text: str, separator: str = ","):
+    """"fast=20,slow=50" -> {"fast": "20", "slow": "50"}."""
+    pairs = [part.split("=", 1) for part in text.split(separator) if part.strip()]
+    if any(len(pair) != 2 for pair in pairs):
+        raise ValueError(f"Expected name=value pairs, got '{text}'")
+    return {name.strip(): value.strip() for name, value in pairs}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest technical signals on stored daily bars (offline).")
+    parser.add_argument("--tickers", default="", help="comma-separated; default is every ticker in the bar store")
+    parser.add_argument("--signal", default="sma_cross", choices=list(SIGNALS))
+    parser.add_argument("--params", default="", help='e.g. "fast=20,slow=50"')
+    parser.add_argument("--sweep", default="", help='e.g. "fast=10|20|50;slow=100|200"')
+    parser.add_argument("--cost-bps", type=float, default=DEFAULT_COST_BPS)
+    parser.add_argument("--start", default=None, help="YYYY-MM-DD")
+    parser.add_argument("--end", default=None, help="YYYY-MM-DD")
+    parser.add_argument("--processes", type=int, default=BACKTEST_PROCESSES)
+    parser.add_argument("--db", default=BAR_STORE_PATH)
+    args = parser.parse_args()
+
+    try:
+        matrix = load_matrix([t.strip().upper() for t in args.tickers.split(",") if t.strip()], args.start, args.end, args.db)
+        if args.sweep:
+            base = _parse_assignments(args.params)
+            grid = {name: values.split("|") for name, values in _parse_assignments(args.sweep, ";").items()}
+            grid = {**{name: [value] for name, value in base.items() if name not in grid}, **grid}
+            output = sweep(matrix.tickers, matrix.dates, matrix.closes, args.signal, grid, args.cost_bps, args.processes,
+                           traded=matrix.traded)
+        else:
+            output = run(matrix.tickers, matrix.dates, matrix.closes, args.signal, _parse_assignments(args.params), args.cost_bps,
+                         traded=matrix.traded)
+    except ValueError as e:
+        parser.error(str(e))
+    print(json.dumps(output, indent=2))
@@ -0,0 +1,155 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+import numpy as np
+from price_series import PriceSeries
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+BAR_STORE_PATH = os.getenv(
+    "BAR_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "market_data", "bars.sqlite"),
+)
+
+# Tickers bound per IN (...) query; stays under SQLite's host parameter limit
+SQLITE_MAX_PARAMS = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    ticker TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    date TEXT NOT NULL,
+    open REAL NOT NULL,
+    high REAL NOT NULL,
+    low REAL NOT NULL,
+    close REAL NOT NULL,
+    volume INTEGER NOT NULL,
+    PRIMARY KEY (ticker, interval, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS coverage (
+    ticker TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    covered_from TEXT NOT NULL,
+    refreshed_at REAL NOT NULL,
+    PRIMARY KEY (ticker, interval)
+);
+"""
+
+
+class BarStore:
+    """Persistent OHLCV bars in SQLite, keyed by (ticker, interval, date).
+
+    `coverage` records the earliest date we have asked upstream for and when the
+    series was last refreshed, so refreshes only need the bars after the last
+    stored date. Methods are blocking; agents call them through run_blocking.
+    """
+
+    def __init__(self, path: str = BAR_STORE_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            if path != ":memory:":
+                # WAL lets several uvicorn workers read while one writes
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            self._conn.commit()
+        logger.info(f"Bar store ready at {path}")
+
+    def coverage(self, ticker: str, interval: str = "1d"):
+        """{covered_from, last_date, refreshed_at} for a series, or None if never stored."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT covered_from, refreshed_at FROM coverage WHERE ticker = ? AND interval = ?",
+                (ticker, interval),
+            ).fetchone()
+            if row is None:
+                return None
+            last = self._conn.execute(
+                "SELECT MAX(date) FROM bars WHERE ticker = ? AND interval = ?", (ticker, interval)
+            ).fetchone()
+        return {"covered_from": row[0], "last_date": last[0], "refreshed_at": row[1]}
+
+    def load(self, ticker: str, interval: str = "1d", start: str = None, end: str = None) -> PriceSeries:
+        """Bars for ticker between start and end (inclusive, YYYY-MM-DD), oldest first."""
+        query = "SELECT date, open, high, low, close, volume FROM bars WHERE ticker = ? AND interval = ?"
+        params = [ticker, interval]
+        if start:
+            query += " AND date >= ?"
+            params.append(start)
+        if end:
+            query += " AND date <= ?"
+            params.append(end)
+        query += " ORDER BY date"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        if not rows:
+            return PriceSeries.empty()
+        dates, opens, highs, lows, closes, volumes = zip(*rows)
+        return PriceSeries(dates, opens, highs, lows, closes, volumes)
+
+    def save(self, ticker: str, interval: str, series: PriceSeries = None, covered_from: str = None, replace: bool = False):
+        """Upsert bars and mark the series refreshed.
+
+        `covered_from` is the start date that was requested upstream; coverage
+        only ever extends backwards. `replace` drops the stored bars first (a
+        re-adjusted full history after a split or dividend).
+        """
+        rows = []
+        if series is not None and len(series):
+            rows = list(zip(
+                [ticker] * len(series), [interval] * len(series), series.date_strings().tolist(),
+                series.open.tolist(), series.high.tolist(), series.low.tolist(),
+                series.close.tolist(), series.volume.tolist(),
+            ))
+        with self._lock:
+            if replace:
+                self._conn.execute("DELETE FROM bars WHERE ticker = ? AND interval = ?", (ticker, interval))
+            if rows:
+                self._conn.executemany("INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            existing = self._conn.execute(
+                "SELECT covered_from FROM coverage WHERE ticker = ? AND interval = ?", (ticker, interval)
+            ).fetchone()
+            starts = [d for d in (covered_from, existing[0] if existing else None) if d]
+            if starts:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO coverage VALUES (?, ?, ?, ?)", (ticker, interval, min(starts), time.time())
+                )
+            self._conn.commit()
+        logger.info(f"Stored {len(rows)} {interval} bars for {ticker}")
+
+    def load_closes(self, tickers, interval: str = "1d", start: str = None):
+        """Closes for many tickers as (dates, tickers × dates matrix), NaN where a
+        ticker has no bar on a date. One query per SQLITE_MAX_PARAMS tickers."""
+        index = {ticker: i for i, ticker in enumerate(tickers)}
+        rows = []
+        names = list(index)
+        for offset in range(0, len(names), SQLITE_MAX_PARAMS):
+            chunk = names[offset:offset + SQLITE_MAX_PARAMS]
+            query = (f"SELECT ticker, date, close FROM bars WHERE interval = ? AND ticker IN ({', '.join('?' * len(chunk))})"
+                     + (" AND date >= ?" if start else ""))
+            params = [interval, *chunk] + ([start] if start else [])
+            with self._lock:
+                rows.extend(self._conn.execute(query, params).fetchall())
+        if not rows:
+            return np.empty(0, dtype="datetime64[D]"), np.full((len(index), 0), np.nan)
+        symbols, dates, closes = zip(*rows)
+        dates, columns = np.unique(np.asarray(dates, dtype="datetime64[D]"), return_inverse=True)
+        matrix = np.full((len(index), len(dates)), np.nan)
+        matrix[[index[s] for s in symbols], columns.ravel()] = closes
+        return dates, matrix
+
+    def tickers(self, interval: str = "1d"):
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                "SELECT ticker FROM coverage WHERE interval = ? ORDER BY ticker", (interval,)
+            )]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
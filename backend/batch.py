@@ -0,0 +1,84 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+BATCH_MAX_TICKERS = 200
+# How many analyses run at once, and how many may start per second. Each
+# analysis costs several yfinance/NewsAPI calls and three Groq completions.
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_STARTS_PER_SECOND = float(os.getenv("BATCH_STARTS_PER_SECOND", "2"))
+
+
+class RateBudget:
+    """Space out task starts to at most `rate` per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+async def stream_batch(
+    tickers: List[str],
+    analyze: Callable[[str], Awaitable[Dict]],
+    concurrency: int = BATCH_CONCURRENCY,
+    starts_per_second: float = BATCH_STARTS_PER_SECOND,
+    prepare: Optional[Callable[[], Awaitable]] = None,
+) -> AsyncIterator[str]:
+    """Run `analyze` over tickers and yield one NDJSON line per ticker as it finishes.
+
+    Lines look like {"ticker", "status": "ok", "analysis"} or
+    {"ticker", "status": "error", "error"}; a final {"status": "done"} line
+    carries the totals. `prepare` runs once before any analysis starts (e.g. a
+    bulk price prefetch); if it fails the batch still runs.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    budget = RateBudget(starts_per_second)
+    start = time.perf_counter()
+    if prepare is not None:
+        try:
+            await prepare()
+        except Exception as e:
+            logger.error(f"Batch preparation failed: {e}")
+
+    async def run(ticker):
+        async with semaphore:
+            await budget.acquire()
+            try:
+                return {"ticker": ticker, "status": "ok", "analysis": await analyze(ticker)}
+            except Exception as e:
+                detail = getattr(e, "detail", None) or str(e)
+                logger.error(f"Batch analysis failed for {ticker}: {detail}")
+                return {"ticker": ticker, "status": "error", "error": detail}
+
+    tasks = [asyncio.ensure_future(run(ticker)) for ticker in tickers]
+    failed = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            line = await next_done
+            failed += line["status"] == "error"
+            yield json.dumps(line) + "\n"
+        yield json.dumps({
+            "status": "done",
+            "total": len(tickers),
+            "failed": failed,
+            "elapsed": round(time.perf_counter() - start, 3),
+        }) + "\n"
+    finally:
+        # Client went away (or we finished): drop any work still queued
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,108 @@
+"""Benchmark of the NumPy indicator engine against a naive pandas version.
+
+"naive pandas" computes each indicator the straightforward way: rolling
+.apply() with Python callables for the windowed statistics and row-by-row
+loops for the Wilder/EMA recursions. "numpy" is indicators.compute() for the
+same set. Both are checked to agree before timing.
+
+Run from backend/:  python benchmarks/bench_indicators.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from price_series import PriceSeries
+import indicators
+
+LENGTHS = {"1y": 252, "5y": 252 * 5, "20y": 252 * 20}
+SPEC = "sma:20,sma:50,ema:20,rsi:14,macd,bbands:20:2,atr:14,obv,volatility:20"
+
+
+def make_series(bars):
+    rng = np.random.default_rng(7)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, bars)))
+    dates = np.datetime64("2000-01-03") + np.arange(bars)
+    return PriceSeries(dates, close * 0.995, close * 1.01, close * 0.985, close,
+                       rng.integers(1_000_000, 50_000_000, bars))
+
+
+def naive_smooth(values, window, alpha):
+    out = pd.Series(np.nan, index=values.index)
+    valid = values.dropna()
+    if len(valid) < window:
+        return out
+    first = valid.index[window - 1]
+    out[first] = valid.iloc[:window].mean()
+    prev = out[first]
+    for i in range(values.index.get_loc(first) + 1, len(values)):
+        prev = alpha * values.iloc[i] + (1 - alpha) * prev
+        out.iloc[i] = prev
+    return out
+
+
+def naive_pandas(series):
+    df = pd.DataFrame({"high": series.high, "low": series.low, "close": series.close, "volume": series.volume})
+    close = df["close"]
+    out = {}
+    out["sma_20"] = close.rolling(20).apply(lambda w: w.mean(), raw=False)
+    out["sma_50"] = close.rolling(50).apply(lambda w: w.mean(), raw=False)
+    out["ema_20"] = naive_smooth(close, 20, 2 / 21)
+
+    delta = close.diff()
+    gain = naive_smooth(delta.clip(lower=0), 14, 1 / 14)
+    loss = naive_smooth((-delta).clip(lower=0), 14, 1 / 14)
+    out["rsi_14"] = 100 - 100 / (1 + gain / loss)
+
+    line = naive_smooth(close, 12, 2 / 13) - naive_smooth(close, 26, 2 / 27)
+    out["macd"] = line
+    out["macd_signal"] = naive_smooth(line, 9, 2 / 10)
+    out["macd_hist"] = line - out["macd_signal"]
+
+    middle = close.rolling(20).apply(lambda w: w.mean(), raw=False)
+    std = close.rolling(20).apply(lambda w: w.std(ddof=0), raw=False)
+    out["bb_middle_20"], out["bb_upper_20"], out["bb_lower_20"] = middle, middle + 2 * std, middle - 2 * std
+
+    prev_close = close.shift(1).fillna(close.iloc[0])
+    tr = pd.Series([max(h, p) - min(l, p) for h, l, p in zip(df["high"], df["low"], prev_close)])
+    out["atr_14"] = naive_smooth(tr, 14, 1 / 14)
+
+    obv = [0.0]
+    for i in range(1, len(df)):
+        obv.append(obv[-1] + np.sign(close.iloc[i] - close.iloc[i - 1]) * df["volume"].iloc[i])
+    out["obv"] = pd.Series(obv)
+
+    returns = np.log(close).diff()
+    out["volatility_20"] = returns.rolling(20).apply(lambda w: w.std(ddof=1), raw=False) * np.sqrt(252)
+    return {name: values.to_numpy(dtype=np.float64) for name, values in out.items()}
+
+
+def numpy_engine(series):
+    return indicators.compute(series, indicators.parse_indicators(SPEC))
+
+
+def timed(func, *args, repeat=5):
+    func(*args)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(*args)
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    print(f"{'history':<8} {'bars':>6} {'naive pandas (ms)':>18} {'numpy (ms)':>11} {'speedup':>8}")
+    for label, bars in LENGTHS.items():
+        series = make_series(bars)
+        naive_ms, expected = timed(naive_pandas, series, repeat=1)
+        numpy_ms, columns = timed(numpy_engine, series)
+        for name, values in expected.items():
+            assert np.allclose(columns[name], values, rtol=1e-9, atol=1e-6, equal_nan=True), name
+        print(f"{label:<8} {bars:>6} {naive_ms:>18.2f} {numpy_ms:>11.2f} {naive_ms / numpy_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Microbenchmark of the price pipeline at 1y, 5y and 20y of daily bars.
+
+"rows" is the old path: hist.iterrows() with per-row round()/strftime into
+dicts, then Python lists of closes for the technicals and confidence score.
+"columnar" is the current path: PriceSeries.from_history in bulk and the
+indicators computed on the close array, with dicts built only at the API
+edge (to_records, timed separately).
+
+Run from backend/:  python benchmarks/bench_price_pipeline.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from price_series import PriceSeries
+from stock_analyzer import StockAnalyzerAgent
+
+LENGTHS = {"1y": 252, "5y": 252 * 5, "20y": 252 * 20}
+
+# Only the array-based helpers are exercised, so skip __init__ (no Groq client needed)
+agent = StockAnalyzerAgent.__new__(StockAnalyzerAgent)
+
+
+def make_history(bars):
+    rng = np.random.default_rng(7)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, bars)))
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=bars, tz="America/New_York")
+    return pd.DataFrame({
+        "Open": close * 0.995,
+        "High": close * 1.01,
+        "Low": close * 0.985,
+        "Close": close,
+        "Volume": rng.integers(1_000_000, 50_000_000, bars).astype(float),
+    }, index=index)
+
+
+def rows_pipeline(hist):
+    prices = [
+        {
+            "date": index.strftime('%Y-%m-%d'),
+            "open": round(row['Open'], 2),
+            "high": round(row['High'], 2),
+            "low": round(row['Low'], 2),
+            "close": round(row['Close'], 2),
+            "volume": int(row['Volume'])
+        }
+        for index, row in hist.iterrows()
+    ]
+    closes = [p["close"] for p in prices]
+    sma20 = np.mean(closes[-20:])
+    deltas = np.diff(closes)
+    closes = [p["close"] for p in prices]
+    volatility = np.std(closes) / np.mean(closes)
+    return prices, sma20, deltas, volatility
+
+
+def columnar_pipeline(hist):
+    series = PriceSeries.from_history(hist)
+    technicals = agent.calculate_technicals(series)
+    confidence = agent.calculate_confidence(series, {})
+    return series, technicals, confidence
+
+
+def timed(func, *args, repeat=20):
+    func(*args)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(*args)
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    print(f"{'history':<8} {'bars':>6} {'rows (ms)':>10} {'columnar (ms)':>14} {'to_records (ms)':>16} {'speedup':>8}")
+    for label, bars in LENGTHS.items():
+        hist = make_history(bars)
+        rows_ms, (prices, *_rest) = timed(rows_pipeline, hist)
+        cols_ms, (series, *_rest) = timed(columnar_pipeline, hist)
+        records_ms, records = timed(series.to_records)
+        # Same bars either way (np.round and round() may differ in the last cent on ties)
+        assert [r["date"] for r in records] == [p["date"] for p in prices]
+        assert np.allclose([r["close"] for r in records], [p["close"] for p in prices], atol=0.01)
+        print(f"{label:<8} {bars:>6} {rows_ms:>10.2f} {cols_ms:>14.2f} {records_ms:>16.2f} {rows_ms / cols_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Serialization benchmark for the large JSON responses (/all-data, /prices).
+
+Compares the default FastAPI path (Pydantic model construction, response
+validation, jsonable_encoder, json.dumps) with the fast_json path (orjson, no
+re-validation) and reports bytes on the wire with gzip/brotli.
+
+Run from backend/:  python benchmarks/bench_serialization.py
+"""
+import os
+import sys
+import json
+import gzip
+import time
+import random
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from schemas import AllDataResponse
+import fast_json
+
+
+def make_payload(days=365):
+    random.seed(7)
+    prices = []
+    close = 150.0
+    start = date.today() - timedelta(days=days)
+    for i in range(days):
+        day = start + timedelta(days=i)
+        if day.weekday() >= 5:
+            continue
+        close = max(1.0, close * (1 + random.gauss(0, 0.015)))
+        prices.append({
+            "date": day.isoformat(),
+            "open": round(close * 0.99, 2),
+            "high": round(close * 1.01, 2),
+            "low": round(close * 0.98, 2),
+            "close": round(close, 2),
+            "volume": random.randint(10_000_000, 90_000_000),
+        })
+    quarters = [(date.today() - timedelta(days=91 * q)).isoformat() for q in range(4)]
+    metric = lambda scale: {q: round(random.uniform(0.5, 1.5) * scale, 2) for q in quarters}
+    return {
+        "ticker": "AAPL",
+        "historical_prices": prices,
+        "fundamentals": {
+            "income_statement": {name: metric(1e10) for name in ("total_revenue", "net_income", "gross_profit", "operating_income")},
+            "cash_flow": {name: metric(1e9) for name in ("operating_cash_flow", "free_cash_flow")},
+            "eps_data": {
+                "eps_trend": {p: {"current": 1.5, "7daysAgo": 1.49, "30daysAgo": 1.47} for p in ("0q", "+1q", "0y", "+1y")},
+                "eps_revision": {p: {"upLast7days": 3, "downLast30days": 1} for p in ("0q", "+1q", "0y", "+1y")},
+            },
+        },
+        "technicals": {"sma20": 151.2, "rsi": 55.1},
+        "basic_financials": {"mean_price_target": 210.0, "high_price_target": 250.0, "low_price_target": 170.0, "number_of_analysts": 38},
+        "financials_reported": [],
+        "company_news": [],
+        "timestamp": "2024-01-01 00:00:00",
+        "errors": [],
+    }
+
+
+def bench(label, func, repeat=200):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        body = func()
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    print(f"{label:<40} {elapsed:8.3f} ms/op  {len(body):>9,} bytes")
+    return body
+
+
+def baseline(payload):
+    model = AllDataResponse(**payload)
+    validated = AllDataResponse.model_validate(model.model_dump()) if hasattr(model, "model_dump") else AllDataResponse(**model.dict())
+    return json.dumps(jsonable_encoder(validated), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def main():
+    for days, label in ((365, "1y"), (365 * 5, "5y")):
+        payload = make_payload(days)
+        print(f"\n/all-data payload, {label} of daily bars ({len(payload['historical_prices'])} rows)")
+        plain = bench("pydantic + jsonable_encoder + json", lambda: baseline(payload))
+        fast = bench("orjson (fast_json.dumps)", lambda: fast_json.dumps(payload))
+        bench("orjson + gzip", lambda: gzip.compress(fast_json.dumps(payload), compresslevel=fast_json.GZIP_LEVEL))
+        if fast_json.brotli is not None:
+            bench("orjson + brotli", lambda: fast_json.brotli.compress(fast_json.dumps(payload), quality=fast_json.BROTLI_QUALITY))
+        else:
+            print("orjson + brotli                          skipped (brotli not installed)")
+        assert json.loads(plain) == json.loads(fast)
+
+
+if __name__ == "__main__":
+    main()
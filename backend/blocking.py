@@ -0,0 +1,35 @@
+import os
+import asyncio
+import logging
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# yfinance, requests and DuckDuckGo are blocking; they run on this bounded pool
+# so a slow upstream never stalls the event loop (health checks, WebSocket ticks).
+MAX_WORKERS = int(os.getenv("UPSTREAM_WORKERS", "16"))
+
+_executor = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="upstream")
+        logger.info(f"Started upstream executor with {MAX_WORKERS} workers")
+    return _executor
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call on the upstream executor and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,58 @@
+import os
+import logging
+from typing import Dict, List
+import pandas as pd
+import yfinance as yf
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Symbols per multi-symbol yf.download request
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "50"))
+
+
+def chunked(items: List[str], size: int = BULK_CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def split_download(data: pd.DataFrame, tickers: List[str]) -> Dict[str, pd.DataFrame]:
+    """Split a yf.download frame into one OHLCV frame per ticker, dropping empty rows."""
+    frames = {}
+    if data is None or data.empty:
+        return frames
+    if isinstance(data.columns, pd.MultiIndex):
+        available = set(data.columns.get_level_values(0))
+        for ticker in tickers:
+            if ticker in available:
+                frame = data[ticker].dropna(how="all")
+                if not frame.empty:
+                    frames[ticker] = frame
+    elif len(tickers) == 1:
+        frame = data.dropna(how="all")
+        if not frame.empty:
+            frames[tickers[0]] = frame
+    return frames
+
+
+def download_bulk(tickers: List[str], chunk_size: int = BULK_CHUNK_SIZE, **kwargs) -> Dict[str, pd.DataFrame]:
+    """Download history for many tickers with one yf.download call per chunk.
+
+    Keyword arguments go to yf.download (period/start/end/interval). Returns
+    {ticker: DataFrame}; tickers with no data are left out. Blocking.
+    """
+    frames = {}
+    unique = list(dict.fromkeys(t.upper() for t in tickers))
+    for chunk in chunked(unique, chunk_size):
+        data = yf.download(
+            chunk,
+            group_by="ticker",
+            auto_adjust=True,  # same prices as Ticker.history
+            actions=True,  # Dividends / Stock Splits, to spot stored bars needing re-adjustment
+            threads=True,
+            progress=False,
+            **kwargs
+        )
+        frames.update(split_download(data, chunk))
+    logger.info(f"Bulk downloaded {len(frames)}/{len(unique)} tickers in {-(-len(unique) // chunk_size)} request(s)")
+    return frames
@@ -0,0 +1,79 @@
+import time
+import asyncio
+import logging
+from typing import Callable, Dict, Iterable
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+class Node:
+    """One step of a DagExecutor graph.
+
+    `func` is an async callable that receives the results of `inputs` as
+    keyword arguments, e.g. Node("b", make_b, inputs=("a",)) calls make_b(a=...).
+    """
+
+    def __init__(self, name: str, func: Callable, inputs: Iterable[str] = ()):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+
+
+class DagExecutor:
+    """Run async nodes concurrently, each starting as soon as its inputs are ready."""
+
+    def __init__(self, nodes: Iterable[Node]):
+        self.nodes = {}
+        for node in nodes:
+            if node.name in self.nodes:
+                raise ValueError(f"Duplicate DAG node: {node.name}")
+            self.nodes[node.name] = node
+        self._check_graph()
+
+    def _check_graph(self):
+        for node in self.nodes.values():
+            for name in node.inputs:
+                if name not in self.nodes:
+                    raise ValueError(f"DAG node {node.name} depends on unknown node {name}")
+        # Kahn's algorithm: every node must be reachable in topological order
+        pending = {name: len(node.inputs) for name, node in self.nodes.items()}
+        ready = [name for name, count in pending.items() if count == 0]
+        visited = 0
+        while ready:
+            done = ready.pop()
+            visited += 1
+            for node in self.nodes.values():
+                if done in node.inputs:
+                    pending[node.name] -= 1
+                    if pending[node.name] == 0:
+                        ready.append(node.name)
+        if visited != len(self.nodes):
+            raise ValueError("DAG contains a cycle")
+
+    async def run(self):
+        """Execute the graph; returns (results, timings) keyed by node name.
+
+        Timings are the seconds each node spent running, excluding the time
+        it waited for its inputs.
+        """
+        tasks: Dict[str, asyncio.Task] = {}
+        timings: Dict[str, float] = {}
+
+        async def run_node(node: Node):
+            kwargs = {name: await tasks[name] for name in node.inputs}
+            start = time.perf_counter()
+            try:
+                return await node.func(**kwargs)
+            finally:
+                timings[node.name] = round(time.perf_counter() - start, 3)
+
+        for node in self.nodes.values():
+            tasks[node.name] = asyncio.ensure_future(run_node(node))
+        try:
+            await asyncio.gather(*tasks.values())
+        except Exception:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        return {name: task.result() for name, task in tasks.items()}, timings
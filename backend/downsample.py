@@ -0,0 +1,78 @@
+import logging
+import numpy as np
+from price_series import PriceSeries
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+RESAMPLE_INTERVALS = ("1d", "1wk", "1mo")
+DOWNSAMPLE_METHODS = ("lttb", "ohlc")
+
+
+def _run_starts(keys):
+    """Positions where a sorted key array changes value (always includes 0)."""
+    if not len(keys):
+        return np.empty(0, dtype=np.intp)
+    return np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+
+
+def resample(series: PriceSeries, interval: str) -> PriceSeries:
+    """Roll daily bars up to weekly (Monday-based) or monthly OHLC bars."""
+    if interval == "1d":
+        return series
+    days = series.dates.astype(np.int64)
+    if interval == "1wk":
+        # Day 0 (1970-01-01) is a Thursday; shifting by 3 starts weeks on Monday
+        keys = (days + 3) // 7
+    elif interval == "1mo":
+        keys = series.dates.astype("datetime64[M]").astype(np.int64)
+    else:
+        raise ValueError(f"Unsupported interval '{interval}'")
+    return series.aggregate(_run_starts(keys))
+
+
+def lttb_indices(y, max_points: int):
+    """Largest-Triangle-Three-Buckets: indices of max_points values that keep the line's shape.
+
+    x is the bar position, so gaps (weekends, holidays) don't skew the buckets.
+    The first and last points are always kept.
+    """
+    n = len(y)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    x = np.arange(n, dtype=np.float64)
+    # Interior points split into max_points - 2 buckets
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.intp)
+    selected = np.empty(max_points, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the third triangle vertex
+        if i < max_points - 3:
+            nlo, nhi = edges[i + 1], edges[i + 2]
+            avg_x, avg_y = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        areas = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample(series: PriceSeries, max_points: int, method: str = "lttb") -> PriceSeries:
+    """Reduce a series to at most max_points bars.
+
+    - lttb: keeps the real bars that best preserve the closing-price line
+    - ohlc: merges equal-sized runs of bars into OHLC buckets (min/max kept)
+    """
+    if max_points is None or len(series) <= max_points:
+        return series
+    if method == "lttb":
+        return series.take(lttb_indices(series.close, max_points))
+    if method == "ohlc":
+        starts = np.unique(np.linspace(0, len(series), max_points, endpoint=False).astype(np.intp))
+        return series.aggregate(starts)
+    raise ValueError(f"Unsupported downsampling method '{method}'")
@@ -0,0 +1,103 @@
+import gzip
+import logging
+from datetime import date, datetime
+import numpy as np
+import orjson
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this are sent as-is; compressing them costs more than it saves.
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj):
+    # pandas Timestamps (yfinance frames) and numpy scalars that orjson does not cover
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def _key(key):
+    if isinstance(key, str):
+        return key
+    return key.isoformat() if hasattr(key, "isoformat") else str(key)
+
+
+def _stringify_keys(obj):
+    if isinstance(obj, dict):
+        return {_key(k): _stringify_keys(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_stringify_keys(v) for v in obj]
+    return obj
+
+
+def dumps(content) -> bytes:
+    """Serialize API payloads with orjson (numpy arrays and non-str keys allowed)."""
+    try:
+        return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+    except orjson.JSONEncodeError:
+        # Keys orjson cannot encode (e.g. pandas Timestamps) -> plain strings
+        return orjson.dumps(_stringify_keys(content), default=_default, option=ORJSON_OPTIONS)
+
+
+def accepted_encodings(request: Request) -> set:
+    """Content codings the client accepts with a non-zero q value."""
+    accepted = set()
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, *params = [p.strip() for p in part.split(";")]
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(name.lower())
+    return accepted
+
+
+def encode_body(request: Request, body: bytes):
+    """Compress body for the client (brotli, else gzip) above COMPRESS_MIN_BYTES.
+
+    Returns (body, content_encoding or None).
+    """
+    if len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    accepted = accepted_encodings(request)
+    if brotli is not None and "br" in accepted:
+        return brotli.compress(body, quality=BROTLI_QUALITY), "br"
+    if "gzip" in accepted:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL), "gzip"
+    return body, None
+
+
+def json_response(request: Request, content, status_code: int = 200, headers: dict = None) -> Response:
+    """Fast path for large payloads we built ourselves.
+
+    Skips Pydantic re-validation and FastAPI's jsonable_encoder, serializes with
+    orjson and compresses per Accept-Encoding.
+    """
+    body, encoding = encode_body(request, dumps(content))
+    response_headers = dict(headers or {})
+    response_headers["Vary"] = "Accept-Encoding"
+    if encoding:
+        response_headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=response_headers)
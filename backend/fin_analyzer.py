@@ -1,60 +1,99 @@
 import os
-from groq import Groq
+from groq import AsyncGroq
 from dotenv import load_dotenv
 import logging
-import time
+import asyncio
+from upstream import provider
+from fundamentals_store import Statement, format_amount, format_change
+from shared_cache import SharedTTLCache, STALE_SECONDS
+from revalidate import stale_while_revalidate
+from ttl_policy import ttl_rule
+from singleflight import coalesce
+from llm import complete
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# Cache key prefix -> freshness policy (see ttl_policy.py)
+CACHE_TTLS = {
+    "fundamentals_": ttl_rule("narrative"),
+}
+
 class FinAnalyzerAgent:
     def __init__(self):
         groq_api_key = os.getenv("GROQ_API_KEY")
-        self.groq_client = Groq(api_key=groq_api_key) if groq_api_key else None
+        self.groq_client = AsyncGroq(api_key=groq_api_key) if groq_api_key else None
         logger.info(f"Groq API key loaded: {'Yes' if groq_api_key else 'No'}")
         if not self.groq_client:
             raise ValueError("Missing GROQ_API_KEY in .env file")
+        self.cache = SharedTTLCache("fin_analyzer", maxsize=100, ttl=3600, stale_ttl=STALE_SECONDS, ttls=CACHE_TTLS)
 
-    def analyze_fundamentals(self, ticker, fundamentals, retries=3):
+    @stale_while_revalidate("fundamentals_{ticker}")
+    @coalesce("fundamentals_analysis")
+    async def analyze_fundamentals(self, ticker, fundamentals, retries=3, on_token=None):
         logger.info(f"Analyzing fundamentals for {ticker}")
+        cache_key = f"fundamentals_{ticker}"
+        cached = await self.cache.aget(cache_key)
+        if cached is not None:
+            logger.info(f"Returning cached fundamentals analysis for {ticker}")
+            return cached
+
         if isinstance(fundamentals, str):
             return f"Error: {fundamentals}"
 
-        metrics = {
-            "Market Cap": fundamentals.get("marketCapitalization", "N/A"),
-            "P/E Ratio": fundamentals.get("peTTM", "N/A"),
-            "EPS": fundamentals.get("epsTTM", "N/A"),
-            "Dividend Yield": fundamentals.get("dividendYieldTTM", "N/A"),
-            "ROE": fundamentals.get("roeTTM", "N/A")
-        }
-        prompt = (
-            f"Analyze the financial health of {ticker} based on the following metrics:\n"
-            f"- Market Cap: {metrics['Market Cap']}M\n"
-            f"- P/E Ratio: {metrics['P/E Ratio']}\n"
-            f"- EPS: {metrics['EPS']}\n"
-            f"- Dividend Yield: {metrics['Dividend Yield']}%\n"
-            f"- ROE: {metrics['ROE']}%\n"
-            "Provide a concise analysis (100-150 words) on valuation, profitability, and investment suitability."
-        )
-        for attempt in range(retries):
-            try:
-                response = self.groq_client.chat.completions.create(
-                    messages=[{"role": "user", "content": prompt}],
-                    model="llama-3.3-70b-versatile",
-                    max_tokens=200
-                )
-                analysis = response.choices[0].message.content
-                logger.info(f"Fundamentals analysis completed for {ticker}")
-                return analysis
-            except Exception as e:
-                logger.error(f"Attempt {attempt + 1} failed: {str(e)}")
-                if attempt < retries - 1:
-                    time.sleep(2 ** attempt)
+        if isinstance(fundamentals, Statement):
+            prompt = self.statement_prompt(ticker, fundamentals)
+        else:
+            metrics = {
+                "Market Cap": fundamentals.get("marketCapitalization", "N/A"),
+                "P/E Ratio": fundamentals.get("peTTM", "N/A"),
+                "EPS": fundamentals.get("epsTTM", "N/A"),
+                "Dividend Yield": fundamentals.get("dividendYieldTTM", "N/A"),
+                "ROE": fundamentals.get("roeTTM", "N/A")
+            }
+            prompt = (
+                f"Analyze the financial health of {ticker} based on the following metrics:\n"
+                f"- Market Cap: {metrics['Market Cap']}M\n"
+                f"- P/E Ratio: {metrics['P/E Ratio']}\n"
+                f"- EPS: {metrics['EPS']}\n"
+                f"- Dividend Yield: {metrics['Dividend Yield']}%\n"
+                f"- ROE: {metrics['ROE']}%\n"
+                "Provide a concise analysis (100-150 words) on valuation, profitability, and investment suitability."
+            )
+        try:
+            analysis = await provider("groq").call(complete, self.groq_client, prompt, max_tokens=200, on_token=on_token, attempts=retries)
+            await self.cache.aset(cache_key, analysis)
+            logger.info(f"Fundamentals analysis completed for {ticker}")
+            return analysis
+        except Exception as e:
+            logger.error(f"Fundamentals analysis failed for {ticker}: {str(e)}")
         return f"Error analyzing fundamentals for {ticker}."
 
+    @staticmethod
+    def statement_prompt(ticker, income_stmt: Statement, quarters: int = 4):
+        """Prompt from the last `quarters` quarters of the income statement."""
+        recent = income_stmt.last(quarters)
+        lines = []
+        for period in recent.periods:
+            row = recent.row(period)
+            revenue, net_income = row["total_revenue"], row["net_income"]
+            margin = f"{net_income / revenue:.1%}" if revenue and net_income is not None else "N/A"
+            lines.append(
+                f"- {period}: Revenue {format_amount(revenue)}, Gross Profit {format_amount(row['gross_profit'])}, "
+                f"Operating Income {format_amount(row['operating_income'])}, Net Income {format_amount(net_income)} "
+                f"(net margin {margin})\n"
+            )
+        return (
+            f"Analyze the financial health of {ticker} based on its recent quarterly income statements:\n"
+            f"{''.join(lines)}"
+            f"- Revenue growth: QoQ {format_change(income_stmt.growth('total_revenue'))}, "
+            f"YoY {format_change(income_stmt.growth('total_revenue', 4))}\n"
+            "Provide a concise analysis (100-150 words) on growth, profitability, and investment suitability."
+        )
+
 if __name__ == "__main__":
     agent = FinAnalyzerAgent()
     fundamentals = {"marketCapitalization": 1000000, "peTTM": 25.5, "epsTTM": 2.1}
-    print(agent.analyze_fundamentals("TSLA", fundamentals))
\ No newline at end of file
+    print(asyncio.run(agent.analyze_fundamentals("TSLA", fundamentals)))
\ No newline at end of file
@@ -0,0 +1,205 @@
+import logging
+import threading
+import numpy as np
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Our metric name -> yfinance line item / column label, per statement kind
+INCOME_METRICS = {
+    "total_revenue": "TotalRevenue",
+    "net_income": "NetIncome",
+    "gross_profit": "GrossProfit",
+    "operating_income": "OperatingIncome",
+}
+CASH_FLOW_METRICS = {
+    "operating_cash_flow": "OperatingCashFlow",
+    "free_cash_flow": "FreeCashFlow",
+}
+EPS_TREND_FIELDS = {
+    "current": "current",
+    "7_days_ago": "7daysAgo",
+    "30_days_ago": "30daysAgo",
+    "60_days_ago": "60daysAgo",
+    "90_days_ago": "90daysAgo",
+}
+EPS_REVISION_FIELDS = {
+    "up_last_7_days": "upLast7days",
+    "up_last_30_days": "upLast30days",
+    "down_last_7_days": "downLast7days",
+    "down_last_30_days": "downLast30days",
+}
+
+
+def _label(value) -> str:
+    """Case/spacing-insensitive form of a yfinance label ("Total Revenue" == "TotalRevenue")."""
+    return str(value).replace(" ", "").lower()
+
+
+def _period(value) -> str:
+    return str(value.date()) if hasattr(value, "date") else str(value)
+
+
+def _optional(value):
+    return None if np.isnan(value) else float(value)
+
+
+def format_amount(value, decimals: int = 0) -> str:
+    """Prompt formatting for a reported figure; "N/A" when missing."""
+    return "N/A" if value is None else f"{value:,.{decimals}f}"
+
+
+def format_change(change) -> str:
+    return "N/A" if change is None else f"{change:+.1%}"
+
+
+class Statement:
+    """One statement for one ticker as a periods × metrics float64 array.
+
+    Dated statements (income, cash flow) keep periods as YYYY-MM-DD strings,
+    oldest first; estimate tables (EPS trend/revisions) keep yfinance's horizon
+    labels ("0q", "+1q", "0y", "+1y"). Unreported values are NaN.
+    """
+
+    def __init__(self, periods, metrics, values):
+        self.periods = np.asarray(periods, dtype=str)
+        self.metrics = tuple(metrics)
+        self.values = np.asarray(values, dtype=np.float64).reshape(len(self.periods), len(self.metrics))
+        self._columns = {m: i for i, m in enumerate(self.metrics)}
+
+    @classmethod
+    def empty(cls, metrics=()):
+        return cls([], metrics, np.empty((0, len(metrics))))
+
+    @classmethod
+    def from_frame(cls, frame, fields: dict, dated: bool = True):
+        """Build from a yfinance frame, keeping only `fields` (our name -> label).
+
+        Dated statements come as line items × period columns; estimate tables
+        as horizons × field columns.
+        """
+        if frame is None or getattr(frame, "empty", True):
+            return cls.empty(tuple(fields))
+        if dated:
+            frame = frame.T
+        grid = frame.to_numpy(dtype=np.float64, na_value=np.nan)
+        columns = {_label(c): i for i, c in enumerate(frame.columns)}
+        values = np.full((len(frame.index), len(fields)), np.nan)
+        for j, label in enumerate(fields.values()):
+            i = columns.get(_label(label))
+            if i is not None:
+                values[:, j] = grid[:, i]
+        periods = np.array([_period(p) for p in frame.index], dtype=str)
+        if dated:
+            # Oldest first, without periods where none of our metrics was reported
+            keep = ~np.isnan(values).all(axis=1)
+            order = np.argsort(periods[keep], kind="stable")
+            periods, values = periods[keep][order], values[keep][order]
+        return cls(periods, tuple(fields), values)
+
+    def __len__(self):
+        return len(self.periods)
+
+    @property
+    def latest_period(self):
+        return str(self.periods[-1]) if len(self.periods) else None
+
+    def column(self, metric: str):
+        """All values of metric, one per period (NaN where missing)."""
+        return self.values[:, self._columns[metric]]
+
+    def value(self, period: str, metric: str):
+        rows = np.flatnonzero(self.periods == period)
+        if not len(rows) or metric not in self._columns:
+            return None
+        return _optional(self.values[rows[0], self._columns[metric]])
+
+    def latest(self, metric: str):
+        """Most recent reported value of metric, or None."""
+        if metric not in self._columns:
+            return None
+        column = self.column(metric)
+        reported = column[~np.isnan(column)]
+        return float(reported[-1]) if len(reported) else None
+
+    def last(self, n: int):
+        """The n most recent periods."""
+        return Statement(self.periods[-n:], self.metrics, self.values[-n:])
+
+    def growth(self, metric: str, lag: int = 1):
+        """Change of the latest period against `lag` periods earlier (1 = QoQ, 4 = YoY), or None."""
+        if metric not in self._columns or len(self) <= lag:
+            return None
+        column = self.column(metric)
+        current, previous = column[-1], column[-1 - lag]
+        if np.isnan(current) or np.isnan(previous) or previous == 0:
+            return None
+        return float((current - previous) / abs(previous))
+
+    def row(self, period: str):
+        """{metric: value} for one period."""
+        return {m: self.value(period, m) for m in self.metrics}
+
+    def to_columnar(self):
+        """{period: [...], <metric>: [...]} as plain lists, None where unreported."""
+        columns = {"period": self.periods.tolist()}
+        for j, metric in enumerate(self.metrics):
+            column = self.values[:, j]
+            columns[metric] = np.where(np.isnan(column), None, column).tolist()
+        return columns
+
+
+class FundamentalsStore:
+    """Latest statement per (ticker, kind), for lookups across tickers.
+
+    Kinds are "income_statement", "cash_flow", "eps_trend" and "eps_revision".
+    The agents' caches hold the same Statement objects; this only indexes them.
+    """
+
+    def __init__(self):
+        self._statements = {}
+        self._lock = threading.Lock()
+
+    def put(self, ticker: str, kind: str, statement: Statement):
+        with self._lock:
+            self._statements[(ticker, kind)] = statement
+
+    def get(self, ticker: str, kind: str):
+        with self._lock:
+            return self._statements.get((ticker, kind))
+
+    def tickers(self, kind: str):
+        with self._lock:
+            return sorted(t for t, k in self._statements if k == kind)
+
+    def latest(self, kind: str, metric: str, tickers=None):
+        """{ticker: most recent value of metric} for the given (default: all stored) tickers."""
+        tickers = tickers if tickers is not None else self.tickers(kind)
+        result = {}
+        for ticker in tickers:
+            statement = self.get(ticker, kind)
+            result[ticker] = statement.latest(metric) if statement is not None else None
+        return result
+
+    def panel(self, kind: str, metric: str, tickers, periods: int = 4):
+        """tickers × periods array of metric over each ticker's last `periods`
+        periods, right-aligned (last column = latest) and NaN-padded."""
+        grid = np.full((len(tickers), periods), np.nan)
+        for i, ticker in enumerate(tickers):
+            statement = self.get(ticker, kind)
+            if statement is None or metric not in statement.metrics:
+                continue
+            column = statement.last(periods).column(metric)
+            if len(column):
+                grid[i, -len(column):] = column
+        return grid
+
+    def stats(self):
+        with self._lock:
+            kinds = {}
+            for _, kind in self._statements:
+                kinds[kind] = kinds.get(kind, 0) + 1
+        return {"statements": kinds}
+
+
+fundamentals_store = FundamentalsStore()
@@ -2,13 +2,23 @@ import os
 from market_context import MarketContextAgent
 from stock_analyzer import StockAnalyzerAgent
 from fin_analyzer import FinAnalyzerAgent
+from dag import DagExecutor, Node
+from singleflight import coalesce
+from price_series import PriceSeries
+from fundamentals_store import Statement
 import logging
 import json
+import time
+import asyncio
+from blocking import run_blocking
 from datetime import datetime
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
+# Sources fetched alongside (not before) the income statement in analyze_stock
+MARKET_DATA_SOURCES = ["prices", "cash_flow", "eps_data", "analyst_recommendations"]
+
 class HeadAgent:
     def __init__(self):
         logger.info("Initializing HeadAgent")
@@ -27,52 +37,144 @@ class HeadAgent:
         base_ticker = ticker.split('.')[0] if '.' in ticker else ticker
         return base_ticker.isalnum() and 1 <= len(base_ticker) <= 10 and (ticker.endswith(('.NS', '.BO')) or len(ticker) == len(base_ticker))
 
-    def analyze_stock(self, ticker):
+    @coalesce("analysis")
+    async def analyze_stock(self, ticker):
+        return await self._run_analysis(ticker)
+
+    async def stream_analysis(self, ticker, emit):
+        """Run analyze_stock, reporting progress through `emit(event, payload)`.
+
+        Events: "data" (prices, technicals, fundamentals and confidence, as soon
+        as they are fetched), "token" ({section, text} LLM deltas) and "section"
+        ({section, text} once a section's text is final). Not coalesced as a
+        whole; the LLM sections are, and a viewer joining a section already
+        being streamed gets its tokens so far replayed, then the rest live.
+        """
+        return await self._run_analysis(ticker, emit=emit)
+
+    async def _run_analysis(self, ticker, emit=None):
         if not self.is_valid_ticker(ticker):
             logger.error(f"Invalid ticker: {ticker}")
             raise ValueError("Invalid ticker symbol. Use 1-10 alphanumeric characters, optionally with .NS or .BO suffix for Indian stocks.")
 
         logger.info(f"Starting analysis for {ticker}")
         try:
-            market_context = self.market_context_agent.get_market_context(ticker)
-            stock_result = self.stock_analyzer_agent.analyze_stock(ticker, market_context)
+            start = time.perf_counter()
+            results, timings = await DagExecutor(self.build_analysis_graph(ticker, emit)).run()
+            stock_result = results["stock_analysis"]
             if "error" in stock_result:
                 logger.error(f"Stock analysis failed for {ticker}: {stock_result['error']}")
                 return {"error": stock_result["error"]}
 
-            fundamentals_analysis = self.fin_analyzer_agent.analyze_fundamentals(ticker, stock_result.get("income_statement", {}))
+            timings["total"] = round(time.perf_counter() - start, 3)
             result = {
                 "ticker": ticker,
                 "timestamp": datetime.utcnow().isoformat(),
-                "market_context": market_context,
+                "market_context": results["market_context"],
                 "stock_analysis": stock_result["analysis"],
                 "confidence": stock_result["confidence"],
                 "prices": stock_result["prices"],
                 "technicals": stock_result["technicals"],
                 "fundamentals": stock_result["income_statement"],
-                "fundamentals_analysis": fundamentals_analysis
+                "fundamentals_analysis": results["fundamentals_analysis"],
+                "timings": timings,
+                "freshness": await self.stock_analyzer_agent.freshness("stock", ticker)
             }
-            self.save_analysis(result)
-            logger.info(f"Analysis completed for {ticker}")
+            await run_blocking(self.save_analysis, result)
+            logger.info(f"Analysis completed for {ticker} in {timings['total']:.2f}s")
             return result
         except Exception as e:
             logger.error(f"Analysis failed for {ticker}: {str(e)}")
             return {"error": f"Analysis failed: {str(e)}"}
 
+    def build_analysis_graph(self, ticker, emit=None):
+        """Nodes for analyze_stock; independent fetches and LLM calls run in parallel.
+
+        market_context, income_statement and market_data start immediately.
+        fundamentals_analysis only waits for the income statement, and
+        stock_analysis waits for everything it puts in its prompt.
+        """
+        stock_agent = self.stock_analyzer_agent
+
+        def token_sink(section):
+            if emit is None:
+                return None
+
+            async def on_token(text):
+                await emit("token", {"section": section, "text": text})
+            return on_token
+
+        async def section_done(section, text):
+            if emit is not None:
+                await emit("section", {"section": section, "text": text})
+
+        async def market_context():
+            context = await self.market_context_agent.get_market_context(ticker, on_token=token_sink("market_context"))
+            await section_done("market_context", context)
+            return context
+
+        async def income_statement():
+            data = await stock_agent.fetch_sources(ticker, sources=["income_statement"])
+            return data["income_statement"]
+
+        async def market_data():
+            return await stock_agent.fetch_sources(ticker, sources=MARKET_DATA_SOURCES)
+
+        async def figures(income_statement, market_data):
+            prices = market_data["prices"] if not isinstance(market_data["prices"], str) else PriceSeries.empty()
+            result = {
+                "prices": prices,
+                "technicals": stock_agent.calculate_technicals(prices),
+                "fundamentals": income_statement if not isinstance(income_statement, str) else {},
+                "confidence": stock_agent.calculate_confidence(prices, market_data["analyst_recommendations"]),
+            }
+            if emit is not None:
+                await emit("data", result)
+            return result
+
+        async def stock_analysis(market_context, income_statement, market_data):
+            data = dict(market_data, income_statement=income_statement)
+            result = await stock_agent.analyze_stock(ticker, market_context, data=data, on_token=token_sink("stock_analysis"))
+            if "analysis" in result:
+                await section_done("stock_analysis", result["analysis"])
+            return result
+
+        async def fundamentals_analysis(income_statement):
+            fundamentals = income_statement if not isinstance(income_statement, str) else {}
+            analysis = await self.fin_analyzer_agent.analyze_fundamentals(ticker, fundamentals, on_token=token_sink("fundamentals_analysis"))
+            await section_done("fundamentals_analysis", analysis)
+            return analysis
+
+        return [
+            Node("market_context", market_context),
+            Node("income_statement", income_statement),
+            Node("market_data", market_data),
+            Node("figures", figures, inputs=("income_statement", "market_data")),
+            Node("stock_analysis", stock_analysis, inputs=("market_context", "income_statement", "market_data")),
+            Node("fundamentals_analysis", fundamentals_analysis, inputs=("income_statement",)),
+        ]
+
+    @staticmethod
+    def _json_default(obj):
+        if isinstance(obj, PriceSeries):
+            return obj.to_records()
+        if isinstance(obj, Statement):
+            return obj.to_columnar()
+        return str(obj)
+
     def save_analysis(self, result):
         if "error" in result:
             return
         filename = f"analysis_{result['ticker']}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.json"
         try:
             with open(filename, "w") as f:
-                json.dump(result, f, indent=2)
+                json.dump(result, f, indent=2, default=self._json_default)
             logger.info(f"Saved analysis to {filename}")
         except Exception as e:
             logger.error(f"Failed to save analysis: {str(e)}")
 
 if __name__ == "__main__":
-    import sys
     head_agent = HeadAgent()
     ticker = input("Enter stock ticker (e.g., TSLA, RELIANCE.NS): ").strip().upper()
-    result = head_agent.analyze_stock(ticker)
-    print(json.dumps(result, indent=2))
\ No newline at end of file
+    result = asyncio.run(head_agent.analyze_stock(ticker))
+    print(json.dumps(result, indent=2, default=HeadAgent._json_default))
\ No newline at end of file
@@ -0,0 +1,62 @@
+import uuid
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response
+from shared_cache import REDIS_URL
+
+# Without a shared tier each process has its own cache versions, so a boot id
+# keeps one process's ETags from validating against another's data. With one,
+# versions come from the shared tier and every worker must agree on ETags.
+BOOT_ID = None if REDIS_URL else uuid.uuid4().hex[:8]
+
+# Daily bars only change when a new bar closes; browsers and proxies may reuse a
+# response for a few minutes and serve it stale while they revalidate.
+PRICES_CACHE_CONTROL = "public, max-age=300, stale-while-revalidate=600"
+
+
+def make_etag(*parts) -> str:
+    if BOOT_ID is not None:
+        parts = (BOOT_ID,) + parts
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()[:20]
+    # Weak: the same entity may be sent gzip/brotli-encoded
+    return f'W/"{digest}"'
+
+
+def bar_last_modified(date_str: str) -> datetime:
+    """Last-Modified for a series whose newest bar is dated YYYY-MM-DD."""
+    return datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+
+
+def validator_headers(etag: str, last_modified: datetime, cache_control: str = PRICES_CACHE_CONTROL) -> dict:
+    return {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": cache_control,
+    }
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since as in RFC 9110 section 13.2.2."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        opaque = etag[2:] if etag.startswith("W/") else etag
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return any((tag[2:] if tag.startswith("W/") else tag) == opaque for tag in candidates)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified <= since
+    return False
+
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
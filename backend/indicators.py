@@ -0,0 +1,272 @@
+import logging
+import numpy as np
+from price_series import PriceSeries
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS = 252
+# Largest decay^-k factor used when running an EMA blockwise in closed form;
+# keeps the cumulative sums well inside float64 precision.
+EMA_BLOCK_RANGE = 1e6
+
+# name -> default parameters, in the order they are given in "name:p1:p2"
+INDICATOR_DEFAULTS = {
+    "sma": (20,),
+    "ema": (20,),
+    "rsi": (14,),
+    "macd": (12, 26, 9),
+    "bbands": (20, 2.0),
+    "atr": (14,),
+    "obv": (),
+    "volatility": (20,),
+}
+DEFAULT_INDICATORS = "sma:20,sma:50,ema:20,rsi:14,macd,bbands:20:2,atr:14,obv,volatility:20"
+MAX_WINDOW = 1000
+
+
+def _recursive_filter(x, alpha: float, seed=0.0):
+    """y[i] = alpha * x[i] + (1 - alpha) * y[i-1] along the last axis, y[-1] = seed.
+
+    Runs in closed form on blocks: within a block y[j] = d^(j+1) * (seed +
+    alpha * sum_{i<=j} x[i] / d^(i+1)) with d = 1 - alpha, so each block is a
+    cumsum and the Python loop only steps once per block.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    if alpha >= 1:
+        return x.copy()
+    n = x.shape[-1]
+    decay = 1.0 - alpha
+    block = max(1, int(np.log(EMA_BLOCK_RANGE) / -np.log(decay)))
+    powers = decay ** np.arange(1, min(block, n) + 1)
+    out = np.empty(x.shape)
+    prev = np.broadcast_to(np.asarray(seed, dtype=np.float64), x.shape[:-1])[..., None]
+    for start in range(0, n, block):
+        chunk = x[..., start:start + block]
+        p = powers[:chunk.shape[-1]]
+        out[..., start:start + chunk.shape[-1]] = p * (prev + alpha * np.cumsum(chunk / p, axis=-1))
+        prev = out[..., start + chunk.shape[-1] - 1:start + chunk.shape[-1]]
+    return out
+
+
+def _window_sums(values, window: int):
+    """(sum, number of non-NaN values) over each trailing window, from position window-1."""
+    valid = ~np.isnan(values)
+    zero = np.zeros(values.shape[:-1] + (1,))
+    sums = np.cumsum(np.concatenate((zero, np.where(valid, values, 0.0)), axis=-1), axis=-1)
+    counts = np.cumsum(np.concatenate((zero, valid), axis=-1), axis=-1)
+    return sums[..., window:] - sums[..., :-window], counts[..., window:] - counts[..., :-window]
+
+
+def _smooth(values, window: int, alpha: float):
+    """Exponential smoothing seeded with the SMA of the first `window` valid
+    values; NaN until then. Leading NaNs (a MACD line, or tickers listed later
+    than others in a screener matrix) are skipped row by row."""
+    values = np.asarray(values, dtype=np.float64)
+    n = values.shape[-1]
+    if n == 0:
+        return values.copy()
+    valid = ~np.isnan(values)
+    # Seed position per row: window - 1 bars after its first value
+    first = np.where(valid.any(axis=-1), valid.argmax(axis=-1), n)
+    seed_at = first + window - 1
+    positions = np.arange(n)
+    filled = np.where(valid, values, 0.0)
+    sums = np.cumsum(filled, axis=-1)
+    seeded = seed_at < n
+    at = np.minimum(seed_at, n - 1)[..., None]
+    seed = (np.take_along_axis(sums, at, axis=-1)[..., 0] - np.where(
+        first > 0, np.take_along_axis(sums, np.maximum(first - 1, 0)[..., None], axis=-1)[..., 0], 0.0)) / window
+    # Zero input before the seed and inject the seed so that y[seed_at] == seed
+    x = np.where(positions < seed_at[..., None], 0.0, filled)
+    np.put_along_axis(x, at, np.where(seeded, seed / alpha, 0.0)[..., None], axis=-1)
+    out = _recursive_filter(x, alpha)
+    out[positions < seed_at[..., None]] = np.nan
+    out[~np.broadcast_to(seeded[..., None], out.shape)] = np.nan
+    return out
+
+
+def sma(values, window: int):
+    """Simple moving average via running sums along the last axis; NaN until a
+    full window of values is available."""
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(values.shape, np.nan)
+    if values.shape[-1] < window:
+        return out
+    sums, counts = _window_sums(values, window)
+    out[..., window - 1:] = np.where(counts == window, sums / window, np.nan)
+    return out
+
+
+def ema(values, window: int):
+    """Exponential moving average (alpha = 2 / (window + 1)), seeded with the SMA."""
+    return _smooth(values, window, 2.0 / (window + 1))
+
+
+def wilder(values, window: int):
+    """Wilder's smoothing (alpha = 1 / window), as used by RSI and ATR."""
+    return _smooth(values, window, 1.0 / window)
+
+
+def rolling_std(values, window: int, ddof: int = 0):
+    """Rolling standard deviation from running sums of x and x^2 (centred first
+    to limit cancellation)."""
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(values.shape, np.nan)
+    if values.shape[-1] < window or window <= ddof or not np.isfinite(values).any():
+        return out
+    valid = ~np.isnan(values)
+    mean = np.where(valid, values, 0.0).sum(axis=-1, keepdims=True) / np.maximum(valid.sum(axis=-1, keepdims=True), 1)
+    centred = values - mean
+    total, counts = _window_sums(centred, window)
+    squares, _ = _window_sums(centred * centred, window)
+    variance = (squares - total * total / window) / (window - ddof)
+    out[..., window - 1:] = np.where(counts == window, np.sqrt(np.maximum(variance, 0.0)), np.nan)
+    return out
+
+
+def rsi(close, window: int = 14):
+    """Wilder RSI; the first value is at position `window`."""
+    close = np.asarray(close, dtype=np.float64)
+    out = np.full(close.shape, np.nan)
+    if close.shape[-1] <= window:
+        return out
+    deltas = np.diff(close, axis=-1)
+    avg_gain = wilder(np.maximum(deltas, 0.0), window)
+    avg_loss = wilder(np.maximum(-deltas, 0.0), window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    values = np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), values)
+    out[..., 1:] = np.where(np.isnan(avg_gain), np.nan, values)
+    return out
+
+
+def macd(close, fast: int = 12, slow: int = 26, signal: int = 9):
+    """(macd line, signal line, histogram)."""
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(close, window: int = 20, width: float = 2.0):
+    """(middle, upper, lower) bands at `width` population standard deviations."""
+    middle = sma(close, window)
+    spread = width * rolling_std(close, window)
+    return middle, middle + spread, middle - spread
+
+
+def true_range(high, low, close):
+    high, low, close = (np.asarray(a, dtype=np.float64) for a in (high, low, close))
+    if not len(close):
+        return np.empty(0)
+    prev_close = np.concatenate(([close[0]], close[:-1]))
+    return np.maximum(high, prev_close) - np.minimum(low, prev_close)
+
+
+def atr(high, low, close, window: int = 14):
+    return wilder(true_range(high, low, close), window)
+
+
+def obv(close, volume):
+    """On-balance volume, starting from 0."""
+    close = np.asarray(close, dtype=np.float64)
+    if not len(close):
+        return np.empty(0)
+    direction = np.sign(np.diff(close))
+    return np.concatenate(([0.0], np.cumsum(direction * np.asarray(volume, dtype=np.float64)[1:])))
+
+
+def volatility(close, window: int = 20, periods_per_year: int = TRADING_DAYS):
+    """Annualised rolling standard deviation of daily log returns."""
+    close = np.asarray(close, dtype=np.float64)
+    out = np.full(close.shape, np.nan)
+    if close.shape[-1] <= window:
+        return out
+    returns = np.diff(np.log(close), axis=-1)
+    out[..., 1:] = rolling_std(returns, window, ddof=1) * np.sqrt(periods_per_year)
+    return out
+
+
+def parse_indicators(spec: str):
+    """Parse "sma:20,macd:12:26:9,rsi" into [(name, params), ...].
+
+    Raises ValueError for unknown names, bad parameters (windows outside
+    1..MAX_WINDOW, band widths that are not finite and positive) or too many.
+    """
+    parsed = []
+    for part in (p.strip() for p in spec.split(",")):
+        if not part:
+            continue
+        name, *raw = part.lower().split(":")
+        if name not in INDICATOR_DEFAULTS:
+            raise ValueError(f"Unknown indicator '{name}'. Use one of: {', '.join(INDICATOR_DEFAULTS)}")
+        defaults = INDICATOR_DEFAULTS[name]
+        if len(raw) > len(defaults):
+            raise ValueError(f"Indicator '{name}' takes at most {len(defaults)} parameters")
+        try:
+            params = tuple(type(d)(r) for d, r in zip(defaults, raw)) + defaults[len(raw):]
+        except ValueError:
+            raise ValueError(f"Invalid parameters for indicator '{part}'")
+        windows = [p for p, d in zip(params, defaults) if isinstance(d, int)]
+        if any(w < 1 or w > MAX_WINDOW for w in windows):
+            raise ValueError(f"Windows for '{part}' must be between 1 and {MAX_WINDOW}")
+        widths = [p for p, d in zip(params, defaults) if isinstance(d, float)]
+        if any(not np.isfinite(w) or w <= 0 for w in widths):
+            raise ValueError(f"Band width for '{part}' must be a finite number greater than 0")
+        parsed.append((name, params))
+    if not parsed:
+        raise ValueError("No indicators requested")
+    return parsed
+
+
+def compute(series: PriceSeries, requested):
+    """Full series for each (name, params) in `requested`, keyed by column name
+    (e.g. "sma_20", "macd_signal", "bb_upper_20"). Arrays align with series.dates."""
+    columns = {}
+    for name, params in requested:
+        if name == "sma":
+            columns[f"sma_{params[0]}"] = sma(series.close, params[0])
+        elif name == "ema":
+            columns[f"ema_{params[0]}"] = ema(series.close, params[0])
+        elif name == "rsi":
+            columns[f"rsi_{params[0]}"] = rsi(series.close, params[0])
+        elif name == "macd":
+            suffix = "" if params == INDICATOR_DEFAULTS["macd"] else "_" + "_".join(map(str, params))
+            line, signal_line, histogram = macd(series.close, *params)
+            columns[f"macd{suffix}"] = line
+            columns[f"macd_signal{suffix}"] = signal_line
+            columns[f"macd_hist{suffix}"] = histogram
+        elif name == "bbands":
+            window, width = params
+            middle, upper, lower = bollinger(series.close, window, width)
+            suffix = f"{window}" if width == INDICATOR_DEFAULTS["bbands"][1] else f"{window}_{width:g}"
+            columns[f"bb_middle_{suffix}"] = middle
+            columns[f"bb_upper_{suffix}"] = upper
+            columns[f"bb_lower_{suffix}"] = lower
+        elif name == "atr":
+            columns[f"atr_{params[0]}"] = atr(series.high, series.low, series.close, params[0])
+        elif name == "obv":
+            columns["obv"] = obv(series.close, series.volume)
+        elif name == "volatility":
+            columns[f"volatility_{params[0]}"] = volatility(series.close, params[0])
+    return columns
+
+
+def lookback(requested) -> int:
+    """Bars needed before the first value of every requested indicator is defined."""
+    needed = 1
+    for name, params in requested:
+        if name == "macd":
+            needed = max(needed, params[1] + params[2])
+        elif name in ("sma", "bbands", "atr"):
+            needed = max(needed, params[0])
+        elif name in ("ema", "rsi", "volatility"):
+            needed = max(needed, params[0] + 1)
+    return needed
+
+
+def latest(values):
+    """Last defined value of an indicator series, or None."""
+    values = np.asarray(values, dtype=np.float64)
+    defined = values[~np.isnan(values)]
+    return float(defined[-1]) if len(defined) else None
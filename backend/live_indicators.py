@@ -0,0 +1,303 @@
+import time
+import logging
+import threading
+from collections import deque
+import numpy as np
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Daily-bar indicators carried on live snapshots; the live price stands in for
+# today's close. Extremes cover 20 sessions and 52 weeks.
+LIVE_EMA_WINDOWS = (12, 26)
+LIVE_RSI_WINDOW = 14
+LIVE_EXTREME_WINDOWS = (20, 252)
+# Calendar days of stored bars used to seed a ticker
+SEED_DAYS = 400
+# Committed closes needed before a ticker counts as seeded (the slowest EMA);
+# until then, and after a session change until the stored close of the ended
+# session is committed, seeding and bar prefetches are retried at most every
+# SEED_RETRY_SECONDS
+SEED_MIN_BARS = max(max(LIVE_EMA_WINDOWS), LIVE_RSI_WINDOW + 1)
+SEED_RETRY_SECONDS = 60
+
+
+class StreamingEMA:
+    """EMA over committed closes (seeded with the SMA of the first `window`),
+    with peek() giving the value if the live price closed the current bar."""
+
+    def __init__(self, window: int, alpha: float = None):
+        self.window = window
+        self.alpha = alpha if alpha is not None else 2.0 / (window + 1)
+        self.value = None
+        self._count = 0
+        self._sum = 0.0
+
+    def push(self, x: float):
+        if self.value is not None:
+            self.value += self.alpha * (x - self.value)
+            return
+        self._count += 1
+        self._sum += x
+        if self._count == self.window:
+            self.value = self._sum / self.window
+
+    def peek(self, x: float):
+        if self.value is not None:
+            return self.value + self.alpha * (x - self.value)
+        if self._count + 1 == self.window:
+            return (self._sum + x) / self.window
+        return None
+
+
+class StreamingRSI:
+    """Wilder RSI over committed closes; peek() includes the live price."""
+
+    def __init__(self, window: int = LIVE_RSI_WINDOW):
+        self.window = window
+        self.last = None
+        self.gain = StreamingEMA(window, alpha=1.0 / window)
+        self.loss = StreamingEMA(window, alpha=1.0 / window)
+
+    def push(self, x: float):
+        if self.last is not None:
+            self.gain.push(max(x - self.last, 0.0))
+            self.loss.push(max(self.last - x, 0.0))
+        self.last = x
+
+    @staticmethod
+    def _rsi(gain, loss):
+        if gain is None or loss is None:
+            return None
+        if loss == 0:
+            return 100.0 if gain > 0 else 50.0
+        return 100.0 - 100.0 / (1.0 + gain / loss)
+
+    def peek(self, x: float):
+        if self.last is None:
+            return None
+        delta = x - self.last
+        return self._rsi(self.gain.peek(max(delta, 0.0)), self.loss.peek(max(-delta, 0.0)))
+
+
+class RollingExtremes:
+    """Min and max over the last `window` closes (live price included), with
+    monotonic deques: amortised O(1) per committed close, O(1) per peek."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self._index = 0
+        self._mins = deque()
+        self._maxs = deque()
+
+    def push(self, x: float):
+        # Committed closes cover window - 1 bars; the live price is the last one
+        first = self._index - (self.window - 2)
+        for queue, worse in ((self._mins, lambda a, b: a >= b), (self._maxs, lambda a, b: a <= b)):
+            while queue and worse(queue[-1][1], x):
+                queue.pop()
+            queue.append((self._index, x))
+            while queue and queue[0][0] < first:
+                queue.popleft()
+        self._index += 1
+
+    def peek(self, x: float):
+        if self._index < self.window - 1:
+            return None, None
+        if not self._mins:
+            return x, x
+        return min(self._mins[0][1], x), max(self._maxs[0][1], x)
+
+
+class SessionVWAP:
+    """Volume-weighted average price of today's intraday bars.
+
+    The newest bar may still be forming, so it is kept apart and replaced when
+    it is seen again; earlier bars are folded into running sums once.
+    """
+
+    def __init__(self):
+        self.session = None
+        self.last_time = None
+        self._pv = 0.0
+        self._volume = 0.0
+        self._current = (0.0, 0.0)
+
+    def update(self, session: str, bar_time, price: float, volume: float):
+        if session != self.session:
+            self.session, self.last_time = session, None
+            self._pv = self._volume = 0.0
+            self._current = (0.0, 0.0)
+        if self.last_time is not None and bar_time < self.last_time:
+            return
+        if self.last_time is not None and bar_time > self.last_time:
+            self._pv += self._current[0]
+            self._volume += self._current[1]
+        self.last_time = bar_time
+        self._current = (price * volume, volume)
+
+    @property
+    def value(self):
+        volume = self._volume + self._current[1]
+        return (self._pv + self._current[0]) / volume if volume > 0 else None
+
+
+class TickerIndicators:
+    """Live indicator state for one ticker.
+
+    Daily closes up to yesterday are committed; today's live price is only
+    peeked, so repeated ticks cost O(1) and never double count. When ticks
+    arrive for a new session, the closes since the last committed one are
+    read from the bar store rather than taken from the last tick seen, so
+    sessions without viewers or ticks before the close cause no drift.
+    """
+
+    def __init__(self, ticker: str):
+        self.ticker = ticker
+        self.emas = {w: StreamingEMA(w) for w in LIVE_EMA_WINDOWS}
+        self.rsi = StreamingRSI(LIVE_RSI_WINDOW)
+        self.extremes = {w: RollingExtremes(w) for w in LIVE_EXTREME_WINDOWS}
+        self.vwap = SessionVWAP()
+        self.last_date = None  # last committed session (YYYY-MM-DD)
+        self.live_date = None
+        self.live_price = None
+        self.closed_session = None  # last session that ended while streamed
+        self.committed = 0
+        self.seeded = False
+        self.seed_attempted = None
+        self.lock = threading.Lock()
+
+    def commit(self, close: float, date: str):
+        for ema in self.emas.values():
+            ema.push(close)
+        self.rsi.push(close)
+        for extremes in self.extremes.values():
+            extremes.push(close)
+        self.committed += 1
+        self.last_date = date
+
+    def seed(self, series, before: str):
+        """Commit stored daily closes dated before `before` (the live session).
+        Seeded once at least SEED_MIN_BARS closes are committed."""
+        dates = series.date_strings()
+        for date, close in zip(dates[dates < before].tolist(), series.close[dates < before].tolist()):
+            if self.last_date is None or date > self.last_date:
+                self.commit(close, date)
+        self.seed_attempted = time.monotonic()
+        self.seeded = self.committed >= SEED_MIN_BARS
+
+    @property
+    def needs_bars(self) -> bool:
+        """Not seeded yet, or the stored close of an ended session is not committed."""
+        behind = self.closed_session is not None and (self.last_date is None or self.last_date < self.closed_session)
+        return not self.seeded or behind
+
+    def on_price(self, price: float, session: str):
+        if self.live_date is not None and session > self.live_date:
+            self.closed_session = self.live_date
+        if self.live_date is None or session >= self.live_date:
+            self.live_date, self.live_price = session, price
+
+    def on_bars(self, hist, session: str):
+        """Feed intraday 1m bars (yfinance frame); only bars at or after the
+        last one seen are read, found by binary search."""
+        close = hist["Close"].to_numpy(dtype=np.float64)
+        volume = np.nan_to_num(hist["Volume"].to_numpy(dtype=np.float64))
+        typical = (hist["High"].to_numpy(dtype=np.float64) + hist["Low"].to_numpy(dtype=np.float64) + close) / 3
+        times = hist.index.asi8
+        start = 0
+        if self.vwap.session == session and self.vwap.last_time is not None:
+            start = int(np.searchsorted(times, self.vwap.last_time))
+        for i in range(start, len(times)):
+            if not np.isnan(typical[i]):
+                self.vwap.update(session, int(times[i]), float(typical[i]), float(volume[i]))
+
+    def snapshot(self):
+        price = self.live_price
+        if price is None:
+            return {}
+        values = {f"ema_{w}": ema.peek(price) for w, ema in self.emas.items()}
+        values[f"rsi_{self.rsi.window}"] = self.rsi.peek(price)
+        values["vwap"] = self.vwap.value if self.vwap.session == self.live_date else None
+        for w, extremes in self.extremes.items():
+            values[f"low_{w}"], values[f"high_{w}"] = extremes.peek(price)
+        return {name: round(v, 2) if v is not None else None for name, v in values.items()}
+
+
+class LiveIndicators:
+    """Per-ticker TickerIndicators, created and seeded on first use."""
+
+    def __init__(self, seed_days: int = SEED_DAYS):
+        self.seed_days = seed_days
+        self._tickers = {}
+        self._prefetched = {}  # ticker -> monotonic time of the last bar prefetch
+        self._lock = threading.Lock()
+
+    def get(self, ticker: str) -> TickerIndicators:
+        with self._lock:
+            state = self._tickers.get(ticker)
+            if state is None:
+                state = self._tickers[ticker] = TickerIndicators(ticker)
+            return state
+
+    def update(self, ticker: str, hist, bar_store=None):
+        """Fold a fresh intraday frame into the ticker's state; returns the
+        live indicator values. Blocking (seeding may read the bar store)."""
+        close = hist["Close"].dropna()
+        if not len(close):
+            return {}
+        session = str(close.index[-1].date())
+        state = self.get(ticker)
+        with state.lock:
+            state.on_price(float(close.iloc[-1]), session)
+            retry = state.seed_attempted is None or time.monotonic() - state.seed_attempted >= SEED_RETRY_SECONDS
+            if state.needs_bars and bar_store is not None and retry:
+                start = state.last_date or str(np.datetime64(session, "D") - np.timedelta64(self.seed_days, "D"))
+                try:
+                    state.seed(bar_store.load(ticker, start=start), before=session)
+                    if not state.seeded:
+                        logger.info(f"Only {state.committed} stored closes for {ticker}; will retry seeding live indicators")
+                    elif state.needs_bars:
+                        logger.info(f"Stored closes for {ticker} end at {state.last_date}; will retry for {state.closed_session}")
+                    else:
+                        logger.info(f"Seeded live indicators for {ticker} with {state.committed} closes through {state.last_date}")
+                except Exception as e:
+                    state.seed_attempted = time.monotonic()
+                    logger.error(f"Seeding live indicators for {ticker} failed: {e}")
+            state.on_bars(hist, session)
+            return state.snapshot()
+
+    def unseeded(self, tickers):
+        """Tickers whose state needs stored bars and whose last prefetch was at
+        least SEED_RETRY_SECONDS ago; they are marked as prefetched now."""
+        now = time.monotonic()
+        with self._lock:
+            due = [
+                t for t in dict.fromkeys(tickers)
+                if (t not in self._tickers or self._tickers[t].needs_bars)
+                and (t not in self._prefetched or now - self._prefetched[t] >= SEED_RETRY_SECONDS)
+            ]
+            for t in due:
+                self._prefetched[t] = now
+            return due
+
+    async def prefetch(self, stock_agent, tickers):
+        """Have stored daily bars for tickers that are not seeded yet (or miss
+        an ended session's close), via the stock agent's bulk refresh. Each
+        ticker is attempted at most once per SEED_RETRY_SECONDS."""
+        if stock_agent is None:
+            return
+        missing = self.unseeded(tickers)
+        if not missing:
+            return
+        try:
+            await stock_agent.prefetch_price_series(missing, days=self.seed_days)
+        except Exception as e:
+            logger.error(f"Prefetching seed bars for {', '.join(missing)} failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {"tickers": len(self._tickers), "seeded": sum(s.seeded for s in self._tickers.values())}
+
+
+live_indicators = LiveIndicators()
@@ -0,0 +1,37 @@
+import logging
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+GROQ_MODEL = "llama-3.3-70b-versatile"
+
+
+async def complete(groq_client, prompt, max_tokens, on_token=None):
+    """Run one Groq chat completion and return its text.
+
+    When `on_token` (an async callable) is given the completion is streamed
+    and each text delta is passed to it as it arrives.
+    """
+    if on_token is None:
+        response = await groq_client.chat.completions.create(
+            messages=[{"role": "user", "content": prompt}],
+            model=GROQ_MODEL,
+            max_tokens=max_tokens
+        )
+        return response.choices[0].message.content
+
+    stream = await groq_client.chat.completions.create(
+        messages=[{"role": "user", "content": prompt}],
+        model=GROQ_MODEL,
+        max_tokens=max_tokens,
+        stream=True
+    )
+    parts = []
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        text = chunk.choices[0].delta.content or ""
+        if text:
+            parts.append(text)
+            await on_token(text)
+    return "".join(parts)
@@ -1,12 +1,27 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, BackgroundTasks, WebSocket, Query
+from fastapi import FastAPI, HTTPException, UploadFile, File, BackgroundTasks, WebSocket, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from head_agent import HeadAgent
-import time
-from realtime_prices import RealTimePriceService
+from fastapi.responses import StreamingResponse
+from contextlib import asynccontextmanager
+from agent_registry import registry
+from blocking import run_blocking
+from batch import stream_batch, BATCH_MAX_TICKERS
+from sse import stream_events, SSE_HEADERS
+from http_cache import make_etag, bar_last_modified, validator_headers, is_not_modified, not_modified
+from fast_json import json_response
+import price_series
+from fundamentals_store import Statement
+import indicators
+from screener import SCREENER_MAX_TICKERS
+import portfolio
+from downsample import resample, downsample, RESAMPLE_INTERVALS, DOWNSAMPLE_METHODS
 from realtime_ws import manager, stream_prices
+from live_indicators import live_indicators
+from warmup import popularity
+from upstream import upstream_stats
 from document_analyzer import analyze_report, process_document_task, get_task_status, extract_text_from_pdf, process_graphs, extract_images_from_pdf, extract_text_from_image
 import logging
 from pydantic import BaseModel
+from schemas import AnalysisResponse, BatchAnalysisRequest, PricesResponse, TechnicalsResponse, ScreenerResponse, PortfolioRequest, PortfolioRiskResponse, MarketContextResponse, AllDataResponse
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 import time
@@ -14,13 +29,20 @@ from io import BytesIO
 from PIL import Image
 import numpy as np
 import asyncio
-from head_agent import HeadAgent
-from cachetools import TTLCache
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Stock and Document Analysis API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Agents and their caches are built once and shared by every request
+    registry.start()
+    registry.start_warmup()
+    yield
+    await registry.stop_warmup()
+    registry.shutdown()
+
+app = FastAPI(title="Stock and Document Analysis API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -30,52 +52,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Pydantic models for stock analysis
-class AnalysisResponse(BaseModel):
-    summary: str
-    sentiment: str
-    confidence: float
-    keyFactors: List[str]
-    targetPrice: Dict[str, float]
-    recommendation: str
-    dataAvailability: str
-
-class PriceData(BaseModel):
-    date: str
-    open: float
-    high: float
-    low: float
-    close: float
-    volume: int
-
-class PricesResponse(BaseModel):
-    ticker: str
-    prices: List[PriceData]
-    error: str = ""
-
-class NewsItem(BaseModel):
-    title: str
-    source: str
-    published_at: str
-    description: str
-    url: str
-
-class MarketContextResponse(BaseModel):
-    ticker: str
-    news: List[NewsItem]
-    error: str = ""
-
-class AllDataResponse(BaseModel):
-    ticker: str
-    historical_prices: List[PriceData]
-    fundamentals: Dict[str, Any]
-    technicals: Dict[str, float]
-    basic_financials: Dict[str, Any]
-    financials_reported: List[Dict[str, Any]]
-    company_news: List[Dict[str, Any]]
-    timestamp: str
-    errors: List[str]
-
 # Updated Pydantic model for document analysis
 class DocumentAnalysisResponse(BaseModel):
     analysis_results: str
@@ -92,75 +68,85 @@ class AnalysisStatus(BaseModel):
     processing_time: Optional[str] = None
     error: Optional[str] = None
 
+def compute_target_price(prices, fundamentals):
+    latest_price = prices.latest_close if len(prices) else 100.0
+    pe_ratio = fundamentals.get("peTTM", 20.0) if isinstance(fundamentals, dict) else 20.0
+    target_mid = latest_price * (1 + (pe_ratio / 100))
+    target_low = target_mid * 0.9
+    target_high = target_mid * 1.1
+    return {
+        "low": round(target_low, 2),
+        "mid": round(target_mid, 2),
+        "high": round(target_high, 2)
+    }
+
+def describe_data_availability(prices, fundamentals):
+    return (
+        "Full data available" if prices and fundamentals
+        else "Partial data (prices missing)" if not prices and fundamentals
+        else "Partial data (fundamentals missing)" if prices and not fundamentals
+        else "Limited data (market context only)"
+    )
+
+def build_analysis_response(result):
+    """Shape a HeadAgent.analyze_stock result into an AnalysisResponse dict."""
+    key_factors = []
+    for line in (result["stock_analysis"].split("\n") + result["fundamentals_analysis"].split("\n")):
+        if line.strip().startswith("-") or line.strip().startswith("*"):
+            key_factors.append(line.strip()[1:].strip())
+    key_factors = key_factors[:5] or ["No key factors identified due to limited data."]
+
+    sentiment_words = result["stock_analysis"].lower() + result["market_context"].lower()
+    positive_words = ["strong", "growth", "bullish", "positive", "expansion"]
+    negative_words = ["weak", "decline", "bearish", "negative", "risk"]
+    positive_count = sum(sentiment_words.count(word) for word in positive_words)
+    negative_count = sum(sentiment_words.count(word) for word in negative_words)
+    sentiment = (
+        "bullish" if positive_count > negative_count
+        else "bearish" if negative_count > positive_count
+        else "neutral"
+    )
+
+    recommendation = (
+        "buy" if sentiment == "bullish" and result["confidence"] > 0.7
+        else "sell" if sentiment == "bearish" and result["confidence"] > 0.7
+        else "hold"
+    )
+
+    return {
+        "summary": (
+            f"{result['stock_analysis']}\n\n"
+            f"Fundamentals: {result['fundamentals_analysis']}\n\n"
+            f"Market Context: {result['market_context']}"
+        ),
+        "sentiment": sentiment,
+        "confidence": result["confidence"] * 100,
+        "keyFactors": key_factors,
+        "targetPrice": compute_target_price(result["prices"], result["fundamentals"]),
+        "recommendation": recommendation,
+        "dataAvailability": describe_data_availability(result["prices"], result["fundamentals"]),
+        "timings": result.get("timings", {}),
+        "freshness": result.get("freshness", {})
+    }
+
 # Stock analysis endpoints
 @app.get("/analyze/{ticker}", response_model=AnalysisResponse)
 async def analyze_stock(ticker: str):
     logger.info(f"Received request to analyze {ticker}")
     try:
-        head_agent = HeadAgent()
+        head_agent = registry.get_head_agent()
     except Exception as e:
         logger.error(f"Failed to initialize HeadAgent: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Server initialization error: {str(e)}")
 
     try:
-        result = head_agent.analyze_stock(ticker.upper())
+        result = await head_agent.analyze_stock(ticker.upper())
         if "error" in result:
             logger.warning(f"Analysis failed for {ticker}: {result['error']}")
             raise HTTPException(status_code=400, detail=result["error"])
 
-        key_factors = []
-        for line in (result["stock_analysis"].split("\n") + result["fundamentals_analysis"].split("\n")):
-            if line.strip().startswith("-") or line.strip().startswith("*"):
-                key_factors.append(line.strip()[1:].strip())
-        key_factors = key_factors[:5] or ["No key factors identified due to limited data."]
-
-        sentiment_words = result["stock_analysis"].lower() + result["market_context"].lower()
-        positive_words = ["strong", "growth", "bullish", "positive", "expansion"]
-        negative_words = ["weak", "decline", "bearish", "negative", "risk"]
-        positive_count = sum(sentiment_words.count(word) for word in positive_words)
-        negative_count = sum(sentiment_words.count(word) for word in negative_words)
-        sentiment = (
-            "bullish" if positive_count > negative_count
-            else "bearish" if negative_count > positive_count
-            else "neutral"
-        )
-
-        latest_price = result["prices"][-1]["close"] if result["prices"] else 100.0
-        pe_ratio = result["fundamentals"].get("peTTM", 20.0) if not isinstance(result["fundamentals"], str) else 20.0
-        target_mid = latest_price * (1 + (pe_ratio / 100))
-        target_low = target_mid * 0.9
-        target_high = target_mid * 1.1
-
-        recommendation = (
-            "buy" if sentiment == "bullish" and result["confidence"] > 0.7
-            else "sell" if sentiment == "bearish" and result["confidence"] > 0.7
-            else "hold"
-        )
-
-        data_availability = (
-            "Full data available" if result["prices"] and result["fundamentals"]
-            else "Partial data (prices missing)" if not result["prices"] and result["fundamentals"]
-            else "Partial data (fundamentals missing)" if result["prices"] and not result["fundamentals"]
-            else "Limited data (market context only)"
-        )
-
-        response = {
-            "summary": (
-                f"{result['stock_analysis']}\n\n"
-                f"Fundamentals: {result['fundamentals_analysis']}\n\n"
-                f"Market Context: {result['market_context']}"
-            ),
-            "sentiment": sentiment,
-            "confidence": result["confidence"] * 100,
-            "keyFactors": key_factors,
-            "targetPrice": {
-                "low": round(target_low, 2),
-                "mid": round(target_mid, 2),
-                "high": round(target_high, 2)
-            },
-            "recommendation": recommendation,
-            "dataAvailability": data_availability
-        }
+        response = build_analysis_response(result)
+        popularity.record(ticker.upper())
         logger.info(f"Analysis successful for {ticker}")
         return response
     except ValueError as e:
@@ -170,19 +156,155 @@ async def analyze_stock(ticker: str):
         logger.error(f"Error processing response for {ticker}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing analysis: {str(e)}")
 
+@app.get("/analyze/{ticker}/stream")
+async def analyze_stock_stream(ticker: str):
+    """Server-sent events version of /analyze/{ticker}.
+
+    Events, in order of arrival:
+    - data: { latestPrice, technicals, targetPrice, confidence, dataAvailability } once prices/fundamentals are fetched
+    - token: { section, text } LLM deltas for market_context, stock_analysis and fundamentals_analysis
+    - section: { section, text } the final text of a section
+    - result: the full AnalysisResponse, or error: { detail }
+    """
+    try:
+        head_agent = registry.get_head_agent()
+    except Exception as e:
+        logger.error(f"Failed to initialize HeadAgent: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Server initialization error: {str(e)}")
+    ticker = ticker.upper()
+    if not head_agent.is_valid_ticker(ticker):
+        raise HTTPException(status_code=400, detail="Invalid ticker symbol. Use 1-10 alphanumeric characters, optionally with .NS or .BO suffix for Indian stocks.")
+
+    def transform(event, payload):
+        if event != "data":
+            return payload
+        prices = payload["prices"]
+        return {
+            "latestPrice": prices.latest_close,
+            "technicals": payload["technicals"],
+            "targetPrice": compute_target_price(prices, payload["fundamentals"]),
+            "confidence": payload["confidence"] * 100,
+            "dataAvailability": describe_data_availability(prices, payload["fundamentals"]),
+        }
+
+    def finish(result):
+        if "error" in result:
+            raise ValueError(result["error"])
+        popularity.record(ticker)
+        return build_analysis_response(result)
+
+    async def run(emit):
+        return finish(await head_agent.stream_analysis(ticker, emit))
+
+    logger.info(f"Streaming analysis for {ticker}")
+    return StreamingResponse(stream_events(run, transform), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.post("/analyze/batch")
+async def analyze_batch(req: BatchAnalysisRequest):
+    """Analyze a watchlist, streaming one NDJSON line per ticker as each finishes.
+
+    Body: { "tickers": ["AAPL", "MSFT", ...] } (up to 200, duplicates dropped)
+    Each line: { ticker, status: "ok", analysis: AnalysisResponse } or { ticker, status: "error", error }
+    """
+    try:
+        head_agent = registry.get_head_agent()
+    except Exception as e:
+        logger.error(f"Failed to initialize HeadAgent: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Server initialization error: {str(e)}")
+
+    tickers = list(dict.fromkeys(t.strip().upper() for t in req.tickers if t.strip()))
+    if not tickers:
+        raise HTTPException(status_code=400, detail="No tickers provided")
+    if len(tickers) > BATCH_MAX_TICKERS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_TICKERS} tickers per batch")
+
+    async def analyze(ticker):
+        result = await head_agent.analyze_stock(ticker)
+        if "error" in result:
+            raise ValueError(result["error"])
+        return build_analysis_response(result)
+
+    async def prefetch():
+        # A few bulk downloads fill the bar store so per-ticker analyses skip yfinance prices
+        await head_agent.stock_analyzer_agent.prefetch_price_series(tickers)
+
+    logger.info(f"Starting batch analysis of {len(tickers)} tickers")
+    return StreamingResponse(stream_batch(tickers, analyze, prepare=prefetch), media_type="application/x-ndjson")
+
+async def conditional_headers(stock_agent, kind, ticker, last_date, *variant):
+    """ETag/Last-Modified/Cache-Control for a cached price-bearing result, or None."""
+    version = await stock_agent.data_version(kind, ticker)
+    if version is None or not last_date:
+        return None
+    return validator_headers(make_etag(kind, ticker, last_date, version, *variant), bar_last_modified(last_date))
+
+PRICE_FORMATS = ("json", "columnar", "arrow")
+# Chart ranges -> days of daily bars (None = full history)
+PRICE_RANGES = {"1m": 31, "6m": 183, "1y": 365, "5y": 1827, "max": None}
+MIN_CHART_POINTS = 10
+MAX_CHART_POINTS = 5000
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
 @app.get("/prices/{ticker}", response_model=PricesResponse)
-async def get_stock_prices(ticker: str):
+async def get_stock_prices(
+    ticker: str,
+    request: Request,
+    fmt: str = Query("json", alias="format"),
+    period: str = Query("1y", alias="range"),
+    interval: str = Query("1d"),
+    max_points: Optional[int] = Query(None, ge=MIN_CHART_POINTS, le=MAX_CHART_POINTS),
+    method: str = Query("lttb"),
+):
+    """Daily (or weekly/monthly) OHLCV bars, by default for the last year.
+
+    - range: 1m, 6m, 1y (default), 5y or max
+    - interval: 1d (default), 1wk or 1mo, rolled up from the stored daily bars
+    - max_points: downsample on the server to at most this many bars
+    - method: lttb (default; keeps the real bars that preserve the close line) or ohlc (min/max buckets)
+    - format=json (default): { ticker, prices: [{date, open, high, low, close, volume}, ...], error }
+    - format=columnar: { ticker, format, prices: {date: [...], open: [...], ..., volume: [...]}, error }
+    - format=arrow: Arrow IPC stream with date/open/high/low/close/volume columns
+    """
     logger.info(f"Received request for prices of {ticker}")
+    if fmt not in PRICE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{fmt}'. Use one of: {', '.join(PRICE_FORMATS)}")
+    if period not in PRICE_RANGES:
+        raise HTTPException(status_code=400, detail=f"Unsupported range '{period}'. Use one of: {', '.join(PRICE_RANGES)}")
+    if interval not in RESAMPLE_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"Unsupported interval '{interval}'. Use one of: {', '.join(RESAMPLE_INTERVALS)}")
+    if method not in DOWNSAMPLE_METHODS:
+        raise HTTPException(status_code=400, detail=f"Unsupported method '{method}'. Use one of: {', '.join(DOWNSAMPLE_METHODS)}")
+    if fmt == "arrow" and price_series.pa is None:
+        raise HTTPException(status_code=501, detail="Arrow format requires pyarrow on the server")
     try:
-        head_agent = HeadAgent()
-        prices = head_agent.stock_analyzer_agent.fetch_stock_prices(ticker.upper(), retries=3)
+        head_agent = registry.get_head_agent()
+        stock_agent = head_agent.stock_analyzer_agent
+        if period == "1y":
+            series = await stock_agent.fetch_price_series(ticker.upper(), retries=3)
+        else:
+            series = await stock_agent.fetch_price_history(ticker.upper(), days=PRICE_RANGES[period], retries=3)
         
-        if isinstance(prices, str):
-            logger.warning(f"No price data found for {ticker}: {prices}")
-            return PricesResponse(ticker=ticker, prices=[], error=prices)
-
-        logger.info(f"Successfully retrieved {len(prices)} price points for {ticker}")
-        return PricesResponse(ticker=ticker, prices=prices, error="")
+        if isinstance(series, str):
+            logger.warning(f"No price data found for {ticker}: {series}")
+            return PricesResponse(ticker=ticker, prices=[], error=series)
+
+        headers = await conditional_headers(stock_agent, "prices", ticker.upper(), series.last_date, fmt, period, interval, max_points, method)
+        if headers and is_not_modified(request, headers["ETag"], bar_last_modified(series.last_date)):
+            logger.info(f"Prices for {ticker} not modified")
+            return not_modified(headers)
+
+        freshness = await stock_agent.freshness("prices", ticker.upper())
+        headers = dict(headers or {}, Age=str(int(freshness["age"])))
+        popularity.record(ticker.upper())
+        total = len(series)
+        series = downsample(resample(series, interval), max_points, method)
+        logger.info(f"Successfully retrieved {len(series)} price points for {ticker} ({total} daily bars, range {period})")
+        if fmt == "arrow":
+            return Response(content=series.to_arrow_ipc(), media_type=ARROW_STREAM_MEDIA_TYPE, headers=headers)
+        if fmt == "columnar":
+            return json_response(request, {"ticker": ticker, "format": fmt, "prices": series.to_columnar(), "error": "", "freshness": freshness}, headers=headers)
+        # Our own data already matches PricesResponse; skip re-validating every bar
+        return json_response(request, {"ticker": ticker, "prices": series.to_records(), "error": "", "freshness": freshness}, headers=headers)
     except Exception as e:
         logger.error(f"Error retrieving prices for {ticker}: {str(e)}")
         return PricesResponse(
@@ -191,12 +313,149 @@ async def get_stock_prices(ticker: str):
             error=f"Failed to retrieve prices: {str(e)}"
         )
 
+@app.get("/technicals/{ticker}", response_model=TechnicalsResponse)
+async def get_technicals(
+    ticker: str,
+    request: Request,
+    spec: str = Query(indicators.DEFAULT_INDICATORS, alias="indicators"),
+    period: str = Query("1y", alias="range"),
+):
+    """Full indicator series over a chart range, computed from stored daily bars.
+
+    - indicators: comma-separated name[:param...] list, e.g. "sma:50,rsi:14,macd:12:26:9,bbands:20:2".
+      Names: sma, ema, rsi, macd, bbands, atr, obv, volatility (annualised, of log returns)
+    - range: 1m, 6m, 1y (default), 5y or max. Extra bars before the range are
+      fetched so every indicator is defined from its first date.
+    - Response: { ticker, dates, close, indicators: {column: [...]}, latest: {column: value}, error };
+      values are null where an indicator is not yet defined
+    """
+    logger.info(f"Received request for technicals of {ticker}")
+    if period not in PRICE_RANGES:
+        raise HTTPException(status_code=400, detail=f"Unsupported range '{period}'. Use one of: {', '.join(PRICE_RANGES)}")
+    try:
+        requested = indicators.parse_indicators(spec)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        stock_agent = registry.get_head_agent().stock_analyzer_agent
+        days = PRICE_RANGES[period]
+        # Trading-day lookback in calendar days, with slack for holidays
+        warmup_days = indicators.lookback(requested) * 7 // 5 + 14
+        series = await stock_agent.fetch_price_history(ticker.upper(), days=days + warmup_days if days else None, retries=3)
+        if isinstance(series, str):
+            logger.warning(f"No price data found for {ticker}: {series}")
+            return TechnicalsResponse(ticker=ticker, error=series)
+
+        headers = await conditional_headers(stock_agent, "prices", ticker.upper(), series.last_date, "technicals", spec, period)
+        if headers and is_not_modified(request, headers["ETag"], bar_last_modified(series.last_date)):
+            logger.info(f"Technicals for {ticker} not modified")
+            return not_modified(headers)
+
+        columns = indicators.compute(series, requested)
+        if days:
+            start = np.datetime64(datetime.now().date(), "D") - np.timedelta64(days, "D")
+            keep = series.dates >= start
+            series = series.take(np.flatnonzero(keep))
+            columns = {name: values[keep] for name, values in columns.items()}
+        freshness = await stock_agent.freshness("prices", ticker.upper())
+        headers = dict(headers or {}, Age=str(int(freshness["age"])))
+        popularity.record(ticker.upper())
+        logger.info(f"Computed {len(columns)} indicator series over {len(series)} bars for {ticker}")
+        # NaN (warm-up) values serialize as null
+        return json_response(request, {
+            "ticker": ticker,
+            "dates": series.date_strings().tolist(),
+            "close": series.close,
+            "indicators": columns,
+            "latest": {name: indicators.latest(values) for name, values in columns.items()},
+            "error": "",
+            "freshness": freshness,
+        }, headers=headers)
+    except Exception as e:
+        logger.error(f"Error computing technicals for {ticker}: {str(e)}")
+        return TechnicalsResponse(ticker=ticker, error=f"Failed to compute technicals: {str(e)}")
+
+@app.get("/screener", response_model=ScreenerResponse)
+async def screen_universe(
+    request: Request,
+    universe: str = Query("watchlist"),
+    tickers: Optional[str] = Query(None),
+    filter_text: str = Query("", alias="filter"),
+    sort: str = Query(""),
+    limit: int = Query(50, ge=1, le=SCREENER_MAX_TICKERS),
+    columns: str = Query(""),
+):
+    """Screen a universe on indicators computed across all of its tickers at once.
+
+    - universe: watchlist (default), nifty50, nifty100 or stored (every ticker in the bar store)
+    - tickers: comma-separated symbols; overrides universe
+    - filter: e.g. "rsi_14 < 30 and close > sma_200". Columns: close, macd, macd_signal,
+      macd_hist and sma|ema|rsi|volatility|change|high|low|bb_upper|bb_lower_<window>
+      (change is the % return over the window); and/or/not, comparisons, + - * /
+    - sort: expression to sort ascending on, e.g. "rsi_14" or "-change_20" for descending
+    - columns: extra comma-separated columns to include in each result
+    """
+    try:
+        screener = registry.get_screener()
+    except Exception as e:
+        logger.error(f"Failed to initialize screener: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Server initialization error: {str(e)}")
+    try:
+        if tickers:
+            symbols = [t.strip().upper() for t in tickers.split(",") if t.strip()]
+            universe = "custom"
+        else:
+            symbols = screener.universe(universe)
+        extra = [c.strip() for c in columns.split(",") if c.strip()]
+        result = await screener.screen(symbols, filter_text, sort, limit, extra)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Screen of {universe} failed: {str(e)}")
+        return ScreenerResponse(universe=universe, error=f"Failed to run screen: {str(e)}")
+    logger.info(f"Screened {result['universe_size']} tickers in {universe}: {result['matched']} matched")
+    return json_response(request, dict(result, universe=universe, error=""))
+
+@app.post("/portfolio/risk", response_model=PortfolioRiskResponse)
+async def portfolio_risk(request: Request, req: PortfolioRequest):
+    """Risk of a weighted portfolio from stored daily closes.
+
+    Body: { "holdings": {"AAPL": 0.6, "MSFT": 0.4}, "benchmark": "^GSPC", "lookback": 252 }
+    Weights are scaled by gross exposure (absolute weights sum to 1); negative
+    weights are shorts and keep their sign. The benchmark
+    defaults to ^GSPC, or ^NSEI when most of the weight is on NSE/BSE tickers.
+    Returns annualised volatility, covariance and correlation, betas, one-day
+    historical and parametric VaR / expected shortfall at 95% and 99%, and drawdowns.
+    """
+    try:
+        screener = registry.get_screener()
+    except Exception as e:
+        logger.error(f"Failed to initialize screener: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Server initialization error: {str(e)}")
+    try:
+        weights = portfolio.normalize_weights(req.holdings)
+        benchmark = (req.benchmark or portfolio.default_benchmark(weights)).strip().upper()
+        if req.lookback < portfolio.MIN_OBSERVATIONS:
+            raise ValueError(f"lookback must be at least {portfolio.MIN_OBSERVATIONS} days")
+        # Sorted so every weighting of the same tickers shares one cached matrix
+        matrix = await screener.matrix(sorted({*weights, benchmark}))
+        start = time.perf_counter()
+        result = portfolio.portfolio_risk(matrix.tickers, matrix.dates, matrix.closes, weights, benchmark, req.lookback)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Portfolio risk for {list(req.holdings)} failed: {str(e)}")
+        return PortfolioRiskResponse(error=f"Failed to compute portfolio risk: {str(e)}")
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+    logger.info(f"Computed risk for {len(weights)} holdings over {result['observations']} days in {elapsed_ms}ms")
+    return json_response(request, dict(result, elapsed_ms=elapsed_ms, error=""))
+
 @app.get("/market-context/{ticker}", response_model=MarketContextResponse)
 async def get_market_context(ticker: str):
     logger.info(f"Received request for market context of {ticker}")
     try:
-        head_agent = HeadAgent()
-        news = head_agent.market_context_agent.fetch_news(ticker.upper(), retries=3)
+        head_agent = registry.get_head_agent()
+        news = await head_agent.market_context_agent.fetch_news(ticker.upper(), retries=3)
         
         if isinstance(news, str):
             logger.warning(f"No news data found for {ticker}: {news}")
@@ -212,14 +471,46 @@ async def get_market_context(ticker: str):
             error=f"Failed to retrieve market context: {str(e)}"
         )
 
+def statement_columns(statement):
+    """Columnar {period: [...], <metric>: [...]} for a Statement; {} when unavailable."""
+    return statement.to_columnar() if isinstance(statement, Statement) else {}
+
+def build_all_data_response(data):
+    """Map StockAnalyzerAgent.fetch_all_data output onto the AllDataResponse fields."""
+    return {
+        "ticker": data["ticker"],
+        "historical_prices": data["historical_prices"].to_records(),
+        "fundamentals": {
+            "income_statement": statement_columns(data["income_statement"]),
+            "cash_flow": statement_columns(data["cash_flow"]),
+            "eps_data": {kind: statement_columns(table) for kind, table in data["eps_data"].items()},
+        },
+        "technicals": data["technicals"],
+        "basic_financials": data["analyst_recommendations"],
+        "financials_reported": [],
+        "company_news": [],
+        "timestamp": data["timestamp"],
+        "errors": data["errors"],
+    }
+
 @app.get("/all-data/{ticker}", response_model=AllDataResponse)
-async def get_all_data(ticker: str):
+async def get_all_data(ticker: str, request: Request):
     logger.info(f"Received request for all data of {ticker}")
     try:
-        head_agent = HeadAgent()
-        data = head_agent.stock_analyzer_agent.fetch_all_data(ticker.upper(), retries=3)
+        head_agent = registry.get_head_agent()
+        stock_agent = head_agent.stock_analyzer_agent
+        data = await stock_agent.fetch_all_data(ticker.upper(), retries=3)
+        last_date = data["historical_prices"].last_date
+        headers = await conditional_headers(stock_agent, "all_data", ticker.upper(), last_date)
+        if headers and is_not_modified(request, headers["ETag"], bar_last_modified(last_date)):
+            logger.info(f"All data for {ticker} not modified")
+            return not_modified(headers)
+        popularity.record(ticker.upper())
         logger.info(f"Successfully retrieved all data for {ticker}")
-        return AllDataResponse(**data)
+        body = build_all_data_response(data)
+        body["freshness"] = await stock_agent.freshness("all_data", ticker.upper())
+        headers = dict(headers or {}, Age=str(int(body["freshness"]["age"])))
+        return json_response(request, body, headers=headers)
     except Exception as e:
         logger.error(f"Error retrieving all data for {ticker}: {str(e)}")
         return AllDataResponse(
@@ -237,7 +528,7 @@ async def get_all_data(ticker: str):
 @app.get("/validate-ticker/{ticker}")
 async def validate_ticker(ticker: str):
     try:
-        head_agent = HeadAgent()
+        head_agent = registry.get_head_agent()
         stock_analyzer = head_agent.stock_analyzer_agent
         return {"ticker": ticker, "valid": True}
     except Exception as e:
@@ -352,6 +643,16 @@ async def get_task_status_endpoint(task_id: str):
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the shared agent caches."""
+    return registry.cache_stats()
+
+@app.get("/upstream/stats")
+async def get_upstream_stats():
+    """Per-provider calls, failures, retries, throttling and circuit state."""
+    return upstream_stats()
+
 class SnapshotRequest(BaseModel):
     tickers: List[str]
 
@@ -360,11 +661,15 @@ async def get_snapshots(req: SnapshotRequest):
     """Return near real-time price snapshots for a list of tickers (1m interval).
 
     Body: { "tickers": ["AAPL","MSFT", ...] }
-    Response: { "snapshots": [{ ticker, price, prev_close, change, change_percent }] }
+    Response: { "snapshots": [{ ticker, price, prev_close, change, change_percent, indicators }] }
+    indicators: { ema_12, ema_26, rsi_14, vwap, low_20, high_20, low_252, high_252 } on daily closes
+    with the live price as today's close (vwap is today's session); null until enough history
     """
     try:
-        svc = RealTimePriceService(ttl_seconds=10)
-        return svc.get_snapshots([t.upper() for t in req.tickers[:50]])
+        svc = registry.get_snapshot_service()
+        tickers = [t.upper() for t in req.tickers[:50]]
+        await live_indicators.prefetch(registry.stock_agent(), tickers)
+        return await run_blocking(svc.get_snapshots, tickers)
     except Exception as e:
         logger.error(f"Error building snapshots: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to build snapshots: {str(e)}")
@@ -374,7 +679,7 @@ async def prices_ws(websocket: WebSocket, tickers: str = Query("AAPL,MSFT"), int
     # Clients connect to: ws://host/ws/prices?tickers=AAPL,MSFT,TSLA&interval=5
     await manager.connect(websocket)
     ticker_list = [t.strip().upper() for t in tickers.split(",") if t.strip()][:50]
-    await stream_prices(websocket, ticker_list, interval_seconds=max(2, min(interval, 30)))
+    await stream_prices(websocket, ticker_list, interval_seconds=max(2, min(interval, 30)), stock_agent=registry.stock_agent())
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,28 +1,37 @@
 import os
 import re
-import time
 import logging
 import requests
-from groq import Groq
+from groq import AsyncGroq
 from dotenv import load_dotenv
-from cachetools import TTLCache
+from shared_cache import SharedTTLCache, STALE_SECONDS
+from revalidate import stale_while_revalidate
+from ttl_policy import ttl_rule
 from duckduckgo_search import DDGS
+from upstream import provider
+from singleflight import coalesce
+from llm import complete
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+NEWSAPI_URL = "https://newsapi.org/v2/everything"
+
 class MarketContextAgent:
     def __init__(self):
         groq_api_key = os.getenv("GROQ_API_KEY")
         self.newsapi_key = os.getenv("NEWSAPI_KEY")
-        self.groq_client = Groq(api_key=groq_api_key) if groq_api_key else None
+        self.groq_client = AsyncGroq(api_key=groq_api_key) if groq_api_key else None
         logger.info(f"NewsAPI key loaded: {'Yes' if self.newsapi_key else 'No'}")
         logger.info(f"Groq API key loaded: {'Yes' if groq_api_key else 'No'}")
         if not all([self.groq_client, self.newsapi_key]):
             raise ValueError("Missing API keys in .env file")
-        self.cache = TTLCache(maxsize=100, ttl=3600)
+        self.cache = SharedTTLCache(
+            "market_context", maxsize=100, ttl=3600, stale_ttl=STALE_SECONDS,
+            ttls={"news_": ttl_rule("narrative"), "articles_": ttl_rule("news")},
+        )
 
     def normalize_ticker(self, ticker: str) -> str:
         """
@@ -32,17 +41,17 @@ class MarketContextAgent:
         # Removes everything after the first dot, e.g., RELIANCE.NS -> RELIANCE
         return re.split(r"\.", ticker)[0]
 
-    def get_market_context(self, ticker, retries=3):
+    @stale_while_revalidate("news_{ticker}")
+    @coalesce("market_context")
+    async def get_market_context(self, ticker, retries=3, on_token=None):
         logger.info(f"Fetching market context for {ticker}")
         cache_key = f"news_{ticker}"
-        if cache_key in self.cache:
+        cached = await self.cache.aget(cache_key)
+        if cached is not None:
             logger.info(f"Returning cached market context for {ticker}")
-            return self.cache[cache_key]
+            return cached
 
-        # Normalize ticker for news/search
-        base_ticker = self.normalize_ticker(ticker)
-
-        news = self.fetch_news(base_ticker, retries)
+        news = await self.fetch_news(ticker, retries)
         if isinstance(news, str):  # error or no news
             return news
 
@@ -55,62 +64,58 @@ class MarketContextAgent:
             "Provide a concise summary (100-150 words) focusing on sentiment, key events, and their potential impact on the stock."
         )
 
-        for attempt in range(retries):
-            try:
-                response = self.groq_client.chat.completions.create(
-                    messages=[{"role": "user", "content": prompt}],
-                    model="llama-3.3-70b-versatile",
-                    max_tokens=200
-                )
-                context = response.choices[0].message.content
-                self.cache[cache_key] = context
-                logger.info(f"Market context generated for {ticker}")
-                return context
-            except Exception as e:
-                logger.error(f"Attempt {attempt + 1} failed: {str(e)}")
-                if attempt < retries - 1:
-                    time.sleep(2 ** attempt)
+        try:
+            context = await provider("groq").call(complete, self.groq_client, prompt, max_tokens=200, on_token=on_token, attempts=retries)
+            await self.cache.aset(cache_key, context)
+            logger.info(f"Market context generated for {ticker}")
+            return context
+        except Exception as e:
+            logger.error(f"Market context generation failed for {ticker}: {str(e)}")
         return "Error generating market context."
 
-    def fetch_news(self, base_ticker: str, retries=3):
+    @stale_while_revalidate("articles_{ticker}")
+    @coalesce("news")
+    async def fetch_news(self, ticker: str, retries=3):
         """
         Try NewsAPI first, then fallback to DuckDuckGo if no articles or errors occur.
+        Searches use the root symbol; the cache key keeps the full ticker so the
+        TTL follows its exchange's calendar.
         """
+        cache_key = f"articles_{ticker}"
+        # Normalize ticker for news/search
+        base_ticker = self.normalize_ticker(ticker)
+        cached = await self.cache.aget(cache_key)
+        if cached is not None:
+            logger.info(f"Returning cached news articles for {base_ticker}")
+            return cached
+
         # --- Primary: NewsAPI ---
-        for attempt in range(retries):
-            try:
-                url = (
-                    f"https://newsapi.org/v2/everything?q={base_ticker}+stock"
-                    f"&language=en&sortBy=publishedAt&apiKey={self.newsapi_key}"
-                )
-                response = requests.get(url, timeout=10)
-                response.raise_for_status()
-                articles = response.json().get("articles", [])
-                if articles:
-                    news = [
-                        {
-                            "title": article.get("title") or "No title available",
-                            "source": article.get("source", {}).get("name", "Unknown source"),
-                            "published_at": article.get("publishedAt") or "Unknown date",
-                            "description": article.get("description") or "No description available",
-                            "url": article.get("url") or "#"
-                        }
-                        for article in articles[:5]
-                    ]
-                    logger.info(f"Fetched {len(news)} news articles for {base_ticker} via NewsAPI")
-                    return news
-                logger.info(f"No NewsAPI articles found for {base_ticker}")
-                break  # Skip retries if no articles, fallback to DuckDuckGo
-            except Exception as e:
-                logger.error(f"NewsAPI attempt {attempt + 1} failed: {str(e)}")
-                if attempt < retries - 1:
-                    time.sleep(2 ** attempt)
+        try:
+            params = {"q": f"{base_ticker} stock", "language": "en", "sortBy": "publishedAt"}
+            articles = await provider("newsapi").call(self._get_newsapi_articles, params, self.newsapi_key, attempts=retries)
+            if articles:
+                news = [
+                    {
+                        "title": article.get("title") or "No title available",
+                        "source": article.get("source", {}).get("name", "Unknown source"),
+                        "published_at": article.get("publishedAt") or "Unknown date",
+                        "description": article.get("description") or "No description available",
+                        "url": article.get("url") or "#"
+                    }
+                    for article in articles[:5]
+                ]
+                await self.cache.aset(cache_key, news)
+                logger.info(f"Fetched {len(news)} news articles for {base_ticker} via NewsAPI")
+                return news
+            logger.info(f"No NewsAPI articles found for {base_ticker}")
+        except Exception as e:
+            logger.error(f"NewsAPI failed for {base_ticker}: {str(e)}")
 
         # --- Fallback: DuckDuckGo ---
         try:
             logger.info(f"Falling back to DuckDuckGo for {base_ticker}")
             query = f"{base_ticker} stock news"
-            results = DDGS().news(query, region="wt-wt", safesearch="Off", timelimit="w", max_results=10)
+            results = await provider("duckduckgo").call(self._search_ddg_news, query, attempts=1)
             news = []
             for item in results:
                 news.append({
@@ -121,6 +126,7 @@ class MarketContextAgent:
                     "url": item.get("url", "#")
                 })
             if news:
+                await self.cache.aset(cache_key, news)
                 logger.info(f"Fetched {len(news)} news articles for {base_ticker} via DuckDuckGo")
                 return news
             else:
@@ -129,3 +135,14 @@ class MarketContextAgent:
             logger.error(f"DuckDuckGo fetch failed: {str(e)}")
             return f"Error fetching news for {base_ticker}."
 
+    @staticmethod
+    def _get_newsapi_articles(params: dict, api_key: str):
+        # The key goes in a header so it never appears in URLs or error text;
+        # raise_for_status inside the call so HTTP errors count against the provider
+        response = requests.get(NEWSAPI_URL, params=params, headers={"X-Api-Key": api_key or ""}, timeout=10)
+        response.raise_for_status()
+        return response.json().get("articles", [])
+
+    def _search_ddg_news(self, query: str):
+        """Blocking DuckDuckGo news search; run on the upstream executor."""
+        return DDGS().news(query, region="wt-wt", safesearch="Off", timelimit="w", max_results=10)
@@ -0,0 +1,146 @@
+import logging
+from statistics import NormalDist
+import numpy as np
+from indicators import TRADING_DAYS
+from ttl_policy import exchange_for
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Default benchmark per exchange; the one holding most of the weight is used
+BENCHMARKS = {"US": "^GSPC", "NSE": "^NSEI"}
+PORTFOLIO_MAX_HOLDINGS = 100
+DEFAULT_LOOKBACK = TRADING_DAYS
+MIN_OBSERVATIONS = 20
+VAR_CONFIDENCES = (0.95, 0.99)
+
+
+def default_benchmark(weights: dict) -> str:
+    by_exchange = {}
+    for ticker, weight in weights.items():
+        exchange = exchange_for(ticker)
+        by_exchange[exchange] = by_exchange.get(exchange, 0.0) + abs(weight)
+    return BENCHMARKS[max(by_exchange, key=by_exchange.get)]
+
+
+def normalize_weights(holdings: dict) -> dict:
+    """Upper-cased tickers with weights scaled by gross exposure, so absolute
+    weights sum to 1. Negative weights are shorts and keep their sign (a book
+    of only shorts stays net short).
+
+    Raises ValueError for empty, non-finite or all-zero holdings.
+    """
+    weights = {}
+    for ticker, weight in holdings.items():
+        ticker = ticker.strip().upper()
+        if not ticker:
+            continue
+        weights[ticker] = weights.get(ticker, 0.0) + float(weight)
+    if not weights:
+        raise ValueError("No holdings given")
+    if len(weights) > PORTFOLIO_MAX_HOLDINGS:
+        raise ValueError(f"At most {PORTFOLIO_MAX_HOLDINGS} holdings per portfolio")
+    gross = sum(abs(w) for w in weights.values())
+    if not all(np.isfinite(w) for w in weights.values()) or gross < 1e-12:
+        raise ValueError("Weights must be finite and not all zero")
+    return {ticker: weight / gross for ticker, weight in weights.items()}
+
+
+def drawdowns(returns):
+    """Drawdown from the running peak of compounded returns, along the last axis."""
+    equity = np.cumprod(1.0 + returns, axis=-1)
+    peak = np.maximum.accumulate(np.maximum(equity, 1.0), axis=-1)
+    return equity / peak - 1.0
+
+
+def _round(values, digits=6):
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(np.isnan(values), None, np.round(values, digits)).tolist()
+
+
+def portfolio_risk(tickers, dates, closes, weights: dict, benchmark: str,
+                   lookback: int = DEFAULT_LOOKBACK, confidences=VAR_CONFIDENCES):
+    """Risk analytics for a weighted portfolio from a tickers × dates close matrix
+    (forward-filled, benchmark included as one of the rows).
+
+    Uses the last `lookback` daily returns on which every holding and the
+    benchmark have prices. Volatilities and covariances are annualised; VaR
+    and expected shortfall are one-day losses as fractions of the portfolio.
+    """
+    holdings = list(weights)
+    rows = {ticker: i for i, ticker in enumerate(tickers)}
+    missing = [t for t in [*holdings, benchmark] if t not in rows or np.isnan(closes[rows[t]]).all()]
+    if missing:
+        raise ValueError(f"No stored prices for: {', '.join(missing)}")
+
+    prices = closes[[rows[t] for t in [*holdings, benchmark]]]
+    # Common history: from the first date on which every series has a price
+    start = int(np.max(np.argmax(~np.isnan(prices), axis=1)))
+    prices = prices[:, start:][:, -(lookback + 1):]
+    dates = dates[start:][-(lookback + 1):]
+    returns = prices[:, 1:] / prices[:, :-1] - 1.0
+    if returns.shape[1] < MIN_OBSERVATIONS:
+        raise ValueError(f"Only {returns.shape[1]} days of common history; need at least {MIN_OBSERVATIONS}")
+
+    asset_returns, benchmark_returns = returns[:-1], returns[-1]
+    w = np.array([weights[t] for t in holdings])
+    portfolio_returns = w @ asset_returns
+
+    covariance = np.atleast_2d(np.cov(asset_returns))
+    correlation = np.atleast_2d(np.corrcoef(asset_returns))
+    portfolio_variance = float(w @ covariance @ w)
+    # Share of portfolio variance from each holding (sums to 1)
+    risk_contribution = w * (covariance @ w) / portfolio_variance if portfolio_variance > 0 else np.full(len(w), np.nan)
+
+    benchmark_variance = benchmark_returns.var(ddof=1)
+    centred_benchmark = benchmark_returns - benchmark_returns.mean()
+    stacked = np.vstack((asset_returns, portfolio_returns))
+    betas = ((stacked - stacked.mean(axis=1, keepdims=True)) @ centred_benchmark) / (len(centred_benchmark) - 1)
+    betas = betas / benchmark_variance if benchmark_variance > 0 else np.full(len(stacked), np.nan)
+
+    mean, std = portfolio_returns.mean(), portfolio_returns.std(ddof=1)
+    var = {}
+    for confidence in confidences:
+        tail = np.quantile(portfolio_returns, 1.0 - confidence)
+        z = NormalDist().inv_cdf(1.0 - confidence)
+        var[f"{confidence:.0%}"] = {
+            "historical": round(float(-tail), 6),
+            "parametric": round(float(-(mean + z * std)), 6),
+            "expected_shortfall": round(float(-portfolio_returns[portfolio_returns <= tail].mean()), 6),
+        }
+
+    asset_drawdowns = drawdowns(asset_returns)
+    portfolio_drawdown = drawdowns(portfolio_returns)
+    worst = int(np.argmin(portfolio_drawdown))
+    annual = np.sqrt(TRADING_DAYS)
+    return {
+        "benchmark": benchmark,
+        "start": str(dates[0]),
+        "end": str(dates[-1]),
+        "observations": int(returns.shape[1]),
+        "portfolio": {
+            "annual_return": round(float((1.0 + portfolio_returns).prod() ** (TRADING_DAYS / len(portfolio_returns)) - 1.0), 6),
+            "annual_volatility": round(float(np.sqrt(portfolio_variance) * annual), 6),
+            "sharpe": round(float(mean / std * annual), 4) if std > 0 else None,
+            "beta": _round(betas[-1:], 4)[0],
+            "max_drawdown": round(float(portfolio_drawdown[worst]), 6),
+            "max_drawdown_date": str(dates[1:][worst]),
+            "current_drawdown": round(float(portfolio_drawdown[-1]), 6),
+            "var": var,
+        },
+        "holdings": [
+            {
+                "ticker": ticker,
+                "weight": round(float(w[i]), 6),
+                "annual_volatility": round(float(np.sqrt(covariance[i, i]) * annual), 6),
+                "beta": _round(betas[i:i + 1], 4)[0],
+                "risk_contribution": _round(risk_contribution[i:i + 1], 6)[0],
+                "max_drawdown": round(float(asset_drawdowns[i].min()), 6),
+                "current_drawdown": round(float(asset_drawdowns[i, -1]), 6),
+            }
+            for i, ticker in enumerate(holdings)
+        ],
+        "covariance": _round(covariance * TRADING_DAYS, 8),
+        "correlation": _round(correlation, 4),
+        "drawdown": {"dates": [str(d) for d in dates[1:]], "values": _round(portfolio_drawdown, 6)},
+    }
@@ -0,0 +1,138 @@
+import io
+import logging
+import numpy as np
+
+try:
+    import pyarrow as pa
+except ImportError:  # only needed for the Arrow IPC output format
+    pa = None
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+PRICE_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+class PriceSeries:
+    """Daily OHLCV bars held column-wise: one NumPy array per field.
+
+    This is the internal representation for price history; the per-bar dicts
+    the API has always returned are only built by to_records().
+    """
+
+    def __init__(self, dates, open, high, low, close, volume):
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.open = np.asarray(open, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.volume = np.asarray(volume, dtype=np.int64)
+
+    @classmethod
+    def from_history(cls, hist):
+        """Build from a yfinance history DataFrame (DatetimeIndex, Open/High/Low/Close/Volume).
+
+        Rows with a missing open, high, low or close (yfinance pads halted or
+        not-yet-settled days with NaN) are dropped.
+        """
+        hist = hist.dropna(subset=["Open", "High", "Low", "Close"])
+        index = hist.index.tz_localize(None) if getattr(hist.index, "tz", None) is not None else hist.index
+        return cls(
+            dates=index.to_numpy(dtype="datetime64[D]"),
+            open=np.round(hist["Open"].to_numpy(dtype=np.float64), 2),
+            high=np.round(hist["High"].to_numpy(dtype=np.float64), 2),
+            low=np.round(hist["Low"].to_numpy(dtype=np.float64), 2),
+            close=np.round(hist["Close"].to_numpy(dtype=np.float64), 2),
+            volume=np.nan_to_num(hist["Volume"].to_numpy(dtype=np.float64)).astype(np.int64),
+        )
+
+    @classmethod
+    def empty(cls):
+        return cls([], [], [], [], [], [])
+
+    @classmethod
+    def from_records(cls, records):
+        return cls(
+            dates=[r["date"] for r in records],
+            **{field: [r[field] for r in records] for field in PRICE_FIELDS},
+        )
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def last_date(self):
+        return str(self.dates[-1]) if len(self.dates) else None
+
+    @property
+    def latest_close(self):
+        return float(self.close[-1]) if len(self.close) else None
+
+    def take(self, indices):
+        """Subset of bars at the given (sorted) positions."""
+        return PriceSeries(self.dates[indices], self.open[indices], self.high[indices],
+                           self.low[indices], self.close[indices], self.volume[indices])
+
+    def since(self, start: str):
+        """Bars dated on or after start (YYYY-MM-DD)."""
+        return self.take(np.flatnonzero(self.dates >= np.datetime64(start, "D")))
+
+    def aggregate(self, starts):
+        """Merge consecutive runs of bars into one OHLC bar each.
+
+        `starts` are the positions where each run begins (sorted, first is 0).
+        Each merged bar is dated by its first bar and keeps first open, max high,
+        min low, last close and summed volume.
+        """
+        starts = np.asarray(starts, dtype=np.intp)
+        if not len(self) or not len(starts):
+            return PriceSeries.empty()
+        ends = np.append(starts[1:], len(self)) - 1
+        return PriceSeries(
+            dates=self.dates[starts],
+            open=self.open[starts],
+            high=np.maximum.reduceat(self.high, starts),
+            low=np.minimum.reduceat(self.low, starts),
+            close=self.close[ends],
+            volume=np.add.reduceat(self.volume, starts),
+        )
+
+    def date_strings(self):
+        return np.datetime_as_string(self.dates, unit="D")
+
+    def to_records(self):
+        """Per-bar dicts: [{date, open, high, low, close, volume}, ...]."""
+        columns = self.to_columnar()
+        return [
+            {"date": d, "open": o, "high": h, "low": l, "close": c, "volume": v}
+            for d, o, h, l, c, v in zip(columns["date"], columns["open"], columns["high"],
+                                        columns["low"], columns["close"], columns["volume"])
+        ]
+
+    def to_columnar(self):
+        """Parallel arrays: {date: [...], open: [...], ...} as plain Python lists."""
+        return {
+            "date": self.date_strings().tolist(),
+            "open": self.open.tolist(),
+            "high": self.high.tolist(),
+            "low": self.low.tolist(),
+            "close": self.close.tolist(),
+            "volume": self.volume.tolist(),
+        }
+
+    def to_arrow_ipc(self) -> bytes:
+        """Serialize as an Arrow IPC stream (date32 + float64/int64 columns)."""
+        if pa is None:
+            raise RuntimeError("The Arrow format requires pyarrow to be installed")
+        table = pa.table({
+            "date": pa.array(self.dates, type=pa.date32()),
+            "open": self.open,
+            "high": self.high,
+            "low": self.low,
+            "close": self.close,
+            "volume": self.volume,
+        })
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue()
@@ -1,5 +1,8 @@
-import yfinance as yf
-from cachetools import TTLCache
+from shared_cache import SharedTTLCache
+from bulk_prices import download_bulk
+from ttl_policy import ttl_rule
+from upstream import provider
+from live_indicators import live_indicators
 import logging
 from typing import List, Dict, Any
 
@@ -11,60 +14,87 @@ class RealTimePriceService:
     """Fetch near real-time prices for a list of tickers.
 
     Uses yfinance 1-minute data for the current day and falls back gracefully.
-    Caches results briefly (default 10s) to avoid hammering upstream.
+    Snapshots are cached per ticker to avoid hammering upstream: for the
+    intraday TTL policy (while the ticker's market is open, until it reopens
+    otherwise), capped at ttl_seconds so callers keep their refresh interval.
+    Tickers that miss the cache are fetched together with one bulk 1-minute
+    and one bulk daily download per chunk.
+
+    Each fresh 1-minute frame also updates the ticker's live indicators (EMA,
+    RSI, session VWAP, rolling lows/highs), seeded once from `bar_store`.
     """
 
-    def __init__(self, ttl_seconds: int = 10):
-        self.cache = TTLCache(maxsize=128, ttl=ttl_seconds)
+    def __init__(self, ttl_seconds: int = 10, bar_store=None):
+        # The intraday policy, but never longer than the caller's refresh interval
+        self.cache = SharedTTLCache("snapshots", maxsize=512, ttl=ttl_seconds, ttls={"snap_": ttl_rule("intraday", cap=ttl_seconds)})
+        self.bar_store = bar_store
 
-    def _latest_price_1m(self, ticker: str):
+    def _latest_prices_1m(self, tickers: List[str]):
+        """(latest price per ticker, live indicators per ticker)."""
         try:
-            hist = yf.Ticker(ticker).history(period="1d", interval="1m")
-            if hist is None or hist.empty:
-                return None
-            close = hist["Close"].dropna()
-            return float(close.iloc[-1]) if len(close) else None
+            frames = provider("yahoo").call_sync(download_bulk, tickers, period="1d", interval="1m")
         except Exception as e:
-            logger.error(f"1m price fetch failed for {ticker}: {e}")
-            return None
+            logger.error(f"1m price fetch failed for {', '.join(tickers)}: {e}")
+            return {}, {}
+        prices = {}
+        live = {}
+        for t, hist in frames.items():
+            close = hist["Close"].dropna()
+            if len(close):
+                prices[t] = float(close.iloc[-1])
+                try:
+                    live[t] = live_indicators.update(t, hist, self.bar_store)
+                except Exception as e:
+                    logger.error(f"Live indicator update failed for {t}: {e}")
+        return prices, live
 
-    def _prev_close(self, ticker: str):
+    def _prev_closes(self, tickers: List[str]) -> Dict[str, float]:
         try:
-            daily = yf.Ticker(ticker).history(period="2d", interval="1d")
-            if daily is None or daily.empty:
-                return None
+            # A few extra days so mixed-exchange batches still see two sessions each
+            frames = provider("yahoo").call_sync(download_bulk, tickers, period="5d", interval="1d")
+        except Exception as e:
+            logger.error(f"Prev close fetch failed for {', '.join(tickers)}: {e}")
+            return {}
+        prev_closes = {}
+        for t, daily in frames.items():
             close = daily["Close"].dropna()
             if len(close) >= 2:
-                return float(close.iloc[-2])
-            if len(close) == 1:
-                return float(close.iloc[0])
-            return None
-        except Exception as e:
-            logger.error(f"Prev close fetch failed for {ticker}: {e}")
-            return None
-
-    def get_snapshots(self, tickers: List[str]) -> Dict[str, Any]:
-        key = ",".join(sorted([t.upper() for t in tickers]))
-        if key in self.cache:
-            return self.cache[key]
+                prev_closes[t] = float(close.iloc[-2])
+            elif len(close) == 1:
+                prev_closes[t] = float(close.iloc[0])
+        return prev_closes
 
-        snapshots = []
-        for raw in tickers:
-            t = raw.upper()
-            price = self._latest_price_1m(t)
-            prev = self._prev_close(t)
-            change = (price - prev) if (price is not None and prev is not None) else None
-            change_percent = ((change / prev) * 100.0) if (change is not None and prev not in (None, 0)) else None
-            snapshots.append({
-                "ticker": t,
-                "price": round(price, 2) if isinstance(price, (int, float)) else None,
-                "prev_close": round(prev, 2) if isinstance(prev, (int, float)) else None,
-                "change": round(change, 2) if isinstance(change, (int, float)) else None,
-                "change_percent": round(change_percent, 2) if isinstance(change_percent, (int, float)) else None,
-            })
+    @staticmethod
+    def _snapshot(t: str, price, prev, indicators=None) -> Dict[str, Any]:
+        change = (price - prev) if (price is not None and prev is not None) else None
+        change_percent = ((change / prev) * 100.0) if (change is not None and prev not in (None, 0)) else None
+        return {
+            "ticker": t,
+            "price": round(price, 2) if isinstance(price, (int, float)) else None,
+            "prev_close": round(prev, 2) if isinstance(prev, (int, float)) else None,
+            "change": round(change, 2) if isinstance(change, (int, float)) else None,
+            "change_percent": round(change_percent, 2) if isinstance(change_percent, (int, float)) else None,
+            "indicators": indicators or {},
+        }
 
-        result = {"snapshots": snapshots}
-        self.cache[key] = result
-        return result
+    def get_snapshots(self, tickers: List[str]) -> Dict[str, Any]:
+        symbols = list(dict.fromkeys(t.upper() for t in tickers))
+        snapshots = {}
+        missing = []
+        for t in symbols:
+            cached = self.cache.get(f"snap_{t}")
+            if cached is not None:
+                snapshots[t] = cached
+            else:
+                missing.append(t)
 
+        if missing:
+            prices, live = self._latest_prices_1m(missing)
+            prev_closes = self._prev_closes(missing)
+            for t in missing:
+                snapshot = self._snapshot(t, prices.get(t), prev_closes.get(t), live.get(t))
+                self.cache[f"snap_{t}"] = snapshot
+                snapshots[t] = snapshot
+            logger.info(f"Fetched snapshots for {len(missing)} tickers ({len(symbols) - len(missing)} cached)")
 
+        return {"snapshots": [snapshots[t] for t in symbols]}
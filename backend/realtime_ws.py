@@ -4,6 +4,8 @@ import asyncio
 import json
 import logging
 from realtime_prices import RealTimePriceService
+from live_indicators import live_indicators
+from blocking import run_blocking
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
@@ -28,13 +30,18 @@ class ConnectionManager:
 manager = ConnectionManager()
 
 
-async def stream_prices(websocket: WebSocket, tickers: List[str], interval_seconds: int = 5):
-    """Continuously stream near real-time snapshots for tickers over WebSocket."""
-    svc = RealTimePriceService(ttl_seconds=max(1, interval_seconds - 1))
+async def stream_prices(websocket: WebSocket, tickers: List[str], interval_seconds: int = 5, stock_agent=None):
+    """Continuously stream near real-time snapshots (with live indicators) for tickers over WebSocket.
+
+    `stock_agent` supplies the stored daily bars that seed live indicators.
+    """
+    bar_store = stock_agent.bar_store if stock_agent is not None else None
+    svc = RealTimePriceService(ttl_seconds=max(1, interval_seconds - 1), bar_store=bar_store)
     try:
         while True:
             try:
-                payload = svc.get_snapshots([t.upper() for t in tickers])
+                await live_indicators.prefetch(stock_agent, [t.upper() for t in tickers])
+                payload = await run_blocking(svc.get_snapshots, [t.upper() for t in tickers])
                 await manager.send_json(websocket, payload)
             except Exception as e:
                 logger.error(f"WS stream error: {e}")
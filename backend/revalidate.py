@@ -0,0 +1,70 @@
+import asyncio
+import functools
+import logging
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Per-request callbacks that must not leak into a background refresh
+REQUEST_ONLY_KWARGS = ("on_token", "stock")
+
+
+class Revalidator:
+    """Background refreshes of stale cache entries, at most one per key at a time."""
+
+    def __init__(self):
+        self._tasks = {}
+        self.started = 0
+        self.deduplicated = 0
+        self.failed = 0
+
+    def schedule(self, key, func, *args, **kwargs):
+        if key in self._tasks:
+            self.deduplicated += 1
+            return
+        self.started += 1
+        self._tasks[key] = asyncio.ensure_future(self._run(key, func, *args, **kwargs))
+
+    async def _run(self, key, func, *args, **kwargs):
+        try:
+            await func(*args, **kwargs)
+            logger.info(f"Revalidated {key}")
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Background refresh failed for {key}: {str(e)}")
+        finally:
+            self._tasks.pop(key, None)
+
+    def stats(self):
+        return {
+            "in_flight": len(self._tasks),
+            "started": self.started,
+            "deduplicated": self.deduplicated,
+            "failed": self.failed,
+        }
+
+
+revalidator = Revalidator()
+
+
+def stale_while_revalidate(key_format: str):
+    """Decorator for async agent methods that cache their result in self.cache.
+
+    `key_format` is the method's cache key with a {ticker} placeholder. A stale
+    entry (past its TTL, within the cache's stale_ttl) is returned immediately
+    and the method is re-run in the background to replace it; fresh entries
+    and misses go through the method as usual.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(self, ticker, *args, **kwargs):
+            key = key_format.format(ticker=ticker)
+            entry = await self.cache.aentry(key)
+            if entry is not None and entry["stale"]:
+                logger.info(f"Serving stale {key} ({entry['age']:.0f}s old) while revalidating")
+                background_kwargs = {k: v for k, v in kwargs.items() if k not in REQUEST_ONLY_KWARGS}
+                revalidator.schedule((self.cache.name, key), method, self, ticker, *args, **background_kwargs)
+                return entry["value"]
+            return await method(self, ticker, *args, **kwargs)
+        return wrapper
+    return decorator
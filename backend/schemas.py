@@ -0,0 +1,92 @@
+from pydantic import BaseModel
+from typing import List, Dict, Any, Optional
+
+# Pydantic models for stock analysis
+class AnalysisResponse(BaseModel):
+    summary: str
+    sentiment: str
+    confidence: float
+    keyFactors: List[str]
+    targetPrice: Dict[str, float]
+    recommendation: str
+    dataAvailability: str
+    timings: Dict[str, float] = {}
+    freshness: Dict[str, Any] = {}
+
+class BatchAnalysisRequest(BaseModel):
+    tickers: List[str]
+
+class PortfolioRequest(BaseModel):
+    holdings: Dict[str, float]
+    benchmark: Optional[str] = None
+    lookback: int = 252
+
+class PriceData(BaseModel):
+    date: str
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: int
+
+class PricesResponse(BaseModel):
+    ticker: str
+    prices: List[PriceData]
+    error: str = ""
+    freshness: Dict[str, Any] = {}
+
+class TechnicalsResponse(BaseModel):
+    ticker: str
+    dates: List[str] = []
+    close: List[float] = []
+    indicators: Dict[str, List[Optional[float]]] = {}
+    latest: Dict[str, Optional[float]] = {}
+    error: str = ""
+    freshness: Dict[str, Any] = {}
+
+class ScreenerResponse(BaseModel):
+    universe: str
+    as_of: Optional[str] = None
+    universe_size: int = 0
+    matched: int = 0
+    results: List[Dict[str, Any]] = []
+    missing: List[str] = []
+    elapsed_ms: float = 0.0
+    error: str = ""
+
+class PortfolioRiskResponse(BaseModel):
+    benchmark: Optional[str] = None
+    start: Optional[str] = None
+    end: Optional[str] = None
+    observations: int = 0
+    portfolio: Dict[str, Any] = {}
+    holdings: List[Dict[str, Any]] = []
+    covariance: List[List[Optional[float]]] = []
+    correlation: List[List[Optional[float]]] = []
+    drawdown: Dict[str, List[Any]] = {}
+    elapsed_ms: float = 0.0
+    error: str = ""
+
+class NewsItem(BaseModel):
+    title: str
+    source: str
+    published_at: str
+    description: str
+    url: str
+
+class MarketContextResponse(BaseModel):
+    ticker: str
+    news: List[NewsItem]
+    error: str = ""
+
+class AllDataResponse(BaseModel):
+    ticker: str
+    historical_prices: List[PriceData]
+    fundamentals: Dict[str, Any]
+    technicals: Dict[str, float]
+    basic_financials: Dict[str, Any]
+    financials_reported: List[Dict[str, Any]]
+    company_news: List[Dict[str, Any]]
+    timestamp: str
+    errors: List[str]
+    freshness: Dict[str, Any] = {}
@@ -0,0 +1,307 @@
+import os
+import re
+import ast
+import time
+import logging
+import threading
+import numpy as np
+import indicators
+from blocking import run_blocking
+from singleflight import flights
+from warmup import DEFAULT_HOT_SET
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+NIFTY_50 = [
+    f"{symbol}.NS" for symbol in (
+        "RELIANCE", "TCS", "HDFCBANK", "ICICIBANK", "INFY", "HINDUNILVR", "ITC", "SBIN", "BHARTIARTL", "KOTAKBANK",
+        "LT", "AXISBANK", "ASIANPAINT", "MARUTI", "BAJFINANCE", "HCLTECH", "SUNPHARMA", "TITAN", "ULTRACEMCO", "WIPRO",
+        "NESTLEIND", "ONGC", "NTPC", "POWERGRID", "M&M", "TATAMOTORS", "TATASTEEL", "JSWSTEEL", "ADANIENT", "ADANIPORTS",
+        "BAJAJFINSV", "HDFCLIFE", "SBILIFE", "TECHM", "GRASIM", "INDUSINDBK", "CIPLA", "DRREDDY", "DIVISLAB", "BRITANNIA",
+        "EICHERMOT", "HEROMOTOCO", "APOLLOHOSP", "COALINDIA", "BPCL", "TATACONSUM", "BAJAJ-AUTO", "HINDALCO", "LTIM", "SHRIRAMFIN",
+    )
+]
+# NIFTY Next 50; with NIFTY_50 it makes up the NIFTY 100 (both are rebalanced semi-annually)
+NIFTY_NEXT_50 = [
+    f"{symbol}.NS" for symbol in (
+        "ABB", "ADANIENSOL", "ADANIGREEN", "ADANIPOWER", "AMBUJACEM", "BAJAJHLDNG", "BANKBARODA", "BEL", "BHEL", "BOSCHLTD",
+        "CANBK", "CGPOWER", "CHOLAFIN", "COLPAL", "DABUR", "DLF", "DMART", "GAIL", "GODREJCP", "HAL",
+        "HAVELLS", "ICICIGI", "ICICIPRULI", "INDHOTEL", "IOC", "IRCTC", "IRFC", "JINDALSTEL", "JIOFIN", "LICI",
+        "LODHA", "MARICO", "MOTHERSON", "NAUKRI", "PFC", "PIDILITIND", "PNB", "RECLTD", "SHREECEM", "SIEMENS",
+        "SRF", "TATAPOWER", "TORNTPHARM", "TRENT", "TVSMOTOR", "UNITDSPR", "VBL", "VEDL", "ZOMATO", "ZYDUSLIFE",
+    )
+]
+# Named universes; "stored" is every ticker in the bar store
+SCREENER_UNIVERSES = {
+    "watchlist": DEFAULT_HOT_SET,
+    "nifty50": NIFTY_50,
+    "nifty100": NIFTY_50 + NIFTY_NEXT_50,
+}
+SCREENER_MAX_TICKERS = int(os.getenv("SCREENER_MAX_TICKERS", "500"))
+# Calendar days of closes held per universe (covers SMA200 and 52-week highs/lows)
+SCREENER_HISTORY_DAYS = 400
+# Seconds a universe's close matrix is reused before re-reading the bar store
+SCREENER_MATRIX_TTL = float(os.getenv("SCREENER_MATRIX_TTL", "300"))
+SCREENER_MAX_MATRICES = 8
+MAX_EXPRESSION_LENGTH = 300
+
+# Column names usable in filter/sort expressions
+WINDOWED_COLUMNS = re.compile(r"^(sma|ema|rsi|volatility|change|high|low|bb_upper|bb_lower)_(\d+)$")
+PLAIN_COLUMNS = ("close", "macd", "macd_signal", "macd_hist")
+
+_COMPARISONS = {
+    ast.Lt: np.less, ast.LtE: np.less_equal, ast.Gt: np.greater,
+    ast.GtE: np.greater_equal, ast.Eq: np.equal, ast.NotEq: np.not_equal,
+}
+_ARITHMETIC = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide}
+
+
+def is_column(name: str) -> bool:
+    if name in PLAIN_COLUMNS:
+        return True
+    match = WINDOWED_COLUMNS.match(name)
+    return match is not None and 1 <= int(match.group(2)) <= indicators.MAX_WINDOW
+
+
+class Expression:
+    """A filter or sort expression over screener columns, e.g.
+    "rsi_14 < 30 and close > sma_200" or "-change_20".
+
+    Parsed with ast and checked against a whitelist of node types (boolean
+    and/or/not, comparisons, + - * /, numbers and column names), then
+    evaluated on whole columns at once. Nothing is passed to eval().
+    """
+
+    def __init__(self, text: str, condition: bool = False):
+        if len(text) > MAX_EXPRESSION_LENGTH:
+            raise ValueError(f"Expressions are limited to {MAX_EXPRESSION_LENGTH} characters")
+        try:
+            self.tree = ast.parse(text.strip(), mode="eval").body
+        except SyntaxError:
+            raise ValueError(f"Invalid expression '{text}'")
+        self.text = text
+        self.names = []
+        self._check(self.tree)
+        # A filter must be a comparison or a boolean combination of them
+        if condition and not (isinstance(self.tree, (ast.Compare, ast.BoolOp))
+                              or isinstance(self.tree, ast.UnaryOp) and isinstance(self.tree.op, ast.Not)):
+            raise ValueError(f"Filter '{text}' is not a condition; compare columns, e.g. 'rsi_14 < 30'")
+
+    def _check(self, node):
+        if isinstance(node, ast.BoolOp) and isinstance(node.op, (ast.And, ast.Or)):
+            for value in node.values:
+                self._check(value)
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Not, ast.USub, ast.UAdd)):
+            self._check(node.operand)
+        elif isinstance(node, ast.Compare) and all(type(op) in _COMPARISONS for op in node.ops):
+            for operand in [node.left, *node.comparators]:
+                self._check(operand)
+        elif isinstance(node, ast.BinOp) and type(node.op) in _ARITHMETIC:
+            self._check(node.left)
+            self._check(node.right)
+        elif isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            pass
+        elif isinstance(node, ast.Name):
+            if not is_column(node.id):
+                raise ValueError(
+                    f"Unknown column '{node.id}'. Use close, macd, macd_signal, macd_hist or "
+                    f"<sma|ema|rsi|volatility|change|high|low|bb_upper|bb_lower>_<window>"
+                )
+            if node.id not in self.names:
+                self.names.append(node.id)
+        else:
+            raise ValueError(f"Unsupported syntax in expression '{self.text}'")
+
+    def evaluate(self, column):
+        """Evaluate with `column(name)` returning one value per ticker."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self._evaluate(self.tree, column)
+
+    def _evaluate(self, node, column):
+        if isinstance(node, ast.BoolOp):
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            return combine.reduce([self._truth(self._evaluate(v, column)) for v in node.values])
+        if isinstance(node, ast.UnaryOp):
+            operand = self._evaluate(node.operand, column)
+            if isinstance(node.op, ast.Not):
+                return np.logical_not(self._truth(operand))
+            return -operand if isinstance(node.op, ast.USub) else operand
+        if isinstance(node, ast.Compare):
+            left = self._evaluate(node.left, column)
+            result = True
+            for op, comparator in zip(node.ops, node.comparators):
+                right = self._evaluate(comparator, column)
+                result = np.logical_and(result, _COMPARISONS[type(op)](left, right))
+                left = right
+            return result
+        if isinstance(node, ast.BinOp):
+            return _ARITHMETIC[type(node.op)](self._evaluate(node.left, column), self._evaluate(node.right, column))
+        if isinstance(node, ast.Constant):
+            return float(node.value)
+        return column(node.id)
+
+    @staticmethod
+    def _truth(values):
+        # NaN (indicator not defined yet) never passes a filter
+        values = np.asarray(values)
+        return values.astype(bool) if values.dtype == bool else np.nan_to_num(values, nan=0.0) != 0
+
+
+class CloseMatrix:
+    """Closes for a universe as one tickers × dates array aligned on the union
+    of their trading dates. Gaps (other exchanges' holidays) are forward-filled
+    per ticker; dates before a ticker's first bar stay NaN.
+
+    Indicator columns are not computed on that grid, where a holiday elsewhere
+    would add a flat bar: `bars` holds each ticker's own closes packed to the
+    right (NaN-padded on the left), so the last column is every ticker's latest
+    bar and windows count its own sessions. Columns are computed for every
+    ticker in one pass and kept for the matrix's life.
+    """
+
+    def __init__(self, tickers, dates, closes):
+        self.tickers = list(tickers)
+        self.dates = dates
+        valid = ~np.isnan(closes)
+        # Dates on which each ticker actually has a bar
+        self.traded = valid
+        positions = np.where(valid, np.arange(closes.shape[1]), 0)
+        np.maximum.accumulate(positions, axis=1, out=positions)
+        self.closes = np.take_along_axis(closes, positions, axis=1)
+        counts = valid.sum(axis=1)
+        self.bars = np.full((len(self.tickers), int(counts.max()) if len(counts) else 0), np.nan)
+        rows, columns = np.nonzero(valid)
+        self.bars[rows, (self.bars.shape[1] - counts)[rows] + (np.cumsum(valid, axis=1) - 1)[rows, columns]] = closes[rows, columns]
+        # Last real bar per ticker; None for tickers with no stored bars
+        last = np.where(valid.any(axis=1), closes.shape[1] - 1 - valid[:, ::-1].argmax(axis=1), -1)
+        self.last_dates = [str(dates[i]) if i >= 0 else None for i in last]
+        self.built_at = time.time()
+        self._columns = {}
+        self._lock = threading.Lock()
+
+    def column(self, name: str):
+        with self._lock:
+            if name not in self._columns:
+                self._columns.update(self._compute(name))
+            return self._columns[name]
+
+    def _compute(self, name):
+        closes = self.bars
+        n = closes.shape[1]
+        empty = np.full(len(self.tickers), np.nan)
+        if not n:
+            return {name: empty}
+        if name == "close":
+            return {name: closes[:, -1]}
+        if name.startswith("macd"):
+            line, signal, histogram = (values[:, -1] for values in indicators.macd(closes))
+            return {"macd": line, "macd_signal": signal, "macd_hist": histogram}
+        kind, window = WINDOWED_COLUMNS.match(name).groups()
+        window = int(window)
+        if kind == "change":
+            return {name: (closes[:, -1] / closes[:, -1 - window] - 1) * 100 if window < n else empty}
+        if kind in ("high", "low"):
+            recent = closes[:, -window:]
+            with np.errstate(invalid="ignore"):
+                full = (~np.isnan(recent)).all(axis=1) & (n >= window)
+                value = recent.max(axis=1) if kind == "high" else recent.min(axis=1)
+            return {name: np.where(full, value, np.nan)}
+        if kind.startswith("bb_"):
+            _, upper, lower = indicators.bollinger(closes, window)
+            return {f"bb_upper_{window}": upper[:, -1], f"bb_lower_{window}": lower[:, -1]}
+        series = {
+            "sma": indicators.sma, "ema": indicators.ema, "rsi": indicators.rsi, "volatility": indicators.volatility,
+        }[kind](closes, window)
+        return {name: series[:, -1]}
+
+
+class Screener:
+    """Filters and ranks a universe on indicator columns computed across all
+    of its tickers at once from the bar store."""
+
+    def __init__(self, stock_agent, matrix_ttl: float = SCREENER_MATRIX_TTL):
+        self.stock_agent = stock_agent
+        self.matrix_ttl = matrix_ttl
+        self._matrices = {}
+        self.screens = 0
+
+    def universe(self, name: str):
+        if name == "stored":
+            return self.stock_agent.bar_store.tickers("1d")
+        if name not in SCREENER_UNIVERSES:
+            raise ValueError(f"Unknown universe '{name}'. Use one of: {', '.join([*SCREENER_UNIVERSES, 'stored'])}")
+        return list(SCREENER_UNIVERSES[name])
+
+    async def matrix(self, tickers, refresh: bool = True) -> CloseMatrix:
+        key = tuple(tickers)
+        cached = self._matrices.get(key)
+        if cached is not None and time.time() - cached.built_at < self.matrix_ttl:
+            return cached
+        return await flights.do(("screener_matrix", key), self._build_matrix, key, refresh)
+
+    async def _build_matrix(self, tickers, refresh):
+        start = time.perf_counter()
+        if refresh:
+            # Bulk-refreshes only tickers whose stored bars are stale, backfilling
+            # tickers stored for less than the screener's history
+            await self.stock_agent.prefetch_price_series(list(tickers), days=SCREENER_HISTORY_DAYS)
+        since = str(np.datetime64("today", "D") - np.timedelta64(SCREENER_HISTORY_DAYS, "D"))
+        dates, closes = await run_blocking(self.stock_agent.bar_store.load_closes, list(tickers), "1d", since)
+        matrix = CloseMatrix(tickers, dates, closes)
+        self._matrices[tickers] = matrix
+        while len(self._matrices) > SCREENER_MAX_MATRICES:
+            del self._matrices[min(self._matrices, key=lambda k: self._matrices[k].built_at)]
+        logger.info(f"Built close matrix {closes.shape[0]}x{closes.shape[1]} in {time.perf_counter() - start:.2f}s")
+        return matrix
+
+    async def screen(self, tickers, filter_text: str = "", sort_text: str = "", limit: int = 50, columns=()):
+        """Evaluate filter and sort expressions over the universe.
+
+        Returns {as_of, universe_size, matched, results: [{ticker, last_date, close, <columns>...}], missing}.
+        Results sort ascending on the sort expression (prefix "-" for descending), NaNs last.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        if len(tickers) > SCREENER_MAX_TICKERS:
+            raise ValueError(f"At most {SCREENER_MAX_TICKERS} tickers per screen")
+        condition = Expression(filter_text, condition=True) if filter_text.strip() else None
+        order = Expression(sort_text) if sort_text.strip() else None
+        for name in columns:
+            if not is_column(name):
+                raise ValueError(f"Unknown column '{name}'")
+
+        matrix = await self.matrix(tickers)
+        start = time.perf_counter()
+        available = np.array([d is not None for d in matrix.last_dates], dtype=bool)
+        mask = available if condition is None else available & np.broadcast_to(Expression._truth(condition.evaluate(matrix.column)), available.shape)
+        selected = np.flatnonzero(mask)
+        if order is not None:
+            keys = np.broadcast_to(order.evaluate(matrix.column), available.shape).astype(np.float64)[selected]
+            selected = selected[np.argsort(np.where(np.isnan(keys), np.inf, keys), kind="stable")]
+        selected = selected[:limit]
+
+        shown = ["close"]
+        for expression in (condition, order):
+            shown += expression.names if expression is not None else []
+        shown = list(dict.fromkeys([*shown, *columns]))
+        values = {name: matrix.column(name)[selected] for name in shown}
+        results = [
+            {"ticker": matrix.tickers[i], "last_date": matrix.last_dates[i],
+             **{name: (None if np.isnan(v[row]) else round(float(v[row]), 4)) for name, v in values.items()}}
+            for row, i in enumerate(selected)
+        ]
+        self.screens += 1
+        return {
+            "as_of": str(matrix.dates[-1]) if len(matrix.dates) else None,
+            "universe_size": len(tickers),
+            "matched": int(mask.sum()),
+            "results": results,
+            "missing": [t for t, ok in zip(matrix.tickers, available) if not ok],
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+
+    def stats(self):
+        return {
+            "screens": self.screens,
+            "matrices": [{"tickers": len(k), "age": round(time.time() - m.built_at, 1)} for k, m in self._matrices.items()],
+        }
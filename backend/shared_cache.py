@@ -0,0 +1,327 @@
+import os
+import time
+import pickle
+import logging
+import threading
+from cachetools import TLRUCache
+from blocking import run_blocking
+
+try:
+    import redis
+except ImportError:  # only needed when REDIS_URL is set
+    redis = None
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Unset -> caches are process-local only (one copy per uvicorn worker)
+REDIS_URL = os.getenv("REDIS_URL")
+CACHE_NAMESPACE = os.getenv("CACHE_NAMESPACE", "analytics")
+# Upper bound on how long a worker serves an entry from memory without asking
+# the shared tier, so a write by another worker is seen within this window.
+LOCAL_TTL = float(os.getenv("CACHE_LOCAL_TTL", "30"))
+# Redis calls block their thread (coroutines use the a* methods, which run
+# them on the blocking executor); keep a slow/down server from stalling it
+REDIS_SOCKET_TIMEOUT = 0.25
+REDIS_RETRY_SECONDS = 30
+# How long past its TTL an entry may still be served (stale) while it is
+# refreshed in the background; see revalidate.py.
+STALE_SECONDS = float(os.getenv("CACHE_STALE_SECONDS", "21600"))
+
+
+class InMemoryBackend:
+    """Dict-backed stand-in for Redis: bytes values with per-key expiry.
+
+    Shared by every cache that is given the same instance, so it also models
+    several workers talking to one server (useful in tests and local runs).
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            payload, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            return payload
+
+    def set(self, key: str, payload: bytes, ttl: float):
+        with self._lock:
+            self._data[key] = (payload, time.monotonic() + ttl)
+
+    def delete_prefix(self, prefix: str):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+
+class RedisBackend:
+    """Redis tier. Errors are logged and treated as misses; after one, Redis is
+    skipped for REDIS_RETRY_SECONDS so requests fall back to the local tier."""
+
+    name = "redis"
+
+    def __init__(self, url: str):
+        if redis is None:
+            raise RuntimeError("REDIS_URL is set but the redis package is not installed")
+        self.url = url
+        self.client = redis.Redis.from_url(
+            url, socket_timeout=REDIS_SOCKET_TIMEOUT, socket_connect_timeout=REDIS_SOCKET_TIMEOUT
+        )
+        self.errors = 0
+        self._down_until = 0.0
+
+    def _call(self, op, *args, **kwargs):
+        if time.monotonic() < self._down_until:
+            return None
+        try:
+            return op(*args, **kwargs)
+        except redis.RedisError as e:
+            self.errors += 1
+            self._down_until = time.monotonic() + REDIS_RETRY_SECONDS
+            logger.warning(f"Redis unavailable ({e}); using process-local cache for {REDIS_RETRY_SECONDS}s")
+            return None
+
+    def get(self, key: str):
+        return self._call(self.client.get, key)
+
+    def set(self, key: str, payload: bytes, ttl: float):
+        self._call(self.client.set, key, payload, px=max(1, int(ttl * 1000)))
+
+    def delete_prefix(self, prefix: str):
+        def delete():
+            for key in self.client.scan_iter(match=f"{prefix}*", count=500):
+                self.client.delete(key)
+        self._call(delete)
+
+
+_default_backend = None
+_default_backend_lock = threading.Lock()
+
+
+def default_backend():
+    """Shared tier from REDIS_URL (one client per process), or None."""
+    global _default_backend
+    if not REDIS_URL:
+        return None
+    with _default_backend_lock:
+        if _default_backend is None:
+            _default_backend = RedisBackend(REDIS_URL)
+            logger.info(f"Shared cache tier: Redis at {REDIS_URL}")
+        return _default_backend
+
+
+class SharedTTLCache:
+    """Two-level cache: an in-process LRU in front of an optional shared tier.
+
+    Agents live for the whole process (see agent_registry.py), so one cache is
+    read and written by many concurrent requests. With a backend (Redis when
+    REDIS_URL is set) every uvicorn worker also sees the others' entries.
+
+    Keys are namespaced as "<CACHE_NAMESPACE>:<name>:<key>" in the shared tier.
+    `ttls` maps key prefixes (the data type, e.g. "prices_") to their TTL in
+    seconds, or to a callable taking the rest of the key (see
+    ttl_policy.ttl_rule); other keys use `ttl`. The TTL is fixed when an entry
+    is written. Values are pickled, so anything an agent caches (dicts,
+    PriceSeries, DataFrames) round-trips unchanged.
+
+    Past its TTL an entry is a miss for get(), but it is kept for another
+    `stale_ttl` seconds so entry() can still hand it out while a fresh value
+    is fetched (stale-while-revalidate).
+
+    Shared-tier calls block, so coroutines use aget/aset/aentry/aversion:
+    fresh local hits are answered inline and anything that needs the shared
+    tier runs on the blocking executor.
+    """
+
+    def __init__(self, name: str, maxsize: int = 100, ttl: float = 3600, ttls: dict = None, backend="default",
+                 stale_ttl: float = 0):
+        self.name = name
+        self.ttl = ttl
+        self.ttls = dict(ttls or {})
+        self.stale_ttl = stale_ttl
+        self.backend = default_backend() if backend == "default" else backend
+        self.prefix = f"{CACHE_NAMESPACE}:{name}:"
+        self._local = TLRUCache(maxsize=maxsize, ttu=self._local_expiry, timer=time.monotonic)
+        self._lock = threading.RLock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def ttl_for(self, key) -> float:
+        """TTL for a key written now: the longest matching prefix in `ttls`, else the default."""
+        key = str(key)
+        best = None
+        for prefix in self.ttls:
+            if key.startswith(prefix) and (best is None or len(prefix) > len(best)):
+                best = prefix
+        if best is None:
+            return self.ttl
+        rule = self.ttls[best]
+        return rule(key[len(best):]) if callable(rule) else rule
+
+    def _local_expiry(self, key, entry, now):
+        # entry[2] is the wall-clock expiry; the TLRU timer is monotonic
+        ttl = max(0.0, entry[2] - time.time()) + self.stale_ttl
+        if self.backend is not None:
+            ttl = min(ttl, LOCAL_TTL)
+        return now + ttl
+
+    def _age(self, entry) -> float:
+        # The version is the write time in nanoseconds
+        return max(0.0, time.time() - entry[0] / 1e9)
+
+    def _is_fresh(self, key, entry) -> bool:
+        return time.time() < entry[2]
+
+    def _lookup(self, key):
+        """(version, value, expires_at) from the local tier, then the shared tier; None on miss."""
+        with self._lock:
+            local = self._local.get(key)
+        # A stale local copy may already have been refreshed by another worker
+        if local is not None and (self.backend is None or self._is_fresh(key, local)):
+            return local, "local"
+        if self.backend is None:
+            return None, None
+        payload = self.backend.get(self.prefix + str(key))
+        if payload is None:
+            return (local, "local") if local is not None else (None, None)
+        try:
+            entry = pickle.loads(payload)
+        except Exception as e:
+            logger.warning(f"Dropping unreadable {self.name} cache entry {key}: {e}")
+            return (local, "local") if local is not None else (None, None)
+        if local is not None and local[0] > entry[0]:
+            return local, "local"
+        with self._lock:
+            self._local[key] = entry
+        return entry, "shared"
+
+    def get(self, key, default=None):
+        """Look up a fresh value, recording a local hit, a shared-tier hit or a miss."""
+        entry, tier = self._lookup(key)
+        with self._lock:
+            if entry is None or not self._is_fresh(key, entry):
+                self.misses += 1
+                return default
+            if tier == "local":
+                self.local_hits += 1
+            else:
+                self.shared_hits += 1
+        return entry[1]
+
+    def entry(self, key):
+        """{value, age, expires_in, stale, version} for a fresh or stale entry, or None.
+
+        Does not count towards hit/miss stats.
+        """
+        entry, _ = self._lookup(key)
+        if entry is None:
+            return None
+        return {
+            "value": entry[1],
+            "age": self._age(entry),
+            "expires_in": entry[2] - time.time(),
+            "stale": not self._is_fresh(key, entry),
+            "version": entry[0],
+        }
+
+    def __getitem__(self, key):
+        entry, _ = self._lookup(key)
+        if entry is None or not self._is_fresh(key, entry):
+            raise KeyError(key)
+        return entry[1]
+
+    def __setitem__(self, key, value):
+        # Wall-clock nanoseconds so every worker agrees on an entry's version
+        version = time.time_ns()
+        ttl = self.ttl_for(key)
+        entry = (version, value, version / 1e9 + ttl)
+        with self._lock:
+            self._local[key] = entry
+        if self.backend is not None:
+            try:
+                payload = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception as e:
+                logger.warning(f"Keeping {self.name} cache entry {key} local; cannot serialize: {e}")
+                return
+            self.backend.set(self.prefix + str(key), payload, ttl + self.stale_ttl)
+
+    def version(self, key):
+        """Write version of the live (fresh or stale) entry for key, or None if absent.
+
+        Changes every time the key is stored, so it can back HTTP validators.
+        """
+        entry, _ = self._lookup(key)
+        return entry[0] if entry is not None else None
+
+    def _needs_shared(self, key) -> bool:
+        """Whether looking key up would go to the shared tier."""
+        if self.backend is None:
+            return False
+        with self._lock:
+            local = self._local.get(key)
+        return local is None or not self._is_fresh(key, local)
+
+    async def aget(self, key, default=None):
+        if self._needs_shared(key):
+            return await run_blocking(self.get, key, default)
+        return self.get(key, default)
+
+    async def aentry(self, key):
+        if self._needs_shared(key):
+            return await run_blocking(self.entry, key)
+        return self.entry(key)
+
+    async def aversion(self, key):
+        if self._needs_shared(key):
+            return await run_blocking(self.version, key)
+        return self.version(key)
+
+    async def aset(self, key, value):
+        if self.backend is None:
+            self[key] = value
+        else:
+            await run_blocking(self.__setitem__, key, value)
+
+    def __contains__(self, key):
+        entry, _ = self._lookup(key)
+        return entry is not None and self._is_fresh(key, entry)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._local)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+        if self.backend is not None:
+            self.backend.delete_prefix(self.prefix)
+
+    def stats(self):
+        with self._lock:
+            hits = self.local_hits + self.shared_hits
+            lookups = hits + self.misses
+            return {
+                "name": self.name,
+                "backend": self.backend.name if self.backend is not None else "local",
+                "size": len(self._local),
+                "maxsize": self._local.maxsize,
+                "ttl": self.ttl,
+                "ttls": {prefix: getattr(rule, "data_type", rule) for prefix, rule in self.ttls.items()},
+                "stale_ttl": self.stale_ttl,
+                "hits": hits,
+                "local_hits": self.local_hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "backend_errors": getattr(self.backend, "errors", 0),
+            }
@@ -0,0 +1,122 @@
+import asyncio
+import functools
+import logging
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls that share a key.
+
+    The first caller for a key starts the work; callers that arrive while it
+    is in flight await the same result instead of going upstream again.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key, func, *args, **kwargs):
+        future = self._calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+            logger.info(f"Coalesced request for {key}")
+        else:
+            future = asyncio.ensure_future(func(*args, **kwargs))
+            self._calls[key] = future
+            self.started += 1
+            future.add_done_callback(functools.partial(self._finish, key))
+        # Shield so one cancelled caller (e.g. a per-source timeout) does not
+        # cancel the work the other callers are waiting on.
+        return await asyncio.shield(future)
+
+    def in_flight(self, key):
+        """The future of the call running for key, or None."""
+        return self._calls.get(key)
+
+    async def join(self, key, future):
+        """Await a call found with in_flight() as a coalesced caller."""
+        self.coalesced += 1
+        logger.info(f"Coalesced request for {key}")
+        return await asyncio.shield(future)
+
+    def _finish(self, key, future):
+        self._calls.pop(key, None)
+        if not future.cancelled():
+            future.exception()  # mark retrieved; callers re-raise it themselves
+
+    def stats(self):
+        return {
+            "in_flight": len(self._calls),
+            "started": self.started,
+            "coalesced": self.coalesced,
+        }
+
+
+flights = SingleFlight()
+
+
+class TokenFanout:
+    """on_token for a coalesced streaming call: relays each token to every
+    caller sharing the call, replaying earlier tokens to callers that join
+    late so each sees the whole text once."""
+
+    def __init__(self):
+        self.sent = []
+        self.listeners = []
+        self._lock = asyncio.Lock()
+
+    async def add(self, on_token):
+        async with self._lock:
+            for text in self.sent:
+                await on_token(text)
+            self.listeners.append(on_token)
+
+    async def __call__(self, text):
+        async with self._lock:
+            self.sent.append(text)
+            for listener in list(self.listeners):
+                try:
+                    await listener(text)
+                except Exception as e:
+                    # One gone listener must not fail the call the others share
+                    logger.warning(f"Dropping token listener: {e}")
+                    self.listeners.remove(listener)
+
+
+# (operation, ticker) -> TokenFanout of the streaming call in flight
+_fanouts = {}
+
+
+def coalesce(operation: str):
+    """Decorator for async agent methods taking the ticker as first argument.
+
+    Concurrent calls are keyed by (operation, ticker) on the shared `flights`.
+    Callers passing `on_token` share a streaming call's tokens through a
+    TokenFanout; if the call in flight is not streaming, they run their own.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(self, ticker, *args, **kwargs):
+            key = (operation, ticker)
+            on_token = kwargs.get("on_token")
+            if on_token is None:
+                return await flights.do(key, method, self, ticker, *args, **kwargs)
+            future = flights.in_flight(key)
+            fanout = _fanouts.get(key)
+            if future is not None and fanout is not None:
+                await fanout.add(on_token)
+                return await flights.join(key, future)
+            if future is not None:
+                return await method(self, ticker, *args, **kwargs)
+            fanout = _fanouts[key] = TokenFanout()
+            await fanout.add(on_token)
+            try:
+                return await flights.do(key, method, self, ticker, *args, **dict(kwargs, on_token=fanout))
+            finally:
+                if _fanouts.get(key) is fanout:
+                    del _fanouts[key]
+        return wrapper
+    return decorator
@@ -0,0 +1,60 @@
+import json
+import asyncio
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # stop nginx buffering the stream
+}
+
+_DONE = object()
+
+
+def format_sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def stream_events(
+    run: Callable[[Callable], Awaitable],
+    transform: Optional[Callable[[str, dict], Optional[dict]]] = None,
+) -> AsyncIterator[str]:
+    """Bridge an emit-callback producer to server-sent events.
+
+    `run(emit)` is awaited in the background; every `emit(event, payload)` is
+    sent as an SSE message, optionally rewritten by `transform` (return None to
+    drop it). The value `run` returns is sent as a final "result" event;
+    exceptions become an "error" event.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def emit(event, payload):
+        await queue.put((event, payload))
+
+    async def produce():
+        try:
+            result = await run(emit)
+            await queue.put(("result", result))
+        except Exception as e:
+            logger.error(f"SSE producer failed: {str(e)}")
+            await queue.put(("error", {"detail": getattr(e, "detail", None) or str(e)}))
+        finally:
+            await queue.put(_DONE)
+
+    task = asyncio.ensure_future(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            event, payload = item
+            if transform is not None and event not in ("result", "error"):
+                payload = transform(event, payload)
+                if payload is None:
+                    continue
+            yield format_sse(event, payload)
+    finally:
+        task.cancel()
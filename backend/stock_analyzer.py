@@ -2,9 +2,24 @@ import os
 import requests
 import yfinance as yf
 import numpy as np
-from groq import Groq
+import asyncio
+from groq import AsyncGroq
 from dotenv import load_dotenv
-from cachetools import TTLCache
+from shared_cache import SharedTTLCache, STALE_SECONDS
+from revalidate import stale_while_revalidate
+from ttl_policy import ttl_rule, expires_at
+from blocking import run_blocking
+from upstream import provider
+from singleflight import coalesce, flights
+from llm import complete
+from price_series import PriceSeries
+import indicators
+from bar_store import BarStore
+from fundamentals_store import (
+    Statement, fundamentals_store, format_amount, format_change,
+    INCOME_METRICS, CASH_FLOW_METRICS, EPS_TREND_FIELDS, EPS_REVISION_FIELDS,
+)
+from bulk_prices import download_bulk
 import time
 import logging
 from datetime import datetime, timedelta
@@ -14,205 +29,423 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# Daily bars served by fetch_price_series. Stored bars count as fresh until the
+# daily_bars TTL policy (market hours) says otherwise; survives process restarts.
+HISTORY_DAYS = 365
+# covered_from recorded for a period="max" backfill
+MAX_HISTORY_START = "1900-01-01"
+
+# Per-source timeouts (seconds) for the concurrent fan-out in fetch_sources.
+SOURCE_TIMEOUTS = {
+    "prices": 20,
+    "income_statement": 15,
+    "cash_flow": 15,
+    "eps_data": 15,
+    "analyst_recommendations": 15,
+}
+
+# Cache key prefix -> freshness policy (see ttl_policy.py)
+CACHE_TTLS = {
+    "prices_": ttl_rule("daily_bars"),
+    "history_": ttl_rule("daily_bars"),
+    "all_data_": ttl_rule("daily_bars"),
+    "income_stmt_": ttl_rule("fundamentals"),
+    "cash_flow_": ttl_rule("fundamentals"),
+    "eps_data_": ttl_rule("eps_revisions"),
+    "analyst_recommendations_": ttl_rule("analyst_targets"),
+    "stock_": ttl_rule("narrative"),
+}
+
+def store_is_fresh(ticker, coverage):
+    """Whether stored daily bars were refreshed recently enough to skip yfinance."""
+    return time.time() < expires_at("daily_bars", ticker, coverage["refreshed_at"])
+
+def has_new_actions(hist, after: str) -> bool:
+    """Whether a yfinance frame has a dividend or split dated after `after`.
+
+    Prices are split/dividend adjusted as of download time, so bars stored
+    before such an action no longer line up with the ones fetched after it.
+    """
+    if hist is None or hist.empty:
+        return False
+    index = hist.index.tz_localize(None) if getattr(hist.index, "tz", None) is not None else hist.index
+    later = index.to_numpy(dtype="datetime64[D]") > np.datetime64(after, "D")
+    for column in ("Dividends", "Stock Splits"):
+        if column in hist and (np.nan_to_num(hist[column].to_numpy(dtype=np.float64))[later] != 0).any():
+            return True
+    return False
+
 class StockAnalyzerAgent:
     def __init__(self):
         groq_api_key = os.getenv("GROQ_API_KEY")
-        self.groq_client = Groq(api_key=groq_api_key) if groq_api_key else None
+        self.groq_client = AsyncGroq(api_key=groq_api_key) if groq_api_key else None
         logger.info(f"Groq API key loaded: {'Yes' if groq_api_key else 'No'}")
         if not self.groq_client:
             raise ValueError("Missing GROQ_API_KEY in .env file")
-        self.cache = TTLCache(maxsize=100, ttl=3600)
+        self.cache = SharedTTLCache("stock_analyzer", maxsize=100, ttl=3600, stale_ttl=STALE_SECONDS, ttls=CACHE_TTLS)
+        self.bar_store = BarStore()
+
+    @stale_while_revalidate("prices_{ticker}")
+    @coalesce("prices")
+    async def fetch_price_series(self, ticker, retries=3, stock=None):
+        """Fetch 1 year of daily OHLCV data as a columnar PriceSeries.
 
-    def fetch_stock_prices(self, ticker, retries=3):
-        """Fetch 1 year of historical OHLCV data from yfinance."""
-        logger.info(f"Fetching historical prices for {ticker} from yfinance")
+        Bars are served from the persistent BarStore. Upstream is only asked for
+        bars from the last stored date onwards (that bar is re-read because it
+        may have been partial), or for the full year if nothing is stored yet.
+        """
+        logger.info(f"Fetching historical prices for {ticker}")
         cache_key = f"prices_{ticker}"
-        if cache_key in self.cache:
+        cached = await self.cache.aget(cache_key)
+        if cached is not None:
             logger.info(f"Returning cached prices for {ticker}")
-            return self.cache[cache_key]
+            return cached
+
+        start_date = (datetime.now() - timedelta(days=HISTORY_DAYS)).strftime('%Y-%m-%d')
+        coverage = await run_blocking(self.bar_store.coverage, ticker, "1d")
+        covered = coverage is not None and coverage["covered_from"] <= start_date and coverage["last_date"]
+        if covered and store_is_fresh(ticker, coverage):
+            logger.info(f"Stored prices for {ticker} are fresh; skipping yfinance")
+        else:
+            fetch_from = coverage["last_date"] if covered else start_date
+            refreshed = False
+            try:
+                stock = stock if stock is not None else yf.Ticker(ticker)
+                hist = await provider("yahoo").call(stock.history, start=fetch_from, end=datetime.now(), interval="1d", attempts=retries)
+                if covered and has_new_actions(hist, coverage["last_date"]):
+                    await self._reload_adjusted(ticker, coverage["covered_from"], retries, stock)
+                else:
+                    new_bars = PriceSeries.from_history(hist) if not hist.empty else None
+                    await run_blocking(self.bar_store.save, ticker, "1d", new_bars, covered_from=fetch_from)
+                    logger.info(f"Fetched {len(new_bars) if new_bars else 0} bars since {fetch_from} for {ticker} from yfinance")
+                refreshed = True
+            except Exception as e:
+                logger.error(f"Failed fetching prices from yfinance for {ticker}: {str(e)}")
+            if not refreshed and not covered:
+                logger.error(f"No price data available for {ticker}")
+                return f"No price data available for {ticker}."
+            if not refreshed:
+                logger.warning(f"Serving stored prices for {ticker}; yfinance refresh failed")
+
+        series = await run_blocking(self.bar_store.load, ticker, "1d", start_date)
+        if not len(series):
+            logger.warning(f"No price data found for {ticker}")
+            return f"No price data available for {ticker}."
+        await self.cache.aset(cache_key, series)
+        return series
+
+    async def _reload_adjusted(self, ticker, covered_from, retries=3, stock=None):
+        """Replace every stored bar with a freshly adjusted download of the
+        covered range, after a split or dividend made the stored ones stale."""
+        logger.info(f"New split/dividend for {ticker}; re-fetching stored history since {covered_from}")
+        stock = stock if stock is not None else yf.Ticker(ticker)
+        if covered_from <= MAX_HISTORY_START:
+            hist = await provider("yahoo").call(stock.history, period="max", interval="1d", attempts=retries)
+        else:
+            hist = await provider("yahoo").call(stock.history, start=covered_from, end=datetime.now(), interval="1d", attempts=retries)
+        if hist.empty:
+            raise ValueError(f"Re-adjusted history for {ticker} came back empty")
+        await run_blocking(self.bar_store.save, ticker, "1d", PriceSeries.from_history(hist), covered_from=covered_from, replace=True)
+        logger.info(f"Replaced stored history for {ticker} with {len(hist)} re-adjusted bars")
 
-        for attempt in range(retries):
+    async def fetch_price_history(self, ticker, days=None, retries=3):
+        """Daily bars for the last `days` days, or the full history when days is None.
+
+        The last year comes from fetch_price_series (which keeps the tail fresh);
+        older bars are backfilled into the BarStore once and served from there.
+        """
+        if days is not None and days <= HISTORY_DAYS:
+            series = await self.fetch_price_series(ticker, retries)
+            if isinstance(series, str):
+                return series
+            return series.since((datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d'))
+        return await flights.do(("price_history", ticker, days), self._fetch_long_history, ticker, days, retries)
+
+    async def _fetch_long_history(self, ticker, days, retries):
+        cache_key = f"history_{ticker}_{days or 'max'}"
+        cached = await self.cache.aget(cache_key)
+        if cached is not None:
+            logger.info(f"Returning cached {days or 'max'}-day history for {ticker}")
+            return cached
+
+        recent = await self.fetch_price_series(ticker, retries)
+        if isinstance(recent, str):
+            return recent
+        start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d') if days else MAX_HISTORY_START
+        coverage = await run_blocking(self.bar_store.coverage, ticker, "1d")
+        if coverage is None or coverage["covered_from"] > start_date:
             try:
                 stock = yf.Ticker(ticker)
-                end_date = datetime.now()
-                start_date = end_date - timedelta(days=365)
-                hist = stock.history(start=start_date, end=end_date, interval="1d")
+                # raise_errors so network failures surface instead of an empty frame
+                if days:
+                    # yfinance's end is exclusive; bars from covered_from on are already stored
+                    hist = await provider("yahoo").call(
+                        stock.history, start=start_date, end=coverage["covered_from"] if coverage else None,
+                        interval="1d", raise_errors=True, attempts=retries,
+                    )
+                else:
+                    hist = await provider("yahoo").call(stock.history, period="max", interval="1d", raise_errors=True, attempts=retries)
+                # Coverage only extends when bars came back, so a failed backfill is retried later
                 if hist.empty:
-                    logger.warning(f"No price data found for {ticker} on yfinance")
-                    return f"No price data available for {ticker}."
-
-                prices = [
-                    {
-                        "date": index.strftime('%Y-%m-%d'),
-                        "open": round(row['Open'], 2),
-                        "high": round(row['High'], 2),
-                        "low": round(row['Low'], 2),
-                        "close": round(row['Close'], 2),
-                        "volume": int(row['Volume'])
-                    }
-                    for index, row in hist.iterrows()
-                ]
-                self.cache[cache_key] = prices
-                logger.info(f"Fetched {len(prices)} price points for {ticker} from yfinance")
-                return prices
+                    logger.warning(f"Backfill since {start_date} for {ticker} returned no bars; coverage unchanged")
+                else:
+                    older = PriceSeries.from_history(hist)
+                    await run_blocking(self.bar_store.save, ticker, "1d", older, covered_from=start_date)
+                    logger.info(f"Backfilled {len(older)} bars since {start_date} for {ticker}")
+            except Exception as e:
+                logger.warning(f"Serving partial history for {ticker}; backfill failed: {str(e)}")
+
+        series = await run_blocking(self.bar_store.load, ticker, "1d", start_date if days else None)
+        await self.cache.aset(cache_key, series)
+        return series
+
+    async def prefetch_price_series(self, tickers, retries=3, days=HISTORY_DAYS):
+        """Refresh stored daily bars for many tickers with bulk multi-symbol downloads.
+
+        Tickers whose stored bars are still fresh are skipped. The rest are
+        grouped by the date they need bars from (last stored date, or `days`
+        back when fewer days are stored) so a watchlist costs a handful of
+        yf.download calls instead of one history call per symbol. Later
+        fetch_price_series calls then find fresh coverage and read straight
+        from the store. Returns the refreshed tickers.
+        """
+        start_date = (datetime.now() - timedelta(days=max(days, HISTORY_DAYS))).strftime('%Y-%m-%d')
+        groups = {}
+        coverages = {}
+        for ticker in dict.fromkeys(tickers):
+            coverage = await run_blocking(self.bar_store.coverage, ticker, "1d")
+            covered = coverage is not None and coverage["covered_from"] <= start_date and coverage["last_date"]
+            if covered and store_is_fresh(ticker, coverage):
+                continue
+            if covered:
+                coverages[ticker] = coverage
+            groups.setdefault(coverage["last_date"] if covered else start_date, []).append(ticker)
+
+        refreshed = []
+        for fetch_from, group in groups.items():
+            try:
+                frames = await provider("yahoo").call(download_bulk, group, start=fetch_from, end=datetime.now(), interval="1d", attempts=retries)
+                for ticker, hist in frames.items():
+                    coverage = coverages.get(ticker)
+                    if coverage is not None and has_new_actions(hist, coverage["last_date"]):
+                        try:
+                            await self._reload_adjusted(ticker, coverage["covered_from"], retries)
+                        except Exception as e:
+                            logger.error(f"Failed re-adjusting stored prices for {ticker}: {str(e)}")
+                            continue
+                    else:
+                        try:
+                            await run_blocking(self.bar_store.save, ticker, "1d", PriceSeries.from_history(hist), covered_from=fetch_from)
+                        except Exception as e:
+                            logger.error(f"Failed storing bulk prices for {ticker}: {str(e)}")
+                            continue
+                    refreshed.append(ticker)
+                logger.info(f"Bulk refreshed {len(frames)}/{len(group)} tickers since {fetch_from}")
             except Exception as e:
-                logger.error(f"Attempt {attempt + 1} failed fetching prices from yfinance for {ticker}: {str(e)}")
-                if attempt < retries - 1:
-                    time.sleep(2 ** attempt)
-        logger.error(f"No price data available for {ticker} after {retries} retries")
-        return f"No price data available for {ticker} after {retries} retries."
+                logger.error(f"Failed bulk fetching prices since {fetch_from}: {str(e)}")
+        return refreshed
 
-    def fetch_income_statement(self, ticker, retries=3):
+    async def fetch_stock_prices(self, ticker, retries=3, stock=None):
+        """Fetch 1 year of historical OHLCV data as a list of per-bar dicts."""
+        series = await self.fetch_price_series(ticker, retries, stock=stock)
+        if isinstance(series, str):
+            return series
+        return series.to_records()
+
+    @stale_while_revalidate("income_stmt_{ticker}")
+    @coalesce("income_statement")
+    async def fetch_income_statement(self, ticker, retries=3, stock=None):
         """Fetch quarterly income statement data from yfinance."""
         logger.info(f"Fetching income statement for {ticker} from yfinance")
         cache_key = f"income_stmt_{ticker}"
-        if cache_key in self.cache:
+        cached = await self.cache.aget(cache_key)
+        if cached is not None:
             logger.info(f"Returning cached income statement for {ticker}")
-            return self.cache[cache_key]
+            fundamentals_store.put(ticker, "income_statement", cached)
+            return cached
 
-        for attempt in range(retries):
-            try:
-                stock = yf.Ticker(ticker)
-                income_stmt = stock.get_income_stmt(freq="quarterly")
-                if income_stmt.empty:
-                    logger.warning(f"No income statement data found for {ticker}")
-                    return f"No income statement data available for {ticker}."
-                data = income_stmt.to_dict()
-                formatted_data = {
-                    "total_revenue": data.get("TotalRevenue", {}),
-                    "net_income": data.get("NetIncome", {}),
-                    "gross_profit": data.get("GrossProfit", {}),
-                    "operating_income": data.get("OperatingIncome", {})
-                }
-                self.cache[cache_key] = formatted_data
-                logger.info(f"Fetched income statement for {ticker}")
-                return formatted_data
-            except Exception as e:
-                logger.error(f"Attempt {attempt + 1} failed fetching income statement for {ticker}: {str(e)}")
-                if attempt < retries - 1:
-                    time.sleep(2 ** attempt)
+        try:
+            stock = stock if stock is not None else yf.Ticker(ticker)
+            income_stmt = await provider("yahoo").call(stock.get_income_stmt, freq="quarterly", attempts=retries)
+            if income_stmt.empty:
+                logger.warning(f"No income statement data found for {ticker}")
+                return f"No income statement data available for {ticker}."
+            statement = Statement.from_frame(income_stmt, INCOME_METRICS)
+            await self.cache.aset(cache_key, statement)
+            fundamentals_store.put(ticker, "income_statement", statement)
+            logger.info(f"Fetched {len(statement)} quarters of income statement for {ticker}")
+            return statement
+        except Exception as e:
+            logger.error(f"Failed fetching income statement for {ticker}: {str(e)}")
         logger.error(f"No income statement data available for {ticker}")
         return f"No income statement data available for {ticker}."
 
-    def fetch_cash_flow(self, ticker, retries=3):
+    @stale_while_revalidate("cash_flow_{ticker}")
+    @coalesce("cash_flow")
+    async def fetch_cash_flow(self, ticker, retries=3, stock=None):
         """Fetch quarterly cash flow data from yfinance."""
         logger.info(f"Fetching cash flow for {ticker} from yfinance")
         cache_key = f"cash_flow_{ticker}"
-        if cache_key in self.cache:
+        cached = await self.cache.aget(cache_key)
+        if cached is not None:
             logger.info(f"Returning cached cash flow for {ticker}")
-            return self.cache[cache_key]
+            fundamentals_store.put(ticker, "cash_flow", cached)
+            return cached
 
-        for attempt in range(retries):
-            try:
-                stock = yf.Ticker(ticker)
-                cash_flow = stock.get_cash_flow(freq="quarterly")
-                if cash_flow.empty:
-                    logger.warning(f"No cash flow data found for {ticker}")
-                    return f"No cash flow data available for {ticker}."
-                data = cash_flow.to_dict()
-                formatted_data = {
-                    "operating_cash_flow": data.get("OperatingCashFlow", {}),
-                    "free_cash_flow": data.get("FreeCashFlow", {})
-                }
-                self.cache[cache_key] = formatted_data
-                logger.info(f"Fetched cash flow for {ticker}")
-                return formatted_data
-            except Exception as e:
-                logger.error(f"Attempt {attempt + 1} failed fetching cash flow for {ticker}: {str(e)}")
-                if attempt < retries - 1:
-                    time.sleep(2 ** attempt)
+        try:
+            stock = stock if stock is not None else yf.Ticker(ticker)
+            cash_flow = await provider("yahoo").call(stock.get_cash_flow, freq="quarterly", attempts=retries)
+            if cash_flow.empty:
+                logger.warning(f"No cash flow data found for {ticker}")
+                return f"No cash flow data available for {ticker}."
+            statement = Statement.from_frame(cash_flow, CASH_FLOW_METRICS)
+            await self.cache.aset(cache_key, statement)
+            fundamentals_store.put(ticker, "cash_flow", statement)
+            logger.info(f"Fetched {len(statement)} quarters of cash flow for {ticker}")
+            return statement
+        except Exception as e:
+            logger.error(f"Failed fetching cash flow for {ticker}: {str(e)}")
         logger.error(f"No cash flow data available for {ticker}")
         return f"No cash flow data available for {ticker}."
 
-    def fetch_eps_data(self, ticker, retries=3):
+    @stale_while_revalidate("eps_data_{ticker}")
+    @coalesce("eps_data")
+    async def fetch_eps_data(self, ticker, retries=3, stock=None):
         """Fetch EPS trend and revision data from yfinance."""
         logger.info(f"Fetching EPS trend and revision for {ticker} from yfinance")
         cache_key = f"eps_data_{ticker}"
-        if cache_key in self.cache:
+        cached = await self.cache.aget(cache_key)
+        if cached is not None:
             logger.info(f"Returning cached EPS data for {ticker}")
-            return self.cache[cache_key]
+            self._index_eps(ticker, cached)
+            return cached
 
-        for attempt in range(retries):
-            try:
-                stock = yf.Ticker(ticker)
-                eps_trend = getattr(stock, 'get_eps_trend', lambda: None)()
-                eps_revision = getattr(stock, 'get_eps_revision', lambda: None)()
-                if eps_trend is None and eps_revision is None:
-                    logger.warning(f"No EPS data found for {ticker}")
-                    return f"No EPS data available for {ticker}."
-                formatted_data = {
-                    "eps_trend": (eps_trend.to_dict() if hasattr(eps_trend, 'empty') and not eps_trend.empty else {}) if eps_trend is not None else {},
-                    "eps_revision": (eps_revision.to_dict() if hasattr(eps_revision, 'empty') and not eps_revision.empty else {}) if eps_revision is not None else {}
-                }
-                self.cache[cache_key] = formatted_data
-                logger.info(f"Fetched EPS data for {ticker}")
-                return formatted_data
-            except Exception as e:
-                logger.error(f"Attempt {attempt + 1} failed fetching EPS data for {ticker}: {str(e)}")
-                if attempt < retries - 1:
-                    time.sleep(2 ** attempt)
+        try:
+            stock = stock if stock is not None else yf.Ticker(ticker)
+            eps_trend = await provider("yahoo").call(getattr(stock, 'get_eps_trend', lambda: None), attempts=retries)
+            eps_revision = await provider("yahoo").call(getattr(stock, 'get_eps_revision', lambda: None), attempts=retries)
+            if eps_trend is None and eps_revision is None:
+                logger.warning(f"No EPS data found for {ticker}")
+                return f"No EPS data available for {ticker}."
+            formatted_data = {
+                "eps_trend": Statement.from_frame(eps_trend, EPS_TREND_FIELDS, dated=False),
+                "eps_revision": Statement.from_frame(eps_revision, EPS_REVISION_FIELDS, dated=False),
+            }
+            await self.cache.aset(cache_key, formatted_data)
+            self._index_eps(ticker, formatted_data)
+            logger.info(f"Fetched EPS data for {ticker}")
+            return formatted_data
+        except Exception as e:
+            logger.error(f"Failed fetching EPS data for {ticker}: {str(e)}")
         logger.error(f"No EPS data available for {ticker}")
         return f"No EPS data available for {ticker}."
 
-    def fetch_analyst_recommendations(self, ticker, retries=3):
+    @staticmethod
+    def _index_eps(ticker, eps_data):
+        for kind, statement in eps_data.items():
+            fundamentals_store.put(ticker, kind, statement)
+
+    @stale_while_revalidate("analyst_recommendations_{ticker}")
+    @coalesce("analyst_recommendations")
+    async def fetch_analyst_recommendations(self, ticker, retries=3, stock=None):
         """Fetch analyst price targets and recommendations from yfinance."""
         logger.info(f"Fetching analyst recommendations for {ticker} from yfinance")
         cache_key = f"analyst_recommendations_{ticker}"
-        if cache_key in self.cache:
+        cached = await self.cache.aget(cache_key)
+        if cached is not None:
             logger.info(f"Returning cached analyst recommendations for {ticker}")
-            return self.cache[cache_key]
+            return cached
 
-        for attempt in range(retries):
-            try:
-                stock = yf.Ticker(ticker)
-                price_targets = stock.get_analyst_price_targets()
-                if not price_targets:
-                    logger.warning(f"No analyst recommendations found for {ticker}")
-                    return f"No analyst recommendations available for {ticker}."
-                formatted_data = {
-                    "mean_price_target": price_targets.get("mean", None),
-                    "high_price_target": price_targets.get("high", None),
-                    "low_price_target": price_targets.get("low", None),
-                    "number_of_analysts": price_targets.get("numberOfAnalystOpinions", None)
-                }
-                self.cache[cache_key] = formatted_data
-                logger.info(f"Fetched analyst recommendations for {ticker}")
-                return formatted_data
-            except Exception as e:
-                logger.error(f"Attempt {attempt + 1} failed fetching analyst recommendations for {ticker}: {str(e)}")
-                if attempt < retries - 1:
-                    time.sleep(2 ** attempt)
+        try:
+            stock = stock if stock is not None else yf.Ticker(ticker)
+            price_targets = await provider("yahoo").call(stock.get_analyst_price_targets, attempts=retries)
+            if not price_targets:
+                logger.warning(f"No analyst recommendations found for {ticker}")
+                return f"No analyst recommendations available for {ticker}."
+            formatted_data = {
+                "mean_price_target": price_targets.get("mean", None),
+                "high_price_target": price_targets.get("high", None),
+                "low_price_target": price_targets.get("low", None),
+                "number_of_analysts": price_targets.get("numberOfAnalystOpinions", None)
+            }
+            await self.cache.aset(cache_key, formatted_data)
+            logger.info(f"Fetched analyst recommendations for {ticker}")
+            return formatted_data
+        except Exception as e:
+            logger.error(f"Failed fetching analyst recommendations for {ticker}: {str(e)}")
         logger.error(f"No analyst recommendations available for {ticker}")
         return f"No analyst recommendations available for {ticker}."
 
+    async def data_version(self, kind, ticker):
+        """Cache version of a stored result ("prices" or "all_data"), or None."""
+        return await self.cache.aversion(f"{kind}_{ticker}")
+
+    async def freshness(self, kind, ticker):
+        """{age, stale} of a stored result ("prices", "stock", "all_data") for responses."""
+        entry = await self.cache.aentry(f"{kind}_{ticker}")
+        if entry is None:
+            return {"age": 0.0, "stale": False}
+        return {"age": round(entry["age"], 1), "stale": entry["stale"]}
+
+    async def fetch_sources(self, ticker, retries=3, sources=None):
+        """Fetch yfinance data sources concurrently against one shared Ticker handle.
+
+        Each source runs under its own timeout from SOURCE_TIMEOUTS. A failed or
+        timed-out source comes back as an error string, as the individual fetch
+        methods do, so callers always get partial results.
+        """
+        sources = list(sources or SOURCE_TIMEOUTS)
+        fetchers = {
+            "prices": self.fetch_price_series,
+            "income_statement": self.fetch_income_statement,
+            "cash_flow": self.fetch_cash_flow,
+            "eps_data": self.fetch_eps_data,
+            "analyst_recommendations": self.fetch_analyst_recommendations,
+        }
+        stock = yf.Ticker(ticker)
+
+        async def fetch(source):
+            try:
+                return await asyncio.wait_for(fetchers[source](ticker, retries, stock=stock), timeout=SOURCE_TIMEOUTS[source])
+            except asyncio.TimeoutError:
+                logger.error(f"Timed out fetching {source} for {ticker} after {SOURCE_TIMEOUTS[source]}s")
+                return f"Timed out fetching {source.replace('_', ' ')} for {ticker}."
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(fetch(source) for source in sources))
+        logger.info(f"Fetched {len(sources)} sources for {ticker} in {time.perf_counter() - start:.2f}s")
+        return dict(zip(sources, results))
+
+    @staticmethod
+    def closes_array(prices):
+        """Closing prices as a float array from a PriceSeries or a list of bar dicts."""
+        if isinstance(prices, PriceSeries):
+            return prices.close
+        if not prices or isinstance(prices, str):
+            return np.empty(0)
+        return np.fromiter((p["close"] for p in prices), dtype=np.float64, count=len(prices))
+
     def calculate_technicals(self, prices):
-        """Calculate technical indicators (SMA20, RSI) from price data."""
-        if not prices or isinstance(prices, str) or len(prices) < 20:
+        """Calculate technical indicators (SMA20, Wilder RSI14) from price data."""
+        closes = self.closes_array(prices)
+        if len(closes) < 20:
             logger.warning("Insufficient price data for technical analysis")
             return {"sma20": 0.0, "rsi": 0.0}
-        closes = [p["close"] for p in prices]
-        sma20 = np.mean(closes[-20:])
+        sma20 = closes[-20:].mean()
         rsi = self.calculate_rsi(closes)
-        return {"sma20": round(sma20, 2), "rsi": round(rsi, 2)}
+        return {"sma20": round(float(sma20), 2), "rsi": round(float(rsi), 2)}
 
     def calculate_rsi(self, prices, period=14):
-        """Calculate RSI for given prices."""
-        if len(prices) < period:
-            return 0.0
-        deltas = np.diff(prices)
-        gains = deltas[deltas > 0]
-        losses = -deltas[deltas < 0]
-        avg_gain = np.mean(gains[-period:]) if len(gains) >= period else 0
-        avg_loss = np.mean(losses[-period:]) if len(losses) >= period else 0
-        rs = avg_gain / avg_loss if avg_loss != 0 else 0
-        return 100 - (100 / (1 + rs))
+        """Latest Wilder RSI for given prices (0.0 if there are too few)."""
+        value = indicators.latest(indicators.rsi(prices, period))
+        return value if value is not None else 0.0
 
     def calculate_confidence(self, prices, analyst_recommendations):
         """Calculate confidence score based on price volatility and analyst coverage."""
-        if not prices or isinstance(prices, str):
+        closes = self.closes_array(prices)
+        if not len(closes):
             return 0.0
-        closes = [p["close"] for p in prices]
-        volatility = np.std(closes) / np.mean(closes) if closes else 0.0
+        volatility = float(closes.std() / closes.mean())
         volatility_score = max(0.0, 1.0 - volatility)
         if isinstance(analyst_recommendations, str):
             num_analysts = 0
@@ -226,48 +459,55 @@ class StockAnalyzerAgent:
         analyst_score = 0.5 if num_analysts > 0 else 0.0
         return round(0.7 * volatility_score + 0.3 * analyst_score, 2)
 
-    def analyze_stock(self, ticker, market_context, retries=3):
-        """Analyze stock using combined yfinance data."""
+    @stale_while_revalidate("stock_{ticker}")
+    @coalesce("stock_analysis")
+    async def analyze_stock(self, ticker, market_context, retries=3, data=None, on_token=None):
+        """Analyze stock using combined yfinance data.
+
+        `data` may hold already-fetched sources (as returned by fetch_sources);
+        otherwise they are fetched here. `on_token` streams the LLM output.
+        """
         logger.info(f"Analyzing stock {ticker}")
         cache_key = f"stock_{ticker}"
-        if cache_key in self.cache:
+        cached = await self.cache.aget(cache_key)
+        if cached is not None:
             logger.info(f"Returning cached analysis for {ticker}")
-            return self.cache[cache_key]
+            return cached
 
-        prices = self.fetch_stock_prices(ticker, retries)
-        income_stmt = self.fetch_income_statement(ticker, retries)
-        cash_flow = self.fetch_cash_flow(ticker, retries)
-        eps_data = self.fetch_eps_data(ticker, retries)
-        analyst_recommendations = self.fetch_analyst_recommendations(ticker, retries)
+        if data is None:
+            data = await self.fetch_sources(ticker, retries)
+        prices = data["prices"]
+        income_stmt = data["income_statement"]
+        cash_flow = data["cash_flow"]
+        eps_data = data["eps_data"]
+        analyst_recommendations = data["analyst_recommendations"]
         technicals = self.calculate_technicals(prices)
 
         prompt = f"Analyze the stock {ticker} for investment potential based on:\n"
         if not isinstance(prices, str):
-            prompt += f"- 30-day closing prices: {[p['close'] for p in prices[-10:]]} (latest: {prices[-1]['close']})\n"
+            prompt += f"- 30-day closing prices: {prices.close[-10:].tolist()} (latest: {prices.latest_close})\n"
             prompt += f"- Technical indicators: SMA20={technicals.get('sma20', 0.0):.2f}, RSI={technicals.get('rsi', 0.0):.2f}\n"
-        if not isinstance(income_stmt, str):
-            latest_quarter = max(income_stmt["total_revenue"].keys(), default=None) if income_stmt["total_revenue"] else None
-            if latest_quarter:
-                prompt += (
-                    f"- Income Statement (latest quarter {latest_quarter}):\n"
-                    f"  - Total Revenue: {income_stmt['total_revenue'].get(latest_quarter, 'N/A')}\n"
-                    f"  - Net Income: {income_stmt['net_income'].get(latest_quarter, 'N/A')}\n"
-                    f"  - Operating Income: {income_stmt['operating_income'].get(latest_quarter, 'N/A')}\n"
-                )
-        if not isinstance(cash_flow, str):
-            latest_quarter = max(cash_flow["operating_cash_flow"].keys(), default=None) if cash_flow["operating_cash_flow"] else None
-            if latest_quarter:
-                prompt += (
-                    f"- Cash Flow (latest quarter {latest_quarter}):\n"
-                    f"  - Operating Cash Flow: {cash_flow['operating_cash_flow'].get(latest_quarter, 'N/A')}\n"
-                    f"  - Free Cash empujar: {cash_flow['free_cash_flow'].get(latest_quarter, 'N/A')}\n"
-                )
+        if not isinstance(income_stmt, str) and len(income_stmt):
+            prompt += (
+                f"- Income Statement (latest quarter {income_stmt.latest_period}):\n"
+                f"  - Total Revenue: {format_amount(income_stmt.latest('total_revenue'))}"
+                f" (QoQ {format_change(income_stmt.growth('total_revenue'))}, YoY {format_change(income_stmt.growth('total_revenue', 4))})\n"
+                f"  - Net Income: {format_amount(income_stmt.latest('net_income'))}\n"
+                f"  - Operating Income: {format_amount(income_stmt.latest('operating_income'))}\n"
+            )
+        if not isinstance(cash_flow, str) and len(cash_flow):
+            prompt += (
+                f"- Cash Flow (latest quarter {cash_flow.latest_period}):\n"
+                f"  - Operating Cash Flow: {format_amount(cash_flow.latest('operating_cash_flow'))}\n"
+                f"  - Free Cash Flow: {format_amount(cash_flow.latest('free_cash_flow'))}\n"
+            )
         if not isinstance(eps_data, str):
+            eps_trend, eps_revision = eps_data["eps_trend"], eps_data["eps_revision"]
             prompt += (
                 f"- EPS Data:\n"
-                f"  - Current Quarter EPS Estimate: {eps_data['eps_trend'].get('currentQuarter', {}).get('epsEstimate', 'N/A')}\n"
-                f"  - EPS Revision (Up/Down): {eps_data['eps_revision'].get('currentQuarter', {}).get('numberOfAnalystsRevisedUp', 0)} up, "
-                f"{eps_data['eps_revision'].get('currentQuarter', {}).get('numberOfAnalystsRevisedDown', 0)} down\n"
+                f"  - Current Quarter EPS Estimate: {format_amount(eps_trend.value('0q', 'current'), 2)}\n"
+                f"  - EPS Revisions (last 30 days): {int(eps_revision.value('0q', 'up_last_30_days') or 0)} up, "
+                f"{int(eps_revision.value('0q', 'down_last_30_days') or 0)} down\n"
             )
         if not isinstance(analyst_recommendations, str):
             prompt += (
@@ -278,67 +518,63 @@ class StockAnalyzerAgent:
         prompt += f"- Market context: {market_context[:500]}\n"
         prompt += "Provide a concise analysis (150-200 words) covering trends, risks, opportunities, and an investment recommendation."
 
-        for attempt in range(retries):
-            try:
-                response = self.groq_client.chat.completions.create(
-                    messages=[{"role": "user", "content": prompt}],
-                    model="llama-3.3-70b-versatile",
-                    max_tokens=250
-                )
-                analysis = response.choices[0].message.content
-                confidence = self.calculate_confidence(prices, analyst_recommendations)
-                result = {
-                    "analysis": analysis,
-                    "confidence": confidence,
-                    "prices": prices if not isinstance(prices, str) else [],
-                    "income_statement": income_stmt if not isinstance(income_stmt, str) else {},
-                    "cash_flow": cash_flow if not isinstance(cash_flow, str) else {},
-                    "eps_data": eps_data if not isinstance(eps_data, str) else {},
-                    "analyst_recommendations": analyst_recommendations if not isinstance(analyst_recommendations, str) else {},
-                    "technicals": technicals
-                }
-                self.cache[cache_key] = result
-                logger.info(f"Stock analysis completed for {ticker}")
-                return result
-            except Exception as e:
-                logger.error(f"Attempt {attempt + 1} failed: {str(e)}")
-                if attempt < retries - 1:
-                    time.sleep(2 ** attempt)
+        try:
+            analysis = await provider("groq").call(complete, self.groq_client, prompt, max_tokens=250, on_token=on_token, attempts=retries)
+            confidence = self.calculate_confidence(prices, analyst_recommendations)
+            result = {
+                "analysis": analysis,
+                "confidence": confidence,
+                "prices": prices if not isinstance(prices, str) else PriceSeries.empty(),
+                "income_statement": income_stmt if not isinstance(income_stmt, str) else {},
+                "cash_flow": cash_flow if not isinstance(cash_flow, str) else {},
+                "eps_data": eps_data if not isinstance(eps_data, str) else {},
+                "analyst_recommendations": analyst_recommendations if not isinstance(analyst_recommendations, str) else {},
+                "technicals": technicals
+            }
+            await self.cache.aset(cache_key, result)
+            logger.info(f"Stock analysis completed for {ticker}")
+            return result
+        except Exception as e:
+            logger.error(f"Stock analysis failed for {ticker}: {str(e)}")
 
         # Fallback: preserve fetched data even if LLM call failed
         error_msg = "Error generating analysis. Based on available data."
-        confidence = self.calculate_confidence(prices if not isinstance(prices, str) else [], analyst_recommendations if not isinstance(analyst_recommendations, str) else {})
+        confidence = self.calculate_confidence(prices, analyst_recommendations if not isinstance(analyst_recommendations, str) else {})
         result = {
             "analysis": error_msg + f"\nMarket context: {market_context[:200]}",
             "confidence": confidence,
-            "prices": prices if not isinstance(prices, str) else [],
+            "prices": prices if not isinstance(prices, str) else PriceSeries.empty(),
             "income_statement": income_stmt if not isinstance(income_stmt, str) else {},
             "cash_flow": cash_flow if not isinstance(cash_flow, str) else {},
             "eps_data": eps_data if not isinstance(eps_data, str) else {},
             "analyst_recommendations": analyst_recommendations if not isinstance(analyst_recommendations, str) else {},
             "technicals": technicals
         }
-        self.cache[cache_key] = result
+        await self.cache.aset(cache_key, result)
         return result
 
-    def fetch_all_data(self, ticker, retries=3):
+    @stale_while_revalidate("all_data_{ticker}")
+    @coalesce("all_data")
+    async def fetch_all_data(self, ticker, retries=3):
         """Fetch all data (prices, income statement, cash flow, EPS data, analyst recommendations, technicals) and return as JSON."""
         logger.info(f"Fetching all data for {ticker}")
         cache_key = f"all_data_{ticker}"
-        if cache_key in self.cache:
+        cached = await self.cache.aget(cache_key)
+        if cached is not None:
             logger.info(f"Returning cached all data for {ticker}")
-            return self.cache[cache_key]
+            return cached
 
-        prices = self.fetch_stock_prices(ticker, retries)
-        income_stmt = self.fetch_income_statement(ticker, retries)
-        cash_flow = self.fetch_cash_flow(ticker, retries)
-        eps_data = self.fetch_eps_data(ticker, retries)
-        analyst_recommendations = self.fetch_analyst_recommendations(ticker, retries)
+        data = await self.fetch_sources(ticker, retries)
+        prices = data["prices"]
+        income_stmt = data["income_statement"]
+        cash_flow = data["cash_flow"]
+        eps_data = data["eps_data"]
+        analyst_recommendations = data["analyst_recommendations"]
         technicals = self.calculate_technicals(prices)
 
         result = {
             "ticker": ticker,
-            "historical_prices": prices if not isinstance(prices, str) else [],
+            "historical_prices": prices if not isinstance(prices, str) else PriceSeries.empty(),
             "income_statement": income_stmt if not isinstance(income_stmt, str) else {},
             "cash_flow": cash_flow if not isinstance(cash_flow, str) else {},
             "eps_data": eps_data if not isinstance(eps_data, str) else {},
@@ -360,6 +596,6 @@ class StockAnalyzerAgent:
         if isinstance(analyst_recommendations, str):
             result["errors"].append(analyst_recommendations)
 
-        self.cache[cache_key] = result
+        await self.cache.aset(cache_key, result)
         logger.info(f"Fetched all data for {ticker}")
         return result
\ No newline at end of file
@@ -0,0 +1,110 @@
+import time
+import logging
+from datetime import datetime, timedelta, time as dtime
+from zoneinfo import ZoneInfo
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Regular sessions, Monday to Friday. Exchange holidays are not modelled: on a
+# holiday the open-session TTLs apply, which only costs extra refetches.
+EXCHANGES = {
+    "US": {"tz": ZoneInfo("America/New_York"), "open": dtime(9, 30), "close": dtime(16, 0)},
+    "NSE": {"tz": ZoneInfo("Asia/Kolkata"), "open": dtime(9, 15), "close": dtime(15, 30)},
+}
+EXCHANGE_SUFFIXES = {".NS": "NSE", ".BO": "NSE"}  # BSE keeps NSE's hours
+
+# Daily bars are only final some time after the close
+CLOSE_SETTLE_SECONDS = 20 * 60
+
+# Per data type:
+# - open: TTL while the ticker's exchange is in session
+# - closed: cap on the TTL while it is shut (entries otherwise live until the
+#   next session opens, since nothing upstream changes overnight or at weekends);
+#   None = no cap
+# - market: False for data that does not follow trading hours (flat `open` TTL)
+# - at_close: entries written in session expire once the close has settled
+POLICIES = {
+    "fundamentals": {"open": 24 * 3600, "market": False},  # quarterly statements
+    "analyst_targets": {"open": 12 * 3600, "market": False},
+    "eps_revisions": {"open": 6 * 3600, "closed": None},
+    "daily_bars": {"open": 15 * 60, "closed": None, "at_close": True},
+    "intraday": {"open": 10, "closed": None},
+    "news": {"open": 30 * 60, "closed": 2 * 3600},
+    "narrative": {"open": 3600, "closed": 6 * 3600},  # LLM analyses and summaries
+}
+MIN_TTL = 1.0
+
+
+def exchange_for(ticker: str) -> str:
+    for suffix, exchange in EXCHANGE_SUFFIXES.items():
+        if ticker.upper().endswith(suffix):
+            return exchange
+    return "US"
+
+
+def _session(exchange, day):
+    tz = exchange["tz"]
+    return (datetime.combine(day, exchange["open"], tzinfo=tz),
+            datetime.combine(day, exchange["close"], tzinfo=tz))
+
+
+def market_state(ticker: str, at: float = None):
+    """(is_open, seconds_to_close, seconds_since_close, seconds_to_next_open) for the ticker's exchange."""
+    exchange = EXCHANGES[exchange_for(ticker)]
+    now = datetime.fromtimestamp(at if at is not None else time.time(), tz=exchange["tz"])
+    today_open, today_close = _session(exchange, now.date())
+    trading_day = now.weekday() < 5
+    if trading_day and today_open <= now < today_close:
+        return True, (today_close - now).total_seconds(), None, None
+
+    next_open = None
+    for offset in range(8):
+        day = now.date() + timedelta(days=offset)
+        if day.weekday() < 5:
+            open_at, _ = _session(exchange, day)
+            if open_at > now:
+                next_open = open_at
+                break
+    last_close = None
+    for offset in range(8):
+        day = now.date() - timedelta(days=offset)
+        if day.weekday() < 5:
+            _, close_at = _session(exchange, day)
+            if close_at <= now:
+                last_close = close_at
+                break
+    return False, None, (now - last_close).total_seconds(), (next_open - now).total_seconds()
+
+
+def ttl_for(data_type: str, ticker: str, at: float = None) -> float:
+    """Seconds an entry of data_type for ticker written at `at` (default now) stays fresh."""
+    policy = POLICIES[data_type]
+    if not policy.get("market", True):
+        return policy["open"]
+    is_open, to_close, since_close, to_open = market_state(ticker, at)
+    if is_open:
+        ttl = policy["open"]
+        if policy.get("at_close"):
+            ttl = min(ttl, to_close + CLOSE_SETTLE_SECONDS)
+    elif policy.get("at_close") and since_close < CLOSE_SETTLE_SECONDS:
+        ttl = CLOSE_SETTLE_SECONDS - since_close
+    else:
+        ttl = to_open if policy.get("closed") is None else min(to_open, policy["closed"])
+    return max(MIN_TTL, ttl)
+
+
+def expires_at(data_type: str, ticker: str, written_at: float) -> float:
+    """Wall-clock expiry of data written at `written_at`."""
+    return written_at + ttl_for(data_type, ticker, at=written_at)
+
+
+def ttl_rule(data_type: str, cap: float = None):
+    """TTL callable for SharedTTLCache `ttls`: gets the key after its prefix
+    ("AAPL", or "AAPL_1827" for keys with a suffix) and returns seconds,
+    at most `cap` when given."""
+    def rule(rest: str) -> float:
+        ttl = ttl_for(data_type, rest.split("_")[0])
+        return ttl if cap is None else min(ttl, cap)
+    rule.data_type = data_type if cap is None else f"{data_type} (max {cap:g}s)"
+    return rule
@@ -0,0 +1,265 @@
+import os
+import re
+import time
+import random
+import asyncio
+import inspect
+import logging
+import threading
+import requests
+from blocking import run_blocking
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Jittered exponential backoff between attempts: uniform(0, min(cap, base * 2**attempt))
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 4.0
+# Query strings can carry credentials (e.g. apiKey=...); never store or log them
+_QUERY_STRING = re.compile(r"(https?://[^\s?'\"]+)\?[^\s'\"]*")
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider whose circuit is open."""
+
+
+class TokenBucket:
+    """Token bucket shared by the event loop and executor threads.
+
+    Callers reserve a token and are told how long to wait for it, so bursts up
+    to `burst` go straight through and sustained load is spaced at `rate`/s.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token; returns the seconds to wait before using it."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures; after `reset_timeout` one
+    probe call is let through (half-open) and its outcome closes or reopens it."""
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._probing = False
+            # A probe that never reported back (e.g. cancelled) doesn't block forever
+            if self.state == "half_open" and (not self._probing or time.monotonic() - self._probe_started >= self.reset_timeout):
+                self._probing = True
+                self._probe_started = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self) -> bool:
+        """Count a failure; returns True if this opened the circuit."""
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.threshold:
+                opened = self.state != "open"
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._probing = False
+                return opened
+            return False
+
+
+def redact(text: str) -> str:
+    """Error text with the query string stripped from any URL in it."""
+    return _QUERY_STRING.sub(r"\1?<redacted>", text)
+
+
+def _client_status(exc: Exception) -> bool:
+    """True for 4xx responses other than 429."""
+    response = getattr(exc, "response", None)
+    status = response.status_code if isinstance(exc, requests.HTTPError) and response is not None else None
+    if status is None:
+        status = getattr(exc, "status_code", None)  # Groq SDK errors
+    return isinstance(status, int) and 400 <= status < 500 and status != 429
+
+
+def is_data_error(exc: Exception) -> bool:
+    """Errors about the request itself (bad symbol, missing data, 4xx) rather
+    than the upstream's health: not retried and not counted by the breaker."""
+    if _client_status(exc):
+        return True
+    if type(exc).__module__.startswith("yfinance"):
+        return "RateLimit" not in type(exc).__name__
+    return isinstance(exc, (KeyError, IndexError, TypeError, AttributeError)) or (
+        isinstance(exc, ValueError) and not isinstance(exc, requests.RequestException)
+    )
+
+
+def is_retryable(exc: Exception) -> bool:
+    return not is_data_error(exc)
+
+
+def backoff_delay(attempt: int) -> float:
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+class Provider:
+    """One upstream (Yahoo, NewsAPI, Groq, ...): rate limit, circuit breaker, retries, metrics."""
+
+    def __init__(self, name: str, rate: float, burst: int, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._lock = threading.Lock()
+        self.metrics = {
+            "calls": 0, "successes": 0, "failures": 0, "retries": 0,
+            "rejected": 0, "throttled": 0, "throttle_wait": 0.0, "latency": 0.0,
+        }
+        self.last_error = None
+
+    def _count(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self.metrics[key] += value
+
+    def _admit(self) -> float:
+        """Check the breaker and take a rate token; returns the wait before calling."""
+        if not self.breaker.allow():
+            self._count(rejected=1)
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open); try again shortly")
+        wait = self.bucket.reserve()
+        if wait > 0:
+            self._count(throttled=1, throttle_wait=wait)
+        return wait
+
+    def _record(self, started: float, error: Exception = None, final: bool = True):
+        """Metrics for one attempt. The breaker only sees the outcome of the
+        whole call (`final`), and data errors count as the upstream answering."""
+        elapsed = time.perf_counter() - started
+        if error is None:
+            self.breaker.record_success()
+            self._count(calls=1, successes=1, latency=elapsed)
+            return
+        self.last_error = redact(f"{type(error).__name__}: {error}")
+        self._count(calls=1, failures=1, latency=elapsed)
+        if is_data_error(error):
+            self.breaker.record_success()
+        elif final and self.breaker.record_failure():
+            logger.warning(f"Circuit for {self.name} opened after {self.breaker.failures} failures")
+
+    async def call(self, func, *args, attempts: int = 3, **kwargs):
+        """Call func (a coroutine function, or a blocking one run on the upstream
+        executor) with rate limiting, the circuit breaker and jittered retries.
+
+        A streamed call (an `on_token` keyword) is not retried once a token has
+        been passed on, since listeners would see the text twice.
+
+        Raises the last error, or CircuitOpenError without calling upstream.
+        """
+        is_async = inspect.iscoroutinefunction(func)
+        attempts = max(1, attempts)
+        on_token = kwargs.get("on_token")
+        streamed = False
+        if on_token is not None:
+            async def relay(text):
+                nonlocal streamed
+                streamed = True
+                await on_token(text)
+            kwargs["on_token"] = relay
+        for attempt in range(attempts):
+            wait = self._admit()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            started = time.perf_counter()
+            try:
+                result = await func(*args, **kwargs) if is_async else await run_blocking(func, *args, **kwargs)
+            except Exception as e:
+                # A half-open probe gets a single attempt
+                final = attempt == attempts - 1 or not is_retryable(e) or streamed or self.breaker.state != "closed"
+                self._record(started, e, final)
+                logger.error(f"{self.name} attempt {attempt + 1} failed: {redact(str(e))}")
+                if final:
+                    raise
+                self._count(retries=1)
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+            self._record(started)
+            return result
+
+    def call_sync(self, func, *args, **kwargs):
+        """Single attempt of a blocking call from an executor thread."""
+        wait = self._admit()
+        if wait > 0:
+            time.sleep(wait)
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self._record(started, e)
+            raise
+        self._record(started)
+        return result
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self.metrics)
+        calls = metrics["calls"]
+        metrics["avg_latency"] = round(metrics.pop("latency") / calls, 4) if calls else 0.0
+        metrics["throttle_wait"] = round(metrics["throttle_wait"], 3)
+        metrics.update(state=self.breaker.state, consecutive_failures=self.breaker.failures, last_error=self.last_error)
+        return metrics
+
+
+def _provider(name: str, rate: float, burst: int) -> Provider:
+    env = name.upper()
+    return Provider(
+        name,
+        rate=float(os.getenv(f"UPSTREAM_{env}_RATE", rate)),
+        burst=int(os.getenv(f"UPSTREAM_{env}_BURST", burst)),
+        failure_threshold=int(os.getenv("UPSTREAM_FAILURE_THRESHOLD", "5")),
+        reset_timeout=float(os.getenv("UPSTREAM_RESET_SECONDS", "30")),
+    )
+
+
+# Requests per second and burst per provider (override with UPSTREAM_<NAME>_RATE/_BURST)
+PROVIDERS = {
+    "yahoo": _provider("yahoo", 5, 10),
+    "newsapi": _provider("newsapi", 1, 5),
+    "duckduckgo": _provider("duckduckgo", 0.5, 2),
+    "groq": _provider("groq", 0.5, 5),
+}
+
+
+def provider(name: str) -> Provider:
+    return PROVIDERS[name]
+
+
+def upstream_stats():
+    return {name: p.stats() for name, p in PROVIDERS.items()}
@@ -0,0 +1,163 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from batch import RateBudget
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# The dashboard's default watchlist; override with WARMUP_TICKERS="AAPL,MSFT,..."
+DEFAULT_HOT_SET = ["AAPL", "MSFT", "GOOGL", "AMZN", "TSLA", "NVDA", "META", "NFLX", "RELIANCE.NS", "TCS.NS"]
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") != "0"
+WARMUP_TICKERS = [t.strip().upper() for t in os.getenv("WARMUP_TICKERS", ",".join(DEFAULT_HOT_SET)).split(",") if t.strip()]
+# Seconds between passes, most-viewed tickers added on top of the hot set, and
+# how fast a pass may start analyses (each costs several upstream + Groq calls).
+WARMUP_INTERVAL = float(os.getenv("WARMUP_INTERVAL", "300"))
+WARMUP_POPULAR = int(os.getenv("WARMUP_POPULAR", "10"))
+WARMUP_STARTS_PER_SECOND = float(os.getenv("WARMUP_STARTS_PER_SECOND", "0.2"))
+WARMUP_CONCURRENCY = int(os.getenv("WARMUP_CONCURRENCY", "2"))
+# Views lose half their weight after this many seconds
+POPULARITY_HALF_LIFE = float(os.getenv("POPULARITY_HALF_LIFE", "21600"))
+POPULARITY_MAX_TICKERS = 1000
+
+
+class Popularity:
+    """Exponentially decayed view counts per ticker."""
+
+    def __init__(self, half_life: float = POPULARITY_HALF_LIFE, max_tickers: int = POPULARITY_MAX_TICKERS):
+        self.half_life = half_life
+        self.max_tickers = max_tickers
+        self._scores = {}
+        self._lock = threading.Lock()
+
+    def _decayed(self, score, stamp, now):
+        return score * 0.5 ** ((now - stamp) / self.half_life)
+
+    def record(self, ticker: str):
+        now = time.time()
+        with self._lock:
+            score, stamp = self._scores.get(ticker, (0.0, now))
+            self._scores[ticker] = (self._decayed(score, stamp, now) + 1.0, now)
+            if len(self._scores) > self.max_tickers:
+                # Forget the least-viewed symbols
+                ranked = sorted(self._scores.items(), key=lambda kv: self._decayed(*kv[1], now))
+                for t, _ in ranked[:len(self._scores) - self.max_tickers]:
+                    del self._scores[t]
+
+    def top(self, n: int):
+        """The n most viewed tickers as [(ticker, score)], highest first."""
+        now = time.time()
+        with self._lock:
+            scores = [(t, self._decayed(score, stamp, now)) for t, (score, stamp) in self._scores.items()]
+        return [(t, round(s, 3)) for t, s in sorted(scores, key=lambda ts: ts[1], reverse=True)[:n]]
+
+
+popularity = Popularity()
+
+
+class WarmupScheduler:
+    """Keeps prices, fundamentals, news context and analyses warm for the hot set.
+
+    Every WARMUP_INTERVAL seconds it refreshes stored bars for the hot set plus
+    the most viewed tickers with bulk downloads, then runs the full analysis for
+    each ticker whose cached analysis is missing or stale. Fresh tickers cost
+    nothing; stale ones are served as-is and revalidated in the background.
+    """
+
+    def __init__(self, head_agent, hot_set=None, interval: float = WARMUP_INTERVAL, popular: int = WARMUP_POPULAR,
+                 starts_per_second: float = WARMUP_STARTS_PER_SECOND, concurrency: int = WARMUP_CONCURRENCY):
+        self.head_agent = head_agent
+        self.hot_set = list(hot_set if hot_set is not None else WARMUP_TICKERS)
+        self.interval = interval
+        self.popular = popular
+        self.budget = RateBudget(starts_per_second)
+        self.concurrency = max(1, concurrency)
+        self._task = None
+        self.passes = 0
+        self.warmed = 0
+        self.failed = 0
+        self.last_pass = None
+
+    def targets(self):
+        """Hot set first, then the most viewed tickers not already in it."""
+        tickers = list(dict.fromkeys(self.hot_set))
+        for ticker, _ in popularity.top(self.popular):
+            if ticker not in tickers:
+                tickers.append(ticker)
+        return tickers
+
+    async def needs_warming(self, ticker):
+        """Whether the stock or fundamentals analysis for ticker is missing or stale."""
+        for cache, key in ((self.head_agent.stock_analyzer_agent.cache, f"stock_{ticker}"),
+                           (self.head_agent.fin_analyzer_agent.cache, f"fundamentals_{ticker}")):
+            entry = await cache.aentry(key)
+            if entry is None or entry["stale"]:
+                return True
+        return False
+
+    async def run_pass(self):
+        start = time.perf_counter()
+        tickers = self.targets()
+        stock_agent = self.head_agent.stock_analyzer_agent
+        try:
+            await stock_agent.prefetch_price_series(tickers)
+        except Exception as e:
+            logger.error(f"Warm-up price prefetch failed: {str(e)}")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def warm(ticker):
+            async with semaphore:
+                await self.budget.acquire()
+                try:
+                    result = await self.head_agent.analyze_stock(ticker)
+                    if "error" in result:
+                        raise ValueError(result["error"])
+                    self.warmed += 1
+                except Exception as e:
+                    self.failed += 1
+                    logger.error(f"Warm-up failed for {ticker}: {str(e)}")
+
+        cold = [t for t, needed in zip(tickers, await asyncio.gather(*(self.needs_warming(t) for t in tickers))) if needed]
+        await asyncio.gather(*(warm(t) for t in cold))
+        self.passes += 1
+        self.last_pass = {"tickers": len(tickers), "cold": len(cold), "elapsed": round(time.perf_counter() - start, 3)}
+        logger.info(f"Warm-up pass: {len(cold)}/{len(tickers)} tickers needed warming, took {self.last_pass['elapsed']:.1f}s")
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_pass()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Warm-up pass failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            logger.info(f"Starting warm-up scheduler for {len(self.hot_set)} hot tickers every {self.interval:.0f}s")
+            self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        return {
+            "running": self._task is not None,
+            "hot_set": self.hot_set,
+            "interval": self.interval,
+            "passes": self.passes,
+            "warmed": self.warmed,
+            "failed": self.failed,
+            "last_pass": self.last_pass,
+            "popular": popularity.top(self.popular),
+        }
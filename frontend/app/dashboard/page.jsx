@@ -1,7 +1,7 @@
 'use client';
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import dynamic from 'next/dynamic';
-import { getPrices, getAnalyze, getMarketContext, getSnapshots } from '../../lib/api';
+import { getPrices, getAnalyze, getMarketContext, getSnapshots, streamAnalyze } from '../../lib/api';
 import AiAnalysis from '../../components/dashboard/AiAnalysis';
 import NewsFeed from '../../components/dashboard/NewsFeed';
 
@@ -18,6 +18,10 @@ const StockChart = dynamic(() => import('../../components/dashboard/StockChart')
   ),
 });
 
+const CHART_RANGES = ['1m', '6m', '1y', '5y', 'max'];
+// The server downsamples longer ranges so the chart never plots more than this
+const CHART_MAX_POINTS = 400;
+
 const DEFAULT_TICKERS = [
   'AAPL','MSFT','GOOGL','AMZN','TSLA','NVDA','META','NFLX','RELIANCE.NS','TCS.NS'
 ];
@@ -27,31 +31,70 @@ export default function DashboardPage() {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
   const [prices, setPrices] = useState([]);
+  const [priceFreshness, setPriceFreshness] = useState(null);
   const [analysis, setAnalysis] = useState(null);
   const [news, setNews] = useState([]);
   const [recent, setRecent] = useState([]);
   const [chartType, setChartType] = useState('line'); // 'line' | 'bar'
+  const [range, setRange] = useState('1y');
+  const closeStream = useRef(null);
+
+  // Stream the AI analysis: numbers first, then LLM text as it is generated.
+  const loadAnalysis = (t) => {
+    closeStream.current?.();
+    setAnalysis(null);
+    const sections = { stock_analysis: '', fundamentals_analysis: '', market_context: '' };
+    const summary = () => [sections.stock_analysis, sections.fundamentals_analysis && `Fundamentals: ${sections.fundamentals_analysis}`, sections.market_context && `Market Context: ${sections.market_context}`]
+      .filter(Boolean).join('\n\n');
+    closeStream.current = streamAnalyze(t, {
+      onData: (data) => setAnalysis((prev) => ({ ...prev, ...data })),
+      onToken: ({ section, text }) => {
+        sections[section] = (sections[section] || '') + text;
+        setAnalysis((prev) => ({ ...prev, summary: summary() }));
+      },
+      onSection: ({ section, text }) => {
+        sections[section] = text;
+        setAnalysis((prev) => ({ ...prev, summary: summary() }));
+      },
+      onResult: (result) => setAnalysis(result),
+      onError: () => getAnalyze(t).then(setAnalysis).catch(() => setAnalysis(null)),
+    });
+  };
+
+  useEffect(() => () => closeStream.current?.(), []);
+
+  const loadPrices = (t, r = range) => getPrices(t, 'columnar', { range: r, max_points: CHART_MAX_POINTS });
+
+  const normalizePrices = (priceRes) => (
+    // Columnar object or array of bars
+    Array.isArray(priceRes?.prices?.close) || Array.isArray(priceRes?.prices)
+      ? priceRes.prices
+      : Array.isArray(priceRes)
+        ? priceRes
+        : []
+  );
+
+  const changeRange = async (r) => {
+    setRange(r);
+    try {
+      const priceRes = await loadPrices(ticker, r);
+      setPrices(normalizePrices(priceRes));
+      setPriceFreshness(priceRes?.freshness || null);
+    } catch {}
+  };
 
   const load = async (t) => {
     setLoading(true);
     setError(null);
+    loadAnalysis(t);
     try {
-      const [priceRes, analysisRes, newsRes] = await Promise.all([
-        getPrices(t).catch(() => null),
-        getAnalyze(t).catch(() => null),
+      const [priceRes, newsRes] = await Promise.all([
+        loadPrices(t).catch(() => null),
         getMarketContext(t).catch(() => null),
       ]);
 
-      // Prices normalization
-      const series = Array.isArray(priceRes?.prices)
-        ? priceRes.prices
-        : Array.isArray(priceRes)
-          ? priceRes
-          : [];
-      setPrices(series);
-
-      // Analysis
-      setAnalysis(analysisRes || null);
+      setPrices(normalizePrices(priceRes));
+      setPriceFreshness(priceRes?.freshness || null);
 
       // News normalization
       const items = Array.isArray(newsRes?.news) ? newsRes.news : Array.isArray(newsRes) ? newsRes : [];
@@ -129,7 +172,18 @@ export default function DashboardPage() {
         </div>
         <div className="lg:col-span-2 space-y-4">
           <div className="flex items-center justify-between">
-            <div className="text-sm text-neutral-500">Chart Type</div>
+            <div className="inline-flex rounded-xl border border-black/10 dark:border-white/10 overflow-hidden">
+              {CHART_RANGES.map((r) => (
+                <button
+                  key={r}
+                  type="button"
+                  onClick={() => changeRange(r)}
+                  className={`px-3 py-1.5 text-sm uppercase ${range === r ? 'bg-gradient-to-r from-brandStart via-brandMid to-brandEnd text-white' : 'bg-transparent hover:bg-black/5 dark:hover:bg-white/5'}`}
+                >
+                  {r}
+                </button>
+              ))}
+            </div>
             <div className="inline-flex rounded-xl border border-black/10 dark:border-white/10 overflow-hidden">
               {['line','bar'].map((t) => (
                 <button
@@ -143,7 +197,7 @@ export default function DashboardPage() {
               ))}
             </div>
           </div>
-          <StockChart prices={prices} ticker={ticker} chartType={chartType} />
+          <StockChart prices={prices} ticker={ticker} chartType={chartType} freshness={priceFreshness} />
           <AiAnalysis analysis={analysis} />
         </div>
       </div>
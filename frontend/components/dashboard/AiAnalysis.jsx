@@ -1,6 +1,7 @@
 // frontend/components/dashboard/AiAnalysis.jsx
 "use client";
 import React from 'react';
+import { describeFreshness } from '../../lib/api';
 
 export default function AiAnalysis({ analysis }) {
   if (!analysis) {
@@ -13,14 +14,17 @@ export default function AiAnalysis({ analysis }) {
     );
   }
 
-  const { summary, sentiment, confidence, keyFactors, targetPrice, recommendation, dataAvailability } = analysis;
+  const { summary, sentiment, confidence, keyFactors, targetPrice, recommendation, dataAvailability, freshness } = analysis;
   const confidencePercent = typeof confidence === 'number' ? (confidence > 1 ? Math.round(confidence) : Math.round(confidence * 100)) : 0;
 
   return (
     <div className="rounded-2xl p-[1px] bg-gradient-to-r from-brandStart/30 via-brandMid/20 to-brandEnd/30">
       <div className="card p-5 space-y-4 border-transparent motion-safe:animate-in">
       <div className="flex items-center justify-between">
-        <h3 className="font-semibold">AI Analysis</h3>
+        <div>
+          <h3 className="font-semibold">AI Analysis</h3>
+          {freshness && <div className="text-xs text-neutral-500">{describeFreshness(freshness)}</div>}
+        </div>
         {sentiment && (
           <span className={`text-xs px-2 py-1 rounded-full ${/bullish/i.test(sentiment) ? 'bg-green-500/10 text-green-600 dark:text-green-400' : /bearish/i.test(sentiment) ? 'bg-red-500/10 text-red-600 dark:text-red-400' : 'bg-black/5 dark:bg-white/10'}`}>
             {sentiment} • {confidencePercent}%
@@ -2,6 +2,7 @@
 "use client";
 import React, { useEffect, useMemo, useRef, useState } from 'react';
 import { Chart } from 'react-chartjs-2';
+import { describeFreshness } from '../../lib/api';
 import {
   Chart as ChartJS,
   CategoryScale,
@@ -17,10 +18,12 @@ import {
 
 ChartJS.register(CategoryScale, LinearScale, PointElement, LineElement, BarElement, Tooltip, Legend, Filler, TimeSeriesScale);
 
-export default function StockChart({ prices = [], ticker = 'TICKER', chartType = 'line' }) {
+export default function StockChart({ prices = [], ticker = 'TICKER', chartType = 'line', freshness = null }) {
+  // Columnar series ({ date: [], close: [] }) are used as-is; arrays of bars are unpacked.
+  const columnar = prices && !Array.isArray(prices) && Array.isArray(prices.date) && Array.isArray(prices.close);
   const safeSeries = Array.isArray(prices) ? prices : [];
-  const labels = safeSeries.map((p) => (typeof p === 'object' ? (p.date ?? p.time ?? p[0]) : ''));
-  const values = safeSeries.map((p) => (typeof p === 'object' ? (p.close ?? p.price ?? p.value ?? p[1]) : p));
+  const labels = columnar ? prices.date : safeSeries.map((p) => (typeof p === 'object' ? (p.date ?? p.time ?? p[0]) : ''));
+  const values = columnar ? prices.close : safeSeries.map((p) => (typeof p === 'object' ? (p.close ?? p.price ?? p.value ?? p[1]) : p));
 
   const firstVal = typeof values[0] === 'number' ? values[0] : null;
   const lastVal = typeof values[values.length - 1] === 'number' ? values[values.length - 1] : null;
@@ -78,7 +81,9 @@ export default function StockChart({ prices = [], ticker = 'TICKER', chartType =
       <div className="h-64 md:h-80 lg:h-96 card p-4 border-transparent motion-safe:animate-in">
         <div className="flex items-center justify-between mb-3">
           <h3 className="font-semibold">Price Chart</h3>
-          <span className="text-xs text-neutral-500">Last {values.length} points</span>
+          <span className="text-xs text-neutral-500">
+            Last {values.length} points{freshness ? ` · ${describeFreshness(freshness)}` : ''}
+          </span>
         </div>
         <div className="h-[calc(100%-1rem)] overflow-hidden rounded-lg">
           <Chart data={data} options={options} type={chartType} />
@@ -47,13 +47,40 @@ export const analyzeSyncDocument = async (file, onProgress) => {
 };
 
 export const getAnalyze = (ticker) => get(`/analyze/${encodeURIComponent(ticker)}`);
-export const getPrices = (ticker) => get(`/prices/${encodeURIComponent(ticker)}`);
+// format: 'json' (array of bars) or 'columnar' ({ date: [], open: [], ..., close: [] })
+// options: { range: '1m'|'6m'|'1y'|'5y'|'max', interval: '1d'|'1wk'|'1mo', max_points, method: 'lttb'|'ohlc' }
+export const getPrices = (ticker, format = 'json', options = {}) =>
+  get(`/prices/${encodeURIComponent(ticker)}`, { params: { ...(format === 'json' ? {} : { format }), ...options } });
 export const getMarketContext = (ticker) => get(`/market-context/${encodeURIComponent(ticker)}`);
 export const getAllData = (ticker) => get(`/all-data/${encodeURIComponent(ticker)}`);
 export const validateTicker = (ticker) => get(`/validate-ticker/${encodeURIComponent(ticker)}`);
 export const getHealth = () => get('/health');
+
+// Server-sent events version of getAnalyze. Handlers: onData (numbers, sent first),
+// onToken / onSection ({ section, text }), onResult (full analysis), onError.
+// Returns a function that closes the stream.
+export const streamAnalyze = (ticker, handlers = {}) => {
+  const source = new EventSource(`${API_BASE_URL}/analyze/${encodeURIComponent(ticker)}/stream`);
+  const on = (event, handler) => source.addEventListener(event, (e) => handler?.(JSON.parse(e.data)));
+  on('data', handlers.onData);
+  on('token', handlers.onToken);
+  on('section', handlers.onSection);
+  on('result', (data) => { source.close(); handlers.onResult?.(data); });
+  source.addEventListener('error', (e) => {
+    source.close();
+    handlers.onError?.(e?.data ? JSON.parse(e.data) : { detail: 'Stream failed' });
+  });
+  return () => source.close();
+};
 export const getSnapshots = (tickers) => post('/snapshots', { tickers });
 
 export default api;
 
-
+// "Updated 5m ago", plus "refreshing" while the server revalidates a stale entry.
+// freshness: { age (seconds), stale } as returned by /prices, /analyze and /all-data.
+export const describeFreshness = (freshness) => {
+  if (!freshness || typeof freshness.age !== 'number') return '';
+  const age = Math.round(freshness.age);
+  const ago = age < 60 ? 'just now' : age < 3600 ? `${Math.floor(age / 60)}m ago` : `${Math.floor(age / 3600)}h ago`;
+  return `Updated ${ago}${freshness.stale ? ' · refreshing' : ''}`;
+};